@@ -0,0 +1,197 @@
+"""
+Analítica de administración a partir de resúmenes diarios.
+
+El comando rollup_daily_stats recorre los días desde la marca de agua
+"analytics.daily" (el último día completo ya resumido) hasta hoy. Cada día se
+calcula con consultas acotadas a ese día sobre columnas con índice
+(Bid.created_date, Auction.closing_date...) y se guarda en DailyStats y
+DailyCategoryStats; el día en curso se vuelve a calcular en cada ejecución.
+Los endpoints de /api/auctions/analytics/ solo leen esas dos tablas, así que
+cualquier rango de fechas se responde sin tocar las tablas calientes.
+
+Las subastas archivadas (comando archive_auctions) siguen contando en el GMV y
+en las subastas activas del día en que cerraron a través de ArchivedAuction.
+"""
+
+from datetime import date, datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+from django.utils import timezone
+
+from users.models import CustomUser
+
+from .categories import get_tree
+from .models import (
+    ArchivedAuction,
+    Auction,
+    Bid,
+    DailyCategoryStats,
+    DailyStats,
+    Watermark,
+)
+
+DAILY_WATERMARK = "analytics.daily"
+BATCH_SIZE = 500
+
+
+def day_bounds(day):
+    """Inicio y fin ([inicio, fin)) del día en la zona horaria del proyecto."""
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+    return start, end
+
+
+def _batches(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), BATCH_SIZE):
+        yield ids[start : start + BATCH_SIZE]
+
+
+def _first_day():
+    firsts = [
+        CustomUser.objects.aggregate(first=Min("date_joined"))["first"],
+        Auction.all_objects.aggregate(first=Min("creation_date"))["first"],
+        ArchivedAuction.objects.aggregate(first=Min("closing_date"))["first"],
+    ]
+    firsts = [first for first in firsts if first is not None]
+    return timezone.localdate(min(firsts)) if firsts else None
+
+
+def _bids_by_auction(start, end):
+    # Una consulta por base de datos de pujas (BID_SHARDS).
+    counts = {}
+    for bids in Bid.objects.on_shards():
+        counts.update(
+            bids.filter(created_date__gte=start, created_date__lt=end)
+            .order_by()
+            .values("auction")
+            .annotate(count=Count("id"))
+            .values_list("auction", "count")
+        )
+    return counts
+
+
+def _winning_bids(auction_ids):
+    winning = {}
+    for ids in _batches(auction_ids):
+        for bids in Bid.objects.for_auctions(ids):
+            winning.update(
+                bids.order_by()
+                .values("auction")
+                .annotate(top=Max("price"))
+                .values_list("auction", "top")
+            )
+    return winning
+
+
+def _categories(auction_ids):
+    categories = {}
+    for ids in _batches(auction_ids):
+        categories.update(
+            Auction.all_objects.filter(id__in=ids).values_list("id", "category")
+        )
+    return categories
+
+
+def rollup_day(day):
+    """Recalcula y guarda el resumen de ``day``."""
+    start, end = day_bounds(day)
+    auctions = Auction.all_objects
+    archived = ArchivedAuction.objects.filter(
+        closing_date__gte=start, closing_date__lt=end
+    )
+
+    by_category = {}
+
+    def add(category_id, bids=0, gmv=0):
+        counts = by_category.setdefault(category_id, {"bids": 0, "gmv": 0})
+        counts["bids"] += bids
+        counts["gmv"] += gmv
+
+    bids = _bids_by_auction(start, end)
+    categories = _categories(bids)
+    for auction_id, count in bids.items():
+        # Las pujas de subastas ya borradas no tienen categoría.
+        if auction_id in categories:
+            add(categories[auction_id], bids=count)
+
+    closed = dict(
+        auctions.filter(closing_date__gte=start, closing_date__lt=end).values_list(
+            "id", "category"
+        )
+    )
+    sales = [
+        (closed[auction_id], price)
+        for auction_id, price in _winning_bids(closed).items()
+    ]
+    sales += list(
+        archived.filter(final_price__isnull=False).values_list(
+            "category_id", "final_price"
+        )
+    )
+    for category_id, price in sales:
+        add(category_id, gmv=price)
+
+    stats = {
+        "gmv": sum(price for _, price in sales),
+        "sold_auctions": len(sales),
+        "bids": sum(bids.values()),
+        "new_users": CustomUser.objects.filter(
+            date_joined__gte=start, date_joined__lt=end
+        ).count(),
+        "new_auctions": auctions.filter(
+            creation_date__gte=start, creation_date__lt=end
+        ).count(),
+        "active_auctions": auctions.filter(
+            creation_date__lt=end, closing_date__gte=start
+        ).count()
+        + archived.count(),
+    }
+    # La categoría de una subasta archivada puede haberse borrado.
+    tree = get_tree()
+    with transaction.atomic():
+        DailyStats.objects.update_or_create(day=day, defaults=stats)
+        DailyCategoryStats.objects.filter(day=day).delete()
+        DailyCategoryStats.objects.bulk_create(
+            [
+                DailyCategoryStats(day=day, category_id=category_id, **counts)
+                for category_id, counts in by_category.items()
+                if category_id in tree
+            ]
+        )
+    return stats
+
+
+def run_rollup(since=None):
+    """
+    Resume los días pendientes (desde ``since`` si se indica) hasta hoy y
+    devuelve la lista de días calculados.
+    """
+    today = timezone.localdate()
+    watermark, _ = Watermark.objects.get_or_create(name=DAILY_WATERMARK)
+    if since is not None:
+        day = since
+    elif watermark.position:
+        day = date.fromordinal(watermark.position + 1)
+    else:
+        day = _first_day()
+    days = []
+    while day is not None and day <= today:
+        rollup_day(day)
+        days.append(day)
+        if day < today:
+            watermark.position = day.toordinal()
+            watermark.save(update_fields=["position", "updated_at"])
+        day += timedelta(days=1)
+    return days
+
+
+def category_stats(start, end):
+    """Pujas y GMV por categoría entre ``start`` y ``end`` (incluidos)."""
+    return (
+        DailyCategoryStats.objects.filter(day__gte=start, day__lte=end)
+        .values("category")
+        .annotate(bids=Sum("bids"), gmv=Sum("gmv"))
+        .order_by("-bids", "category")
+    )
@@ -0,0 +1,174 @@
+"""
+Archivado de subastas cerradas.
+
+El proceso trabaja por lotes de ``batch_size`` subastas, cada lote en su propia
+transacción, para no mantener bloqueos largos sobre las tablas calientes. Las
+filas hijas se borran con un DELETE por tabla, sin cargarlas ni enviar
+post_delete por fila, y las cachés de los usuarios afectados se invalidan una
+vez por lote. Se lanza desde el comando archive_auctions.
+"""
+
+import json
+import zlib
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils import timezone
+
+from .bid_shards import group_by_shard
+from .models import (
+    ArchivedAuction,
+    Auction,
+    AuctionScore,
+    Bid,
+    Comentario,
+    Rating,
+    Watch,
+)
+from .signals import invalidate_dashboard
+
+AUCTION_FIELDS = [
+    "id",
+    "title",
+    "description",
+    "price",
+    "rating",
+    "stock",
+    "brand",
+    "category_id",
+    "thumbnail",
+    "creation_date",
+    "closing_date",
+    "auctioneer_id",
+    "municipality",
+    "locality",
+]
+
+
+def compress(data):
+    return zlib.compress(json.dumps(data, cls=DjangoJSONEncoder).encode(), 9)
+
+
+def decompress(payload):
+    return json.loads(zlib.decompress(payload))
+
+
+def _group_by_auction(rows):
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(row["auction_id"], []).append(row)
+    return grouped
+
+
+def archive_closed_auctions(retention=None, batch_size=500):
+    """
+    Mueve a ArchivedAuction las subastas cerradas antes de ``now - retention``
+    junto con sus pujas, valoraciones y comentarios. Devuelve cuántas se han
+    archivado.
+    """
+    retention = retention or settings.AUCTION_ARCHIVE_RETENTION
+    cutoff = timezone.now() - retention
+    archived = 0
+
+    while True:
+        auctions = list(
+            Auction.objects.filter(closing_date__lt=cutoff)
+            .order_by("closing_date")
+            .values(*AUCTION_FIELDS)[:batch_size]
+        )
+        if not auctions:
+            return archived
+        ids = [auction["id"] for auction in auctions]
+
+        bids = _group_by_auction(
+            row
+            for shard_bids in Bid.objects.for_auctions(ids)
+            for row in shard_bids.values(
+                "id", "auction_id", "bidder_id", "price", "created_date"
+            )
+        )
+        ratings = _group_by_auction(
+            Rating.objects.filter(auction__in=ids).values(
+                "id", "auction_id", "user_id", "valor_numerico"
+            )
+        )
+        comments = _group_by_auction(
+            Comentario.objects.filter(auction__in=ids)
+            .order_by("path")
+            .values(
+                "id",
+                "auction_id",
+                "usuario_id",
+                "parent_id",
+                "titulo",
+                "campo_de_texto",
+                "fecha_creacion",
+                "fecha_ultima_modificacion",
+            )
+        )
+
+        archives = []
+        for auction in auctions:
+            auction_bids = bids.get(auction["id"], [])
+            auction_ratings = ratings.get(auction["id"], [])
+            auction_comments = comments.get(auction["id"], [])
+            archives.append(
+                ArchivedAuction(
+                    auction_id=auction["id"],
+                    auctioneer_id=auction["auctioneer_id"],
+                    category_id=auction["category_id"],
+                    title=auction["title"],
+                    closing_date=auction["closing_date"],
+                    final_price=max(
+                        (bid["price"] for bid in auction_bids), default=None
+                    ),
+                    bid_count=len(auction_bids),
+                    rating_count=len(auction_ratings),
+                    comment_count=len(auction_comments),
+                    payload=compress(
+                        {
+                            "auction": auction,
+                            "bids": auction_bids,
+                            "ratings": auction_ratings,
+                            "comments": auction_comments,
+                        }
+                    ),
+                )
+            )
+
+        with ExitStack() as atomic:
+            # "default" se abre el último y confirma el primero: si falla una
+            # base de datos de pujas después, la subasta ya está archivada (con
+            # sus pujas en el payload) y solo quedan pujas huérfanas; nunca se
+            # pierden pujas de una subasta sin archivar.
+            for alias in set(group_by_shard(ids)) - {DEFAULT_DB_ALIAS}:
+                atomic.enter_context(transaction.atomic(using=alias))
+            atomic.enter_context(transaction.atomic())
+            ArchivedAuction.objects.bulk_create(archives, ignore_conflicts=True)
+            _delete_auctions(ids)
+        # Lo que harían los receptores de borrado de cada fila, una vez por lote
+        # (el de Auction sí se ejecuta e invalida subastador e instantánea).
+        invalidate_dashboard(
+            *(row["bidder_id"] for rows in bids.values() for row in rows),
+            *(row["user_id"] for rows in ratings.values() for row in rows),
+            *(row["usuario_id"] for rows in comments.values() for row in rows),
+        )
+        archived += len(ids)
+
+
+def _delete_auctions(ids):
+    # Se borran primero las filas hijas, con un DELETE por tabla (ninguna tiene
+    # filas que dependan de ellas salvo Comentario.parent, que se va en el mismo
+    # DELETE), para que el CASCADE de cada subasta no tenga que recorrerlas.
+    children = [
+        Comentario.objects.filter(auction__in=ids),
+        Rating.objects.filter(auction__in=ids),
+        *Bid.objects.for_auctions(ids),
+        AuctionScore.objects.filter(auction__in=ids),
+        Watch.objects.filter(auction__in=ids),
+    ]
+    for queryset in children:
+        queryset._raw_delete(queryset.db)
+    Auction.all_objects.filter(id__in=ids).delete()
@@ -0,0 +1,453 @@
+"""
+Motor de pujas en memoria (opcional, BID_ENGINE_ENABLED).
+
+Las subastas se reparten entre BID_ENGINE_SHARDS procesos por ``auction_id``
+(comando run_bid_engine). Cada shard guarda en memoria el precio más alto y el
+pujador de las subastas activas y decide si acepta una puja sin consultar la
+base de datos; solo la primera puja de una subasta carga su estado de la BD.
+
+Las pujas aceptadas se apuntan en un diario (un fichero por shard) antes de
+responder, con fsync si BID_ENGINE_JOURNAL_FSYNC (sin él el diario sobrevive a
+que muera el proceso, pero no a que se caiga la máquina), y un hilo las escribe
+en la tabla Bid por lotes con bulk_create. En la
+misma transacción se guarda en Watermark el número de secuencia de la última
+puja escrita, así que al arrancar el shard reescribe desde el diario exactamente
+las que no llegaron a la BD y reconstruye el estado a partir de la BD.
+
+Mientras el motor está activo es el único que debe crear pujas: las vistas de
+BidsListCreate le envían las pujas nuevas por multiprocessing.connection, y las
+pujas no se pueden editar ni borrar por la API (el precio más alto vive en el
+shard). Los cambios de una subasta (cierre, borrado) se le avisan al shard con
+notify_auction_changed para que vuelva a leerla.
+"""
+
+import json
+import logging
+import os
+import signal
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from multiprocessing.connection import Client, Listener
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from . import bid_shards, feeds
+from .models import Auction, Bid, Watermark
+from .signals import invalidate_dashboard
+from .snapshots import invalidate_snapshot
+
+logger = logging.getLogger(__name__)
+
+HIGHER_BID_REQUIRED = "La puja debe ser mayor que la actual más alta."
+
+
+class BidEngineUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "El motor de pujas no está disponible, inténtalo de nuevo."
+    default_code = "bid_engine_unavailable"
+
+
+class BidsLocked(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Con el motor de pujas activo las pujas no se pueden modificar."
+    default_code = "bids_locked"
+
+
+def shard_for(auction_id):
+    return auction_id % settings.BID_ENGINE_SHARDS
+
+
+def shard_address(shard):
+    host, port = settings.BID_ENGINE_ADDRESS
+    return host, port + shard
+
+
+# Cliente (workers de Django)
+
+_local = threading.local()
+
+
+def submit(auction_id, bidder_id, price):
+    """
+    Envía una puja al shard de la subasta y devuelve su decisión: un dict con
+    ``accepted`` y, según el caso, ``reason`` o los datos de la puja aceptada.
+    """
+    return _request(shard_for(auction_id), ("bid", auction_id, bidder_id, str(price)))
+
+
+def notify_auction_changed(auction_id):
+    """
+    Avisa al shard de que la subasta ha cambiado (cierre, borrado) para que la
+    vuelva a leer de la BD. Si el shard no responde no pasa nada: al arrancar
+    carga las subastas desde la BD.
+    """
+    try:
+        _request(shard_for(auction_id), ("auction_changed", auction_id))
+    except BidEngineUnavailable:
+        logger.warning("No se pudo avisar del cambio de la subasta %s", auction_id)
+
+
+def _request(shard, message):
+    connections = _local.__dict__.setdefault("connections", {})
+    for attempt in range(2):
+        try:
+            conn = connections.get(shard)
+            if conn is None:
+                conn = Client(shard_address(shard), authkey=settings.BID_ENGINE_AUTHKEY)
+                connections[shard] = conn
+            conn.send(message)
+        except (OSError, EOFError):
+            # Conexión caída antes de enviar (p. ej. el shard se ha reiniciado):
+            # se reintenta una vez con una conexión nueva.
+            connections.pop(shard, None)
+            continue
+        try:
+            return conn.recv()
+        except (OSError, EOFError):
+            # El mensaje ya ha salido y la puja puede haberse aceptado: no se
+            # reenvía, porque el reintento se rechazaría por no superar a la
+            # propia puja.
+            connections.pop(shard, None)
+            break
+    raise BidEngineUnavailable()
+
+
+# Shard
+
+
+class AuctionState:
+    __slots__ = ("top_price", "top_bidder", "closing_date", "last_used")
+
+    def __init__(self, top_price, top_bidder, closing_date):
+        self.top_price = top_price
+        self.top_bidder = top_bidder
+        self.closing_date = closing_date
+        self.last_used = time.monotonic()
+
+
+class Shard:
+    def __init__(self, number):
+        self.number = number
+        self.lock = threading.Lock()
+        self.auctions = {}
+        self.pending = []
+        self.seq = 0
+        self.watermark = f"bid_engine.{number}"
+        # Todas las subastas de este shard tienen sus pujas en la misma base de
+        # datos (run_bid_engine exige que BID_SHARDS divida BID_ENGINE_SHARDS),
+        # así que la marca de agua se guarda junto a ellas.
+        self.db = bid_shards.db_for_auction(number)
+        self.journal_path = os.path.join(
+            settings.BID_ENGINE_JOURNAL_DIR, f"shard-{number}.log"
+        )
+        self.journal = None
+        self.stopping = threading.Event()
+
+    # Recuperación
+
+    def recover(self):
+        """Escribe en la BD las pujas del diario que no llegaron a guardarse."""
+        committed = (
+            Watermark.objects.using(self.db)
+            .get_or_create(name=self.watermark)[0]
+            .position
+        )
+        entries = [entry for entry in self._read_journal() if entry["seq"] > committed]
+        if entries:
+            logger.warning(
+                "Shard %d: recuperando %d pujas del diario", self.number, len(entries)
+            )
+            self._write(entries)
+        self.seq = max([committed] + [entry["seq"] for entry in entries])
+        os.makedirs(settings.BID_ENGINE_JOURNAL_DIR, exist_ok=True)
+        # Todo lo anterior ya está en la BD: el diario empieza vacío.
+        self.journal = open(self.journal_path, "w")
+
+    def _read_journal(self):
+        entries = []
+        try:
+            with open(self.journal_path) as journal:
+                for line in journal:
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # Última línea a medio escribir: esa puja no se confirmó.
+                        break
+        except FileNotFoundError:
+            pass
+        return entries
+
+    # Aceptación
+
+    def _closing_date(self, auction_id):
+        return (
+            Auction.objects.filter(pk=auction_id)
+            .values_list("closing_date", flat=True)
+            .first()
+        )
+
+    def _fetch(self, auction_id):
+        closing_date = self._closing_date(auction_id)
+        if closing_date is None:
+            return None
+        top_price, top_bidder = (
+            Bid.objects.for_auction(auction_id)
+            .order_by("-price", "id")
+            .values_list("price", "bidder_id")
+            .first()
+        ) or (None, None)
+        return AuctionState(top_price, top_bidder, closing_date)
+
+    def submit(self, auction_id, bidder_id, price):
+        try:
+            price = Decimal(price)
+        except InvalidOperation:
+            return {"accepted": False, "reason": "El precio no es válido."}
+        if price <= 0:
+            return {"accepted": False, "reason": "El precio debe ser mayor que 0."}
+        now = timezone.now()
+        state = self.auctions.get(auction_id)
+        if state is None:
+            # La carga desde la BD se hace fuera del lock para no frenar al resto
+            # de subastas del shard; si otro hilo se adelanta, se usa la suya.
+            state = self._fetch(auction_id)
+            if state is None:
+                return {"accepted": False, "reason": "not_found"}
+
+        with self.lock:
+            state = self.auctions.setdefault(auction_id, state)
+            if state.closing_date <= now:
+                return {"accepted": False, "reason": "La subasta está cerrada."}
+            if state.top_price is not None and price <= state.top_price:
+                return {"accepted": False, "reason": HIGHER_BID_REQUIRED}
+
+            self.seq += 1
+            entry = {
+                "seq": self.seq,
+                "auction": auction_id,
+                "bidder": bidder_id,
+                "price": str(price),
+                "previous_bidder": state.top_bidder,
+                "created": now.isoformat(),
+            }
+            self.journal.write(json.dumps(entry) + "\n")
+            self.journal.flush()
+            if settings.BID_ENGINE_JOURNAL_FSYNC:
+                os.fsync(self.journal.fileno())
+            self.pending.append(entry)
+            state.top_price = price
+            state.top_bidder = bidder_id
+            state.last_used = time.monotonic()
+        return {"accepted": True, **entry}
+
+    def auction_changed(self, auction_id):
+        """
+        Vuelve a leer el cierre y la puja más alta de la subasta (pueden haberse
+        borrado pujas); si ya no existe, la olvida.
+        """
+        fresh = self._fetch(auction_id)
+        with self.lock:
+            state = self.auctions.get(auction_id)
+            if state is None:
+                return
+            if fresh is None:
+                del self.auctions[auction_id]
+                return
+            # Las pujas pendientes aún no están en la BD: la última de la
+            # subasta, si la hay, es la más alta.
+            for entry in reversed(self.pending):
+                if entry["auction"] == auction_id:
+                    fresh.top_price = Decimal(entry["price"])
+                    fresh.top_bidder = entry["bidder"]
+                    break
+            state.top_price, state.top_bidder = fresh.top_price, fresh.top_bidder
+            state.closing_date = fresh.closing_date
+
+    # Escritura
+
+    def flush(self):
+        """
+        Escribe el siguiente lote de pujas pendientes. Si falla, el lote sigue
+        pendiente y en el diario, y la excepción llega a run_writer, que lo
+        reintenta.
+        """
+        with self.lock:
+            batch = self.pending[: settings.BID_ENGINE_BATCH_SIZE]
+        if not batch:
+            return 0
+        self._write(batch)
+        with self.lock:
+            del self.pending[: len(batch)]
+            if not self.pending:
+                self.journal.seek(0)
+                self.journal.truncate()
+        return len(batch)
+
+    def _write(self, entries):
+        """
+        Guarda las pujas y avanza la marca de agua hasta la última. Solo se
+        descartan las que no se podrán guardar nunca (subasta borrada,
+        IntegrityError); cualquier otro error se propaga y el lote se reintenta.
+        """
+        position = entries[-1]["seq"]
+        # Un reintento tras un fallo a medio lote no repite las ya guardadas.
+        committed = (
+            Watermark.objects.using(self.db)
+            .filter(name=self.watermark)
+            .values_list("position", flat=True)
+            .first()
+        ) or 0
+        live = set(
+            Auction.objects.filter(
+                id__in={entry["auction"] for entry in entries}
+            ).values_list("id", flat=True)
+        )
+        to_insert = []
+        for entry in entries:
+            if entry["seq"] <= committed:
+                continue
+            if entry["auction"] in live:
+                to_insert.append(entry)
+            else:
+                logger.error("Shard %d: puja descartada %s", self.number, entry)
+        try:
+            self._insert(to_insert, position)
+        except IntegrityError:
+            # Una puja imposible de guardar no debe bloquear al resto: se
+            # reintenta una a una y se descartan solo las que fallan.
+            logger.exception("Shard %d: fallo al escribir un lote", self.number)
+            for entry in to_insert:
+                try:
+                    self._insert([entry], entry["seq"])
+                except IntegrityError:
+                    logger.exception("Shard %d: puja descartada %s", self.number, entry)
+            self._insert([], position)
+        self._after_write(entries)
+
+    def _insert(self, entries, position):
+        with transaction.atomic(using=self.db):
+            Bid.objects.using(self.db).bulk_create(
+                [
+                    Bid(
+                        auction_id=entry["auction"],
+                        bidder_id=entry["bidder"],
+                        price=Decimal(entry["price"]),
+                        created_date=datetime.fromisoformat(entry["created"]),
+                    )
+                    for entry in entries
+                ]
+            )
+            Watermark.objects.using(self.db).update_or_create(
+                name=self.watermark, defaults={"position": position}
+            )
+
+    def _after_write(self, entries):
+        # bulk_create no dispara las señales de Bid: se hace aquí por lotes.
+        invalidate_dashboard(
+            *{entry["bidder"] for entry in entries},
+            *{entry["previous_bidder"] for entry in entries},
+        )
+        auction_ids = {entry["auction"] for entry in entries}
+        invalidate_snapshot(*auction_ids)
+        feeds.refresh_scores(Auction.objects.filter(id__in=auction_ids))
+
+    def evict(self):
+        """Olvida las subastas cerradas o inactivas sin pujas pendientes."""
+        now = timezone.now()
+        idle = time.monotonic() - settings.BID_ENGINE_IDLE_TIMEOUT
+        with self.lock:
+            busy = {entry["auction"] for entry in self.pending}
+            for auction_id, state in list(self.auctions.items()):
+                if auction_id not in busy and (
+                    state.closing_date <= now or state.last_used < idle
+                ):
+                    del self.auctions[auction_id]
+
+    def run_writer(self):
+        last_evict = time.monotonic()
+        failures = 0
+        while not self.stopping.is_set():
+            try:
+                if not self.flush():
+                    time.sleep(settings.BID_ENGINE_FLUSH_INTERVAL)
+                failures = 0
+                if time.monotonic() - last_evict > 60:
+                    self.evict()
+                    last_evict = time.monotonic()
+            except Exception:
+                # BD bloqueada o caída: las pujas siguen pendientes y en el
+                # diario; se reintenta con espera exponencial.
+                logger.exception("Shard %d: error en el escritor", self.number)
+                failures += 1
+                time.sleep(
+                    min(
+                        settings.BID_ENGINE_FLUSH_INTERVAL * 2**failures,
+                        settings.BID_ENGINE_RETRY_MAX_DELAY,
+                    )
+                )
+            finally:
+                close_old_connections()
+        while self.flush():
+            pass
+
+    # Servidor
+
+    def handle(self, conn):
+        try:
+            while True:
+                message = conn.recv()
+                if message[0] == "bid":
+                    try:
+                        decision = self.submit(*message[1:])
+                    except Exception:
+                        logger.exception(
+                            "Shard %d: error al aceptar una puja", self.number
+                        )
+                        decision = {"accepted": False, "reason": "unavailable"}
+                    conn.send(decision)
+                elif message[0] == "auction_changed":
+                    self.auction_changed(message[1])
+                    conn.send({"ok": True})
+                elif message[0] == "ping":
+                    conn.send({"shard": self.number, "auctions": len(self.auctions)})
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+            close_old_connections()
+
+    def serve(self, listener):
+        while not self.stopping.is_set():
+            try:
+                conn = listener.accept()
+            except OSError:
+                if self.stopping.is_set():
+                    return
+                continue
+            threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+
+
+def serve_shard(number):
+    """Punto de entrada de cada proceso de run_bid_engine."""
+    shard = Shard(number)
+    shard.recover()
+    listener = Listener(shard_address(number), authkey=settings.BID_ENGINE_AUTHKEY)
+    writer = threading.Thread(target=shard.run_writer, name=f"bid-writer-{number}")
+    writer.start()
+    threading.Thread(target=shard.serve, args=(listener,), daemon=True).start()
+
+    signal.signal(signal.SIGTERM, lambda *args: shard.stopping.set())
+    logger.info("Shard %d escuchando en %s:%d", number, *shard_address(number))
+    try:
+        shard.stopping.wait()
+    except KeyboardInterrupt:
+        shard.stopping.set()
+    listener.close()
+    # El escritor vacía las pujas pendientes antes de terminar.
+    writer.join()
@@ -0,0 +1,120 @@
+"""
+Reparto opcional de la tabla de pujas entre varias bases de datos.
+
+BID_SHARDS es la lista de alias de DATABASES que guardan pujas (vacía: todas en
+"default", sin reparto). Las pujas de una subasta viven siempre en el mismo
+alias, ``auction_id % len(BID_SHARDS)``, porque todas las consultas de pujas van
+por subasta: se reparte por subasta y no por fecha para que listar o validar las
+pujas de una subasta siga tocando una sola base de datos.
+
+- BidShardRouter envía allí las lecturas y escrituras de Bid que llevan la
+  subasta (``auction.bids``, ``bid.save()``...); las consultas sueltas usan
+  Bid.objects.for_auction() / for_auctions() / on_shards().
+- En los alias de pujas solo se crean las tablas de Bid y Watermark (la marca
+  de agua del motor de pujas se guarda junto a sus pujas). Las claves ajenas de
+  Bid no tienen restricción en la BD porque la subasta y el pujador están en
+  "default"; los borrados en cascada de pujas los hacen auctions/cascade.py y
+  auctions/archive.py.
+- Los ids de Bid son únicos entre alias: el alias n empieza a numerar en
+  n * BID_SHARD_ID_SPAN (comando move_bids), así que mover pujas de un alias a
+  otro conserva sus ids.
+"""
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SHARDED_MODELS = {"bid", "watermark"}
+
+
+def is_sharded():
+    return bool(settings.BID_SHARDS)
+
+
+def shards():
+    return settings.BID_SHARDS or [DEFAULT_DB_ALIAS]
+
+
+def db_for_auction(auction_id):
+    aliases = shards()
+    return aliases[auction_id % len(aliases)]
+
+
+def group_by_shard(auction_ids):
+    """Reparte una lista de ids de subasta por alias: {alias: [ids]}."""
+    grouped = {}
+    for auction_id in auction_ids:
+        grouped.setdefault(db_for_auction(auction_id), []).append(auction_id)
+    return grouped
+
+
+def first_id(alias):
+    """Primer id de Bid del alias (el primero de la lista empieza en 1)."""
+    return shards().index(alias) * settings.BID_SHARD_ID_SPAN + 1
+
+
+def reserve_ids(alias, table="auctions_bid"):
+    """
+    Hace que los ids nuevos de Bid en ``alias`` empiecen en first_id(alias) si
+    aún no han llegado. Devuelve el siguiente id o None si no hacía falta.
+    """
+    start = first_id(alias)
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT MAX(id) FROM {table}")
+        if (cursor.fetchone()[0] or 0) >= start - 1:
+            return None
+        if connection.vendor == "sqlite":
+            cursor.execute("DELETE FROM sqlite_sequence WHERE name = %s", [table])
+            cursor.execute(
+                "INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)",
+                [table, start - 1],
+            )
+        elif connection.vendor == "postgresql":
+            cursor.execute(
+                "SELECT setval(pg_get_serial_sequence(%s, 'id'), %s, false)",
+                [table, start],
+            )
+        else:
+            raise NotImplementedError(
+                f"No se pueden reservar ids en {connection.vendor}."
+            )
+    return start
+
+
+def _is_bid(model):
+    return model._meta.label_lower == "auctions.bid"
+
+
+class BidShardRouter:
+    def _route(self, model, hints):
+        if not settings.BID_SHARDS:
+            return None
+        instance = hints.get("instance")
+        if _is_bid(model):
+            if instance is None:
+                return None
+            if _is_bid(instance):
+                return db_for_auction(instance.auction_id)
+            if instance._meta.label_lower == "auctions.auction":
+                return db_for_auction(instance.pk)
+            return None
+        if instance is not None and _is_bid(instance):
+            # bid.auction, bid.bidder...: el resto de modelos está en "default".
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._route(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._route(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if settings.BID_SHARDS and (_is_bid(obj1) or _is_bid(obj2)):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == DEFAULT_DB_ALIAS or db not in settings.BID_SHARDS:
+            return None
+        return app_label == "auctions" and model_name in SHARDED_MODELS
@@ -0,0 +1,24 @@
+import time
+
+from django.core.cache import cache
+
+
+def _version_key(scope, pk):
+    return f"{scope}-version:{pk}"
+
+
+def get_version(scope, pk):
+    """Devuelve la versión actual de la caché de un objeto (usuario, subasta...)."""
+    return cache.get_or_set(_version_key(scope, pk), time.time_ns, None)
+
+
+def bump_version(scope, pk):
+    """
+    Invalida todas las entradas cacheadas de un objeto cambiando su versión.
+    Las entradas antiguas dejan de ser alcanzables y caducan solas.
+    """
+    cache.set(_version_key(scope, pk), time.time_ns(), None)
+
+
+def versioned_key(scope, pk, *parts):
+    return ":".join([scope, str(pk), str(get_version(scope, pk)), *map(str, parts)])
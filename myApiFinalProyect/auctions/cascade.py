@@ -0,0 +1,245 @@
+"""
+Borrados en cascada asíncronos de usuarios y subastas.
+
+En la petición solo se marca la entidad (usuario inactivo, subasta con
+deleted_at) y se crea un DeletionJob, así que la latencia no depende de cuántas
+filas cuelguen de ella. El comando run_deletion_jobs procesa los trabajos: borra
+las filas dependientes en lotes de ``job.batch_size``, cada lote en su propia
+transacción, y guarda el progreso en el trabajo tras cada lote.
+
+Cada trabajo se reserva con un UPDATE condicional, así que varios procesos
+run_deletion_jobs no procesan el mismo, y la reserva se renueva con cada lote
+(DeletionJob.heartbeat_at): si su proceso muere, pasado DELETION_JOB_LEASE otro
+lo retoma donde se quedó. Durante el borrado los receptores de borrado por fila
+(auctions/signals.py) se saltan en el hilo del trabajo; sus efectos
+(histogramas, contadores de comentarios, cachés, la puja más alta del motor de
+pujas) se aplican una vez por lote en _after_batch.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import bid_engine, ratings
+from .models import (
+    Auction,
+    AuctionScore,
+    Bid,
+    Comentario,
+    DeletionJob,
+    IdempotencyKey,
+    Notification,
+    Rating,
+    Watch,
+)
+from .signals import invalidate_dashboard, row_delete_receivers_paused
+from .snapshots import invalidate_snapshot
+from users.models import CustomUser
+
+
+def schedule_auction_deletion(auction):
+    with transaction.atomic():
+        auction.deleted_at = timezone.now()
+        auction.save(update_fields=["deleted_at"])
+        AuctionScore.objects.filter(auction=auction).delete()
+        return DeletionJob.objects.create(
+            target_type=DeletionJob.AUCTION,
+            target_id=auction.pk,
+            batch_size=settings.DELETION_BATCH_SIZE,
+        )
+
+
+def schedule_user_deletion(user):
+    with transaction.atomic():
+        user.is_active = False
+        user.save(update_fields=["is_active"])
+        # Sus subastas desaparecen de los listados en el mismo momento.
+        auctions = Auction.objects.filter(auctioneer=user)
+        AuctionScore.objects.filter(auction__in=auctions).delete()
+        if settings.BID_ENGINE_ENABLED:
+            # update() no envía post_save: se avisa al motor de pujas a mano.
+            auction_ids = list(auctions.values_list("pk", flat=True))
+
+            def notify_engine():
+                for pk in auction_ids:
+                    bid_engine.notify_auction_changed(pk)
+
+            transaction.on_commit(notify_engine)
+        auctions.update(deleted_at=timezone.now())
+        return DeletionJob.objects.create(
+            target_type=DeletionJob.USER,
+            target_id=user.pk,
+            batch_size=settings.DELETION_BATCH_SIZE,
+        )
+
+
+class LeaseLost(Exception):
+    """Otro proceso ha retomado el trabajo al caducar la reserva de este."""
+
+
+def claim_next_job():
+    """
+    Reserva el siguiente trabajo pendiente, o uno en curso cuya reserva ha
+    caducado, y lo devuelve; None si no hay ninguno.
+    """
+    while True:
+        now = timezone.now()
+        job = DeletionJob.objects.filter(
+            Q(status=DeletionJob.PENDING)
+            | Q(
+                status=DeletionJob.RUNNING,
+                heartbeat_at__lt=now - settings.DELETION_JOB_LEASE,
+            )
+        ).first()
+        if job is None:
+            return None
+        claimed = DeletionJob.objects.filter(
+            pk=job.pk, status=job.status, heartbeat_at=job.heartbeat_at
+        ).update(status=DeletionJob.RUNNING, started_at=now, heartbeat_at=now)
+        if claimed:
+            job.status = DeletionJob.RUNNING
+            job.started_at = job.heartbeat_at = now
+            return job
+        # Otro proceso lo ha reservado antes: se busca el siguiente.
+
+
+def run_pending_jobs(report=None):
+    """Procesa los trabajos pendientes en orden y devuelve los procesados."""
+    jobs = []
+    while True:
+        job = claim_next_job()
+        if job is None:
+            return jobs
+        run_job(job, report)
+        jobs.append(job)
+
+
+def run_job(job, report=None):
+    """Ejecuta un trabajo ya reservado (claim_next_job)."""
+    try:
+        with row_delete_receivers_paused():
+            if job.target_type == DeletionJob.AUCTION:
+                _delete_auction(job, job.target_id, report)
+            else:
+                _delete_user(job, report)
+    except LeaseLost:
+        return
+    except Exception as exc:
+        # El trabajo queda como fallido para revisarlo; los lotes ya borrados
+        # están confirmados y volver a lanzarlo continúa desde ahí.
+        job.status = DeletionJob.FAILED
+        job.error = str(exc)
+    else:
+        job.status = DeletionJob.DONE
+    job.finished_at = timezone.now()
+    DeletionJob.objects.filter(pk=job.pk, heartbeat_at=job.heartbeat_at).update(
+        status=job.status,
+        error=job.error,
+        finished_at=job.finished_at,
+        deleted_rows=job.deleted_rows,
+    )
+
+
+def _heartbeat(job):
+    """Guarda el progreso y renueva la reserva, si sigue siendo de este proceso."""
+    now = timezone.now()
+    kept = DeletionJob.objects.filter(pk=job.pk, heartbeat_at=job.heartbeat_at).update(
+        deleted_rows=job.deleted_rows, heartbeat_at=now
+    )
+    if not kept:
+        raise LeaseLost()
+    job.heartbeat_at = now
+
+
+# Columnas (subasta, usuario) de las filas borradas que necesita _after_batch.
+AFFECTED_COLUMNS = {
+    Bid: ("auction_id", "bidder_id"),
+    Rating: ("auction_id", "user_id"),
+    Comentario: ("auction_id", "usuario_id"),
+}
+
+
+def _delete_in_batches(job, queryset, report):
+    """Borra las filas de ``queryset`` en lotes de job.batch_size."""
+    model = queryset.model
+    columns = AFFECTED_COLUMNS.get(model, ())
+    while True:
+        rows = list(queryset.values_list("pk", *columns)[: job.batch_size])
+        if not rows:
+            return
+        with transaction.atomic(), transaction.atomic(using=queryset.db):
+            deleted, _ = (
+                model._base_manager.using(queryset.db)
+                .filter(pk__in=[row[0] for row in rows])
+                .delete()
+            )
+            job.deleted_rows += deleted
+            _heartbeat(job)
+        if columns:
+            _after_batch(model, rows)
+        if report:
+            report(job, model, deleted)
+
+
+def _after_batch(model, rows):
+    # Lo que harían los receptores de borrado de cada fila, una vez por lote.
+    auction_ids = {row[1] for row in rows}
+    user_ids = {row[2] for row in rows}
+    auctions = Auction.all_objects.filter(pk__in=auction_ids)
+    if model is Rating:
+        ratings.refresh_ratings(auctions)
+        user_ids.update(auctions.values_list("auctioneer_id", flat=True))
+    elif model is Comentario:
+        counts = (
+            Comentario.objects.filter(auction=OuterRef("pk"))
+            .order_by()
+            .values("auction")
+            .annotate(count=Count("id"))
+            .values("count")
+        )
+        auctions.update(comment_count=Coalesce(Subquery(counts), 0))
+    elif model is Bid:
+        # Quien tenga ahora la puja más alta ha pasado a ir ganando.
+        higher = Bid.objects.filter(
+            auction=OuterRef("auction"), price__gt=OuterRef("price")
+        )
+        for bids in Bid.objects.for_auctions(auction_ids):
+            user_ids.update(
+                bids.filter(~Exists(higher)).values_list("bidder_id", flat=True)
+            )
+        if settings.BID_ENGINE_ENABLED:
+            # El shard vuelve a leer la puja más alta, que puede haber bajado.
+            for auction_id in auction_ids:
+                bid_engine.notify_auction_changed(auction_id)
+    invalidate_dashboard(*user_ids)
+    invalidate_snapshot(*auction_ids)
+
+
+def _delete_auction(job, auction_id, report):
+    _delete_in_batches(job, Watch.objects.filter(auction=auction_id), report)
+    _delete_in_batches(job, Comentario.objects.filter(auction=auction_id), report)
+    _delete_in_batches(job, Rating.objects.filter(auction=auction_id), report)
+    _delete_in_batches(job, Bid.objects.for_auction(auction_id), report)
+    _delete_in_batches(job, Auction.all_objects.filter(pk=auction_id), report)
+
+
+def _delete_user(job, report):
+    user_id = job.target_id
+    # Primero su actividad en subastas de otros usuarios...
+    _delete_in_batches(job, Comentario.objects.filter(usuario=user_id), report)
+    _delete_in_batches(job, Rating.objects.filter(user=user_id), report)
+    for bids in Bid.objects.filter(bidder=user_id).on_shards():
+        _delete_in_batches(job, bids, report)
+    _delete_in_batches(job, Watch.objects.filter(user=user_id), report)
+    _delete_in_batches(job, Notification.objects.filter(user=user_id), report)
+    _delete_in_batches(job, IdempotencyKey.objects.filter(user=user_id), report)
+    # ...después sus subastas, una a una y cada una por lotes...
+    auction_ids = list(
+        Auction.all_objects.filter(auctioneer=user_id).values_list("pk", flat=True)
+    )
+    for auction_id in auction_ids:
+        _delete_auction(job, auction_id, report)
+    # ...y por último el usuario, al que ya le quedan pocas filas dependientes.
+    _delete_in_batches(job, CustomUser.objects.filter(pk=user_id), report)
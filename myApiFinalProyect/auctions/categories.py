@@ -0,0 +1,57 @@
+"""
+Árbol de categorías cacheado en memoria del proceso.
+
+El árbol completo (pocas filas y que cambia muy poco) se carga una vez y se
+reutiliza mientras no cambie su versión en la caché (auctions/cache.py), que se
+incrementa cuando se confirma una escritura de Category (auctions/signals.py).
+Sin DJANGO_CACHE_URL esa versión vive en la LocMemCache de cada worker y los
+demás no ven el cambio, así que la copia también caduca a los
+CATEGORY_TREE_TIMEOUT segundos, y una categoría que no está en la copia provoca
+una recarga antes de darla por inexistente. Así comprobar si existe una
+categoría o calcular su rango de subárbol casi nunca consulta la BD.
+"""
+
+import time
+
+from django.conf import settings
+
+from .cache import bump_version, get_version
+from .models import Category
+
+_tree = None
+
+
+def get_tree(reload=False):
+    """Diccionario id -> {"name", "parent", "path", "depth"} de todas las categorías."""
+    global _tree
+    version = get_version("categories", "tree")
+    if (
+        reload
+        or _tree is None
+        or _tree[0] != version
+        or time.monotonic() - _tree[1] > settings.CATEGORY_TREE_TIMEOUT
+    ):
+        nodes = {
+            row["id"]: row
+            for row in Category.objects.values("id", "name", "parent", "path", "depth")
+        }
+        _tree = (version, time.monotonic(), nodes)
+    return _tree[2]
+
+
+def invalidate_tree():
+    bump_version("categories", "tree")
+
+
+def get_category(category_id):
+    category = get_tree().get(category_id)
+    if category is None:
+        # Puede haberse creado en otro worker después de cargar la copia.
+        category = get_tree(reload=True).get(category_id)
+    return category
+
+
+def subtree_range(category_id):
+    """Rango [inicio, fin) de category_path de la categoría y sus descendientes."""
+    path = get_category(category_id)["path"]
+    return path, path[:-1] + "0"
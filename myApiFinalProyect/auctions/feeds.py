@@ -0,0 +1,171 @@
+"""
+Feeds de portada: subastas "hot" (velocidad de pujas en la última hora) y
+subastas que cierran pronto.
+
+Las dos consultas leen como mucho FEED_CACHE_SIZE filas de un índice
+(AuctionScore.score y Auction.closing_date) y el resultado se guarda en memoria
+del proceso durante FEED_CACHE_TIMEOUT segundos, así que servir un feed no
+depende del tamaño del catálogo.
+"""
+
+import time
+
+from django.conf import settings
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Q
+from django.utils import timezone
+
+from .models import Auction, AuctionScore, Bid
+
+_feed_cache = {}
+
+
+def score_expression(bids, bidders, rating):
+    weights = settings.TRENDING_WEIGHTS
+    return (
+        bids * weights["bids"]
+        + bidders * weights["bidders"]
+        + rating * weights["rating"]
+    )
+
+
+def record_bid(bid):
+    """Actualiza de forma incremental la puntuación de la subasta de una puja nueva."""
+    new_bidder = not (
+        Bid.objects.for_auction(bid.auction_id)
+        .filter(bidder=bid.bidder_id)
+        .exclude(pk=bid.pk)
+        .exists()
+    )
+    bidders_increment = 1 if new_bidder else 0
+    updated = AuctionScore.objects.filter(auction=bid.auction_id).update(
+        bids_last_hour=F("bids_last_hour") + 1,
+        unique_bidders=F("unique_bidders") + bidders_increment,
+        score=ExpressionWrapper(
+            score_expression(
+                F("bids_last_hour") + 1,
+                F("unique_bidders") + bidders_increment,
+                F("avg_rating"),
+            ),
+            output_field=FloatField(),
+        ),
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        # Primera puja desde el último refresco: se calcula la fila completa.
+        refresh_scores(Auction.objects.filter(id=bid.auction_id))
+
+
+def refresh_scores(auctions=None, batch_size=1000):
+    """
+    Recalcula las puntuaciones de las subastas abiertas con consultas agregadas
+    por lotes y borra las de las subastas cerradas. Devuelve cuántas se han
+    actualizado.
+    """
+    now = timezone.now()
+    window_start = now - settings.TRENDING_WINDOW
+    if auctions is None:
+        auctions = Auction.objects.all()
+        AuctionScore.objects.filter(closing_date__lte=now).delete()
+
+    rows = (
+        auctions.filter(closing_date__gt=now)
+        .order_by()
+        .values_list("id", "closing_date", "rating_average")
+    )
+
+    updated = 0
+    chunk = []
+    for row in rows.iterator(chunk_size=batch_size):
+        chunk.append(row)
+        if len(chunk) >= batch_size:
+            updated += _score_chunk(chunk, window_start)
+            chunk = []
+    if chunk:
+        updated += _score_chunk(chunk, window_start)
+    return updated
+
+
+def _bid_stats(auction_ids, window_start):
+    # Las pujas pueden estar en otra base de datos (BID_SHARDS), así que se
+    # agregan aparte, una consulta por base de datos, en vez de con un JOIN.
+    stats = {}
+    for bids in Bid.objects.for_auctions(auction_ids):
+        rows = (
+            bids.order_by()
+            .values("auction")
+            .annotate(
+                recent_bids=Count("id", filter=Q(created_date__gte=window_start)),
+                bidders=Count("bidder", distinct=True),
+            )
+            .values_list("auction", "recent_bids", "bidders")
+        )
+        stats.update((auction_id, counts) for auction_id, *counts in rows)
+    return stats
+
+
+def _score_chunk(rows, window_start):
+    stats = _bid_stats([row[0] for row in rows], window_start)
+    batch = []
+    for auction_id, closing_date, avg in rows:
+        recent_bids, bidders = stats.get(auction_id, (0, 0))
+        avg = round(avg or 0, 2)
+        batch.append(
+            AuctionScore(
+                auction_id=auction_id,
+                closing_date=closing_date,
+                bids_last_hour=recent_bids,
+                unique_bidders=bidders,
+                avg_rating=avg,
+                score=score_expression(recent_bids, bidders, avg),
+            )
+        )
+    return _upsert_scores(batch)
+
+
+def _upsert_scores(batch):
+    AuctionScore.objects.bulk_create(
+        batch,
+        update_conflicts=True,
+        unique_fields=["auction"],
+        update_fields=[
+            "closing_date",
+            "bids_last_hour",
+            "unique_bidders",
+            "avg_rating",
+            "score",
+            "updated_at",
+        ],
+    )
+    return len(batch)
+
+
+def _cached(name, loader):
+    cached = _feed_cache.get(name)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    items = loader(settings.FEED_CACHE_SIZE)
+    _feed_cache[name] = (time.monotonic() + settings.FEED_CACHE_TIMEOUT, items)
+    return items
+
+
+def hot_auctions(limit):
+    def load(size):
+        scores = (
+            AuctionScore.objects.filter(closing_date__gt=timezone.now())
+            .select_related("auction")
+            .order_by("-score")[:size]
+        )
+        return [score.auction for score in scores]
+
+    return _cached("hot", load)[:limit]
+
+
+def ending_soon_auctions(limit):
+    def load(size):
+        return list(
+            Auction.objects.filter(closing_date__gt=timezone.now())
+            .select_related("score")
+            .order_by("closing_date")[:size]
+        )
+
+    return _cached("ending-soon", load)[:limit]
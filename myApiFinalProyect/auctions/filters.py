@@ -0,0 +1,126 @@
+"""
+Filtros del listado de subastas (AuctionListCreate).
+
+Los parámetros se validan y normalizan de una vez con AuctionFilterSerializer y
+luego se compilan en la consulta siguiendo FILTERS. Todos acaban en el mismo
+WHERE y es la BD quien elige el índice (rangos de category_path y location_key,
+closing_date), así que el orden de FILTERS no cambia el plan. La media de
+valoraciones se lee de la propia subasta (auctions/ratings.py), sin agrupar
+Rating, y ``ordering=score`` ordena por Auction.rating_score, que tiene índice.
+
+filter_key() devuelve una clave canónica de los parámetros normalizados (mismo
+filtro, misma clave, sea cual sea el orden o el formato de la URL); el comando
+bench_auction_filters la usa para no medir dos veces el mismo filtro.
+"""
+
+from urllib.parse import urlencode
+
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .categories import subtree_range
+from .models import build_location_key
+from .serializers import AuctionFilterSerializer
+
+
+def parse_params(query_params, user=None):
+    """Valida los parámetros de consulta y devuelve sus valores normalizados."""
+    # Los parámetros vacíos (?priceMin=) se tratan como ausentes, como antes.
+    data = {key: value for key, value in query_params.items() if value != ""}
+    serializer = AuctionFilterSerializer(data=data)
+    serializer.is_valid(raise_exception=True)
+    params = serializer.validated_data
+    if params.get("near"):
+        # "Cerca de mí" depende solo de la ubicación del usuario: se guarda
+        # como parámetro para que forme parte de la clave.
+        if user is None or not user.is_authenticated or not user.municipality:
+            raise ValidationError(
+                {"near": "El usuario debe tener un municipio en su perfil."}
+            )
+        params["near"] = build_location_key(user.municipality, user.locality)
+        params["near_municipality"] = user.municipality
+    return params
+
+
+def filter_key(params):
+    return urlencode(sorted((name, str(value)) for name, value in params.items()))
+
+
+def _category(query_set, params):
+    start, end = subtree_range(params["category"])
+    return query_set.filter(category_path__gte=start, category_path__lt=end)
+
+
+def _location(query_set, params):
+    municipality = params["municipality"]
+    if "locality" in params:
+        key = build_location_key(municipality, params["locality"])
+        return query_set.filter(location_key=key)
+    return query_set.in_municipality(municipality)
+
+
+def _near(query_set, params):
+    # Subastas del mismo municipio que el usuario, primero las de su localidad.
+    return (
+        query_set.in_municipality(params["near_municipality"])
+        .annotate(
+            proximity=Case(
+                When(location_key=params["near"], then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField(),
+            )
+        )
+        .order_by("proximity", "closing_date")
+    )
+
+
+def _is_open(query_set, params):
+    if params["is_open"]:
+        return query_set.filter(closing_date__gte=timezone.now())
+    return query_set.filter(closing_date__lte=timezone.now())
+
+
+def _price(query_set, params):
+    if "priceMin" in params:
+        query_set = query_set.filter(price__gte=params["priceMin"])
+    if "priceMax" in params:
+        query_set = query_set.filter(price__lte=params["priceMax"])
+    return query_set
+
+
+def _search(query_set, params):
+    search = params["search"]
+    return query_set.filter(
+        Q(title__icontains=search) | Q(description__icontains=search)
+    )
+
+
+def _rating(query_set, params):
+    # Las subastas sin valoraciones tienen media 0 y no pasan el filtro.
+    return query_set.filter(rating_average__gte=params["rating"], rating_average__gt=0)
+
+
+def _ordering(query_set, params):
+    return query_set.order_by("-rating_score", "id")
+
+
+# (parámetros, función). _ordering va después de _near: su order_by sustituye
+# al de cercanía.
+FILTERS = [
+    (("category",), _category),
+    (("municipality",), _location),
+    (("near",), _near),
+    (("is_open",), _is_open),
+    (("priceMin", "priceMax"), _price),
+    (("search",), _search),
+    (("rating",), _rating),
+    (("ordering",), _ordering),
+]
+
+
+def apply_filters(query_set, params):
+    for names, apply in FILTERS:
+        if any(name in params for name in names):
+            query_set = apply(query_set, params)
+    return query_set
@@ -0,0 +1,180 @@
+"""
+Importación masiva de subastas (y de sus categorías) desde CSV o JSON.
+
+Las filas se leen en streaming, se validan por lotes con AuctionImportSerializer
+resolviendo las categorías una sola vez por lote, y cada lote se inserta con
+bulk_create dentro de su propia transacción. Tras cada lote confirmado se llama
+al callback de checkpoint con el número de la última fila procesada, de modo que
+una importación fallida se puede reanudar desde ahí con ``start``. Si falla a
+mitad (fichero mal formado o error de la BD) se lanza ImportInterrupted con el
+informe hasta el último lote confirmado; cualquier otra excepción es un error
+de programación y se propaga tal cual.
+"""
+
+import csv
+import json
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from rest_framework import serializers
+
+from .models import Auction, Category, build_location_key
+from .serializers import AuctionImportSerializer
+from .signals import invalidate_dashboard
+
+FORMATS = ("csv", "json")
+
+
+class ImportInterrupted(Exception):
+    """Importación cortada; ``report`` llega hasta el último lote guardado."""
+
+    def __init__(self, report, error):
+        super().__init__(str(error))
+        self.report = report
+        self.error = error
+
+
+class MalformedFile(ValueError):
+    """El fichero no se puede leer (CSV o JSON mal formado, codificación no UTF-8)."""
+
+
+def guess_format(name):
+    return "csv" if name.lower().endswith(".csv") else "json"
+
+
+def iter_rows(stream, fmt):
+    """Recorre las filas de un fichero de texto (CSV, array JSON o JSON lines)."""
+    if fmt == "csv":
+        return _iter_csv(stream)
+    if fmt == "json":
+        return _iter_json(stream)
+    raise ValueError(f"Formato no soportado: {fmt}")
+
+
+def _iter_csv(stream):
+    reader = csv.DictReader(stream)
+    try:
+        for row in reader:
+            # Las columnas vacías se tratan como ausentes (p. ej. rating opcional).
+            yield {key: value for key, value in row.items() if value not in ("", None)}
+    except csv.Error as exc:
+        # line_num cuenta las líneas ya leídas enteras: la que falla es la siguiente.
+        line = reader.line_num + 1
+        raise MalformedFile(f"CSV mal formado en la línea {line}: {exc}")
+
+
+def _iter_json(stream, chunk_size=64 * 1024):
+    # Acepta tanto un array JSON como objetos separados por saltos de línea, sin
+    # cargar el fichero entero en memoria.
+    decoder = json.JSONDecoder()
+    buffer = stream.read(chunk_size).lstrip()
+    in_array = buffer.startswith("[")
+    if in_array:
+        buffer = buffer[1:]
+    eof = False
+
+    while True:
+        buffer = buffer.lstrip()
+        if in_array:
+            buffer = buffer.lstrip(",").lstrip()
+            if buffer.startswith("]"):
+                return
+        if not buffer:
+            if eof:
+                return
+            buffer = stream.read(chunk_size)
+            eof = not buffer
+            continue
+        try:
+            row, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            more = "" if eof else stream.read(chunk_size)
+            if not more:
+                raise MalformedFile("JSON mal formado o incompleto.")
+            buffer += more
+            continue
+        yield row
+        buffer = buffer[end:]
+
+
+class AuctionImporter:
+    def __init__(self, auctioneer, chunk_size=2000, checkpoint=None):
+        self.auctioneer = auctioneer
+        self.chunk_size = chunk_size
+        self.checkpoint = checkpoint
+        self.validator = AuctionImportSerializer()
+
+    def run(self, rows, start=0):
+        """
+        Importa las filas a partir de la fila ``start`` (las filas se numeran
+        desde 1). Devuelve un informe con el número de subastas creadas, la última
+        fila procesada y los errores de validación por fila.
+        """
+        report = {"imported": 0, "last_row": start, "errors": []}
+        chunk = []
+        try:
+            for number, row in enumerate(rows, start=1):
+                if number <= start:
+                    continue
+                chunk.append((number, row))
+                if len(chunk) >= self.chunk_size:
+                    self._import_chunk(chunk, report)
+                    chunk = []
+            if chunk:
+                self._import_chunk(chunk, report)
+        except UnicodeDecodeError as exc:
+            error = MalformedFile(f"El fichero no está en UTF-8: {exc}")
+            raise ImportInterrupted(report, error) from exc
+        except (MalformedFile, DatabaseError) as exc:
+            raise ImportInterrupted(report, exc) from exc
+        finally:
+            if report["imported"]:
+                invalidate_dashboard(self.auctioneer.pk)
+        return report
+
+    def _import_chunk(self, chunk, report):
+        valid = []
+        for number, row in chunk:
+            try:
+                valid.append((number, self.validator.run_validation(row)))
+            except serializers.ValidationError as exc:
+                report["errors"].append({"row": number, "errors": exc.detail})
+
+        with transaction.atomic():
+            categories = self._resolve_categories(
+                {data["category"] for _, data in valid}
+            )
+            auctions = [self._build_auction(data, categories) for _, data in valid]
+            Auction.objects.bulk_create(auctions)
+
+        report["imported"] += len(auctions)
+        report["last_row"] = chunk[-1][0]
+        if self.checkpoint:
+            self.checkpoint(report["last_row"])
+
+    def _build_auction(self, data, categories):
+        # bulk_create no llama a save(), así que la clave de ubicación, la ruta
+        # de la categoría y la puntuación inicial se calculan aquí. Sin
+        # ubicación explícita se usa la del subastador.
+        if not data.get("municipality") and not data.get("locality"):
+            data["municipality"] = self.auctioneer.municipality
+            data["locality"] = self.auctioneer.locality
+        auction = Auction(
+            auctioneer=self.auctioneer,
+            **{**data, "category": categories[data["category"]]},
+        )
+        auction.location_key = build_location_key(
+            auction.municipality, auction.locality
+        )
+        auction.category_path = auction.category.path
+        auction.rating_score = settings.RATING_PRIOR_MEAN
+        return auction
+
+    def _resolve_categories(self, names):
+        categories = {c.name: c for c in Category.objects.filter(name__in=names)}
+        missing = names - categories.keys()
+        # Las categorías nuevas son pocas y necesitan save() para calcular su
+        # ruta en el árbol, así que no se crean con bulk_create.
+        for name in missing:
+            categories[name] = Category.objects.get_or_create(name=name)[0]
+        return categories
@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from auctions.archive import archive_closed_auctions
+
+
+class Command(BaseCommand):
+    help = (
+        "Archiva las subastas cerradas hace más del periodo de retención (con sus "
+        "pujas, valoraciones y comentarios)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--retention-days",
+            type=int,
+            default=settings.AUCTION_ARCHIVE_RETENTION.days,
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        archived = archive_closed_auctions(
+            retention=timedelta(days=options["retention_days"]),
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"{archived} subastas archivadas."))
@@ -0,0 +1,96 @@
+import itertools
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Max, Min
+from django.test.utils import CaptureQueriesContext
+from django.utils.http import urlencode
+
+from auctions.filters import apply_filters, filter_key, parse_params
+from auctions.models import Auction, Category
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark de los filtros del listado de subastas: prueba todas las "
+        "combinaciones de filtros con valores tomados de la BD y mide el COUNT "
+        "y la primera página de cada una."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--page-size", type=int, default=10)
+        parser.add_argument(
+            "--top", type=int, default=15, help="Combinaciones más lentas a mostrar."
+        )
+
+    def sample_filters(self):
+        """Un valor representativo para cada grupo de filtros."""
+        filters = {"is_open": {"is_open": "true"}, "rating": {"rating": "3"}}
+        category = Category.objects.filter(parent=None).order_by("id").first()
+        if category:
+            filters["category"] = {"category": str(category.id)}
+        municipality = (
+            Auction.objects.exclude(municipality="")
+            .values_list("municipality", flat=True)
+            .first()
+        )
+        if municipality:
+            filters["municipality"] = {"municipality": municipality}
+        prices = Auction.objects.aggregate(low=Min("price"), high=Max("price"))
+        if prices["low"] is not None:
+            middle = (prices["low"] + prices["high"]) / 2
+            filters["price"] = {
+                "priceMin": str(prices["low"]),
+                "priceMax": str(middle.quantize(prices["low"])),
+            }
+        title = Auction.objects.values_list("title", flat=True).first()
+        if title and len(title) >= 3:
+            filters["search"] = {"search": title[:3]}
+        return filters
+
+    def measure(self, params, runs, page_size):
+        samples = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            with CaptureQueriesContext(connection) as queries:
+                query_set = apply_filters(Auction.objects.with_ratings(), params)
+                count = query_set.count()
+                list(query_set[:page_size])
+            samples.append(time.perf_counter() - start)
+        return statistics.median(samples) * 1000, count, len(queries)
+
+    def handle(self, *args, **options):
+        filters = self.sample_filters()
+        names = sorted(filters)
+        self.stdout.write(f"Filtros: {', '.join(names)}")
+        results = []
+        seen = set()
+        for size in range(len(names) + 1):
+            for combination in itertools.combinations(names, size):
+                raw = {}
+                for name in combination:
+                    raw.update(filters[name])
+                params = parse_params(raw)
+                key = filter_key(params)
+                if key in seen:
+                    continue
+                seen.add(key)
+                elapsed, count, queries = self.measure(
+                    params, options["runs"], options["page_size"]
+                )
+                results.append((elapsed, count, queries, urlencode(raw)))
+
+        times = [result[0] for result in results]
+        self.stdout.write(
+            f"{len(results)} combinaciones: mediana {statistics.median(times):.2f} ms, "
+            f"máx {max(times):.2f} ms"
+        )
+        results.sort(reverse=True)
+        for elapsed, count, queries, query in results[: options["top"]]:
+            self.stdout.write(
+                f"  {elapsed:8.2f} ms  {count:6d} filas  {queries} consultas  "
+                f"?{query or '(sin filtros)'}"
+            )
@@ -0,0 +1,77 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Se ejecuta en un proceso nuevo: arranca la aplicación WSGI, opcionalmente la
+# calienta como haría post_fork y atiende una petición GET.
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+from wsgiref.util import setup_testing_defaults
+application = get_wsgi_application()
+booted = time.perf_counter()
+if sys.argv[2] == "1":
+    from myApiFinalProyect.warmup import warm_up
+    warm_up()
+warmed = time.perf_counter()
+environ = {"PATH_INFO": sys.argv[1], "REQUEST_METHOD": "GET"}
+setup_testing_defaults(environ)
+status = []
+body = b"".join(application(environ, lambda s, h, e=None: status.append(s)))
+done = time.perf_counter()
+print(json.dumps({
+    "status": status[0], "boot": booted - start, "warmup": warmed - booted,
+    "request": done - warmed, "total": done - start,
+}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark de arranque en frío: lanza varios procesos nuevos y mide el "
+        "tiempo hasta la primera respuesta (arranque, calentamiento y petición)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--path", default="/api/auctions/categories/")
+        parser.add_argument(
+            "--no-warmup",
+            action="store_true",
+            help="No llama a warm_up() antes de la primera petición.",
+        )
+
+    def handle(self, *args, **options):
+        warm = "0" if options["no_warmup"] else "1"
+        samples = []
+        for _ in range(options["runs"]):
+            start = time.perf_counter()
+            result = subprocess.run(
+                [sys.executable, "-c", PROBE, options["path"], warm],
+                cwd=settings.BASE_DIR,
+                env=os.environ.copy(),
+                capture_output=True,
+                text=True,
+            )
+            wall = time.perf_counter() - start
+            if result.returncode:
+                self.stderr.write(result.stderr[-2000:])
+                return
+            sample = json.loads(result.stdout.splitlines()[-1])
+            sample["wall"] = wall
+            samples.append(sample)
+
+        self.stdout.write(f"GET {options['path']} -> {samples[0]['status']}")
+        for key in ("boot", "warmup", "request", "total", "wall"):
+            values = [sample[key] * 1000 for sample in samples]
+            self.stdout.write(
+                f"  {key:8} mediana {statistics.median(values):7.1f} ms  "
+                f"min {min(values):7.1f} ms  max {max(values):7.1f} ms"
+            )
@@ -0,0 +1,103 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from auctions.models import Auction, Bid
+from auctions.serializers import AuctionListCreateSerializer, BidsListCreateSerializer
+from myApiFinalProyect.compression import ENCODERS, compress
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark de las respuestas de los listados de subastas y de pujas: "
+        "bytes enviados y CPU de codificación por tamaño de página, con cada "
+        "formato (JSON, MessagePack, CBOR) y compresión disponibles. Si la BD "
+        "tiene menos filas que la página, se repiten."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes", default="20,100,500", help="Tamaños de página (p. ej. 20,100)."
+        )
+        parser.add_argument("--runs", type=int, default=5)
+
+    def fill(self, rows, size):
+        return (rows * (size // len(rows) + 1))[:size] if rows else []
+
+    def pages(self, size):
+        """Datos de una página de cada listado, como los devuelve la paginación."""
+        request = Request(APIRequestFactory().get("/api/auctions/"))
+        context = {"request": request}
+        auctions = list(Auction.objects.with_ratings()[:size])
+        bids = []
+        for query_set in Bid.objects.on_shards():
+            bids += query_set.select_related("bidder")[: size - len(bids)]
+        listings = {
+            "auctions": AuctionListCreateSerializer(
+                self.fill(auctions, size), many=True, context=context
+            ).data,
+            "bids": BidsListCreateSerializer(
+                self.fill(bids, size), many=True, context=context
+            ).data,
+        }
+        return {
+            name: {"count": size, "next": None, "previous": None, "results": results}
+            for name, results in listings.items()
+        }
+
+    def cpu_ms(self, function, runs):
+        samples = []
+        for _ in range(runs):
+            start = time.process_time()
+            result = function()
+            samples.append(time.process_time() - start)
+        return result, statistics.median(samples) * 1000
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options["sizes"].split(",")]
+        except ValueError:
+            raise CommandError("--sizes debe ser una lista de números.")
+        runs = options["runs"]
+        renderers = [
+            renderer()
+            for renderer in map(import_string, settings.API_RENDERER_CLASSES)
+            if not issubclass(renderer, BrowsableAPIRenderer)
+        ]
+        encodings = [e for e in settings.COMPRESSION_ENCODINGS if e in ENCODERS]
+        self.stdout.write(
+            f"Formatos: {', '.join(r.format for r in renderers)}; "
+            f"compresión: {', '.join(encodings)}"
+        )
+        self.stdout.write(
+            f"{'listado':8} {'página':>6} {'formato':8} {'codificación':12} "
+            f"{'bytes':>10} {'CPU ms':>8}"
+        )
+        for size in sizes:
+            for name, data in self.pages(size).items():
+                for renderer in renderers:
+                    body, render_ms = self.cpu_ms(lambda: renderer.render(data), runs)
+                    self.row(name, size, renderer.format, "identity", body, render_ms)
+                    for encoding in encodings:
+                        compressed, ms = self.cpu_ms(
+                            lambda: compress(encoding, body), runs
+                        )
+                        self.row(
+                            name,
+                            size,
+                            renderer.format,
+                            encoding,
+                            compressed,
+                            render_ms + ms,
+                        )
+
+    def row(self, name, size, fmt, encoding, body, ms):
+        self.stdout.write(
+            f"{name:8} {size:6d} {fmt:8} {encoding:12} {len(body):10d} {ms:8.2f}"
+        )
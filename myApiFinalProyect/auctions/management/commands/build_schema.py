@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from myApiFinalProyect.schema import render_schema, schema_hash, write_schema
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera el esquema OpenAPI y lo guarda en SCHEMA_PATH con su sha256. "
+        "Con --check solo comprueba que el fichero guardado está al día."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true")
+
+    def handle(self, *args, **options):
+        if "drf_spectacular" not in settings.INSTALLED_APPS:
+            raise CommandError("build_schema necesita DJANGO_ENABLE_SCHEMA=1.")
+        content = render_schema()
+        digest = schema_hash(content)
+        path = settings.SCHEMA_PATH
+
+        if options["check"]:
+            try:
+                stored = path.read_bytes()
+            except FileNotFoundError:
+                raise CommandError(f"No existe {path}.")
+            if schema_hash(stored) != digest:
+                raise CommandError(
+                    f"{path} está desactualizado; ejecuta manage.py build_schema."
+                )
+            self.stdout.write(self.style.SUCCESS(f"Esquema al día ({digest[:12]})."))
+            return
+
+        write_schema(content, path)
+        self.stdout.write(
+            self.style.SUCCESS(f"Esquema escrito en {path} ({digest[:12]}).")
+        )
@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from auctions.models import Auction
+from auctions.thumbnails import cache_thumbnail
+
+
+class Command(BaseCommand):
+    help = (
+        "Descarga y procesa las miniaturas de las subastas que aún no están "
+        "cacheadas o han cambiado. Las peticiones no descargan nada: con --loop "
+        "este comando es quien mantiene la caché al día."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=None)
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Sigue esperando miniaturas nuevas en lugar de terminar.",
+        )
+        parser.add_argument("--interval", type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        while True:
+            cached, failed = self.cache_pending(options["limit"])
+            if cached or failed or not options["loop"]:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"{cached} miniaturas cacheadas, {failed} fallidas."
+                    )
+                )
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
+
+    def cache_pending(self, limit):
+        # Subastas a las que se les ha quitado la miniatura: no hay nada que
+        # descargar, solo olvidar las variantes de la anterior.
+        Auction.objects.filter(thumbnail="").exclude(thumbnail_source="").update(
+            thumbnail_source="", thumbnail_variants={}
+        )
+        pending = Auction.objects.exclude(thumbnail_source=F("thumbnail")).only(
+            "id", "thumbnail", "thumbnail_source", "thumbnail_variants"
+        )
+        if limit:
+            pending = pending[:limit]
+        cached = failed = 0
+        for auction in pending.iterator():
+            if cache_thumbnail(auction):
+                cached += 1
+            else:
+                failed += 1
+        return cached, failed
@@ -0,0 +1,82 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from auctions.importer import (
+    FORMATS,
+    AuctionImporter,
+    ImportInterrupted,
+    guess_format,
+    iter_rows,
+)
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = "Importa subastas (y sus categorías) desde un fichero CSV o JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Fichero CSV, array JSON o JSON lines.")
+        parser.add_argument(
+            "--auctioneer", required=True, help="Username del subastador."
+        )
+        parser.add_argument("--format", choices=FORMATS)
+        parser.add_argument("--chunk-size", type=int, default=2000)
+        parser.add_argument(
+            "--checkpoint",
+            help="Fichero donde guardar la última fila importada "
+            "(por defecto <path>.checkpoint).",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Continúa desde la fila guardada en el checkpoint.",
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        fmt = options["format"] or guess_format(path.name)
+        checkpoint = Path(options["checkpoint"] or f"{path}.checkpoint")
+
+        try:
+            auctioneer = CustomUser.objects.get(username=options["auctioneer"])
+        except CustomUser.DoesNotExist:
+            raise CommandError(f"No existe el usuario {options['auctioneer']}.")
+
+        source = str(path.resolve())
+        start = 0
+        if options["resume"] and checkpoint.exists():
+            saved = json.loads(checkpoint.read_text())
+            if saved["source"] != source:
+                raise CommandError(
+                    f"El checkpoint {checkpoint} es del fichero {saved['source']}: "
+                    "no se puede reanudar con otro."
+                )
+            start = saved["row"]
+            self.stdout.write(f"Reanudando después de la fila {start}.")
+
+        def save_checkpoint(row):
+            checkpoint.write_text(json.dumps({"source": source, "row": row}))
+
+        importer = AuctionImporter(
+            auctioneer, chunk_size=options["chunk_size"], checkpoint=save_checkpoint
+        )
+        with path.open(newline="", encoding="utf-8") as stream:
+            try:
+                report = importer.run(iter_rows(stream, fmt), start=start)
+            except ImportInterrupted as exc:
+                raise CommandError(
+                    f"{exc} (última fila guardada: {exc.report['last_row']}; "
+                    "usa --resume para continuar)."
+                )
+
+        for error in report["errors"]:
+            self.stderr.write(f"Fila {error['row']}: {json.dumps(error['errors'])}")
+        checkpoint.unlink(missing_ok=True)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{report['imported']} subastas importadas, "
+                f"{len(report['errors'])} filas con errores."
+            )
+        )
@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from auctions.bid_shards import db_for_auction, reserve_ids, shards
+from auctions.models import Bid
+
+
+class Command(BaseCommand):
+    help = (
+        "Coloca cada puja en la base de datos que le toca según BID_SHARDS. "
+        "Para repartir una tabla existente: definir DJANGO_BID_SHARDS, ejecutar "
+        "migrate --database <alias> en cada alias nuevo y después este comando. "
+        "Es seguro relanzarlo si se interrumpe."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Solo cuenta las pujas que habría que mover.",
+        )
+
+    def handle(self, *args, **options):
+        if not settings.BID_SHARDS:
+            raise CommandError("BID_SHARDS está vacío: no hay nada que repartir.")
+        batch_size = options["batch_size"]
+        dry_run = options["dry_run"]
+
+        if not dry_run:
+            for alias in shards():
+                try:
+                    start = reserve_ids(alias)
+                except NotImplementedError as error:
+                    raise CommandError(str(error))
+                if start:
+                    self.stdout.write(f"{alias}: ids nuevos desde {start}")
+
+        sources = shards()
+        if DEFAULT_DB_ALIAS not in sources:
+            sources = [DEFAULT_DB_ALIAS, *sources]
+        for source in sources:
+            auction_ids = [
+                auction_id
+                for auction_id in Bid.objects.using(source)
+                .order_by()
+                .values_list("auction", flat=True)
+                .distinct()
+                if db_for_auction(auction_id) != source
+            ]
+            if dry_run:
+                misplaced = Bid.objects.using(source).filter(auction__in=auction_ids)
+                self.stdout.write(
+                    f"{source}: {misplaced.count()} pujas de {len(auction_ids)} "
+                    "subastas fuera de su sitio"
+                )
+                continue
+            moved = sum(
+                self.move(source, auction_id, batch_size) for auction_id in auction_ids
+            )
+            self.stdout.write(f"{source}: {moved} pujas movidas")
+
+    def move(self, source, auction_id, batch_size):
+        target = db_for_auction(auction_id)
+        bids = Bid.objects.using(source).filter(auction=auction_id).order_by("id")
+        moved = 0
+        while batch := list(bids[:batch_size]):
+            # Primero se copia (con el mismo id) y luego se borra del origen: si
+            # se corta a medias, la copia ya hecha se ignora al relanzar.
+            Bid.objects.using(target).bulk_create(batch, ignore_conflicts=True)
+            with transaction.atomic(using=source):
+                Bid.objects.using(source).filter(
+                    id__in=[bid.id for bid in batch]
+                ).delete()
+            moved += len(batch)
+        return moved
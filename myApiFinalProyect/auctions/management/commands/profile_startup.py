@@ -0,0 +1,73 @@
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Lo que hace un worker hasta poder atender la primera petición.
+BOOT = (
+    "from django.core.wsgi import get_wsgi_application\n"
+    "get_wsgi_application()\n"
+    "from django.urls import get_resolver\n"
+    "get_resolver().reverse_dict\n"
+)
+
+
+def parse_importtime(output):
+    """Devuelve (módulo, propio µs, acumulado µs) de la salida de -X importtime."""
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:") :].split("|")
+        rows.append((name.strip(), int(own), int(cumulative)))
+    return rows
+
+
+def package_of(module):
+    parts = module.split(".")
+    # django.contrib.<app> se desglosa para ver el coste del admin, auth...
+    if parts[:2] == ["django", "contrib"] and len(parts) > 2:
+        return ".".join(parts[:3])
+    return parts[0]
+
+
+class Command(BaseCommand):
+    help = (
+        "Perfil de importación del arranque de un worker (WSGI + URL conf) con "
+        "python -X importtime: tiempo propio por paquete y los módulos más caros."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=20)
+
+    def handle(self, *args, **options):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", BOOT],
+            cwd=settings.BASE_DIR,
+            env=os.environ.copy(),
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode:
+            self.stderr.write(result.stderr[-2000:])
+            return
+        rows = parse_importtime(result.stderr)
+        top = options["top"]
+
+        packages = {}
+        for module, own, _ in rows:
+            package = package_of(module)
+            packages[package] = packages.get(package, 0) + own
+        total = sum(packages.values())
+
+        self.stdout.write(
+            f"Total importaciones: {total / 1000:.1f} ms ({len(rows)} módulos)"
+        )
+        self.stdout.write("\nPor paquete (tiempo propio):")
+        for package, own in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+            self.stdout.write(f"  {own / 1000:8.1f} ms  {package}")
+        self.stdout.write("\nMódulos más caros (tiempo acumulado):")
+        for module, _, cumulative in sorted(rows, key=lambda row: -row[2])[:top]:
+            self.stdout.write(f"  {cumulative / 1000:8.1f} ms  {module}")
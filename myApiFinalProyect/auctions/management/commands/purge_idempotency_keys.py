@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from auctions.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "Borra por lotes las respuestas de Idempotency-Key caducadas."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - settings.IDEMPOTENCY_KEY_TTL
+        expired = IdempotencyKey.objects.filter(created_at__lt=cutoff)
+        purged = 0
+        while True:
+            ids = list(expired.values_list("id", flat=True)[: options["batch_size"]])
+            if not ids:
+                break
+            purged += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f"{purged} claves caducadas borradas."))
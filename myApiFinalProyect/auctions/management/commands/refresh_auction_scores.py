@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from auctions.feeds import refresh_scores
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula la puntuación hot de las subastas abiertas (pujas en la "
+        "ventana, pujadores únicos, valoración) y borra las de las cerradas. "
+        "Pensado para ejecutarse periódicamente (cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        updated = refresh_scores(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"{updated} puntuaciones actualizadas."))
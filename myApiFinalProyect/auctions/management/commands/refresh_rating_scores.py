@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from auctions.ratings import refresh_ratings
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula desde Rating el histograma, la media y la puntuación "
+        "bayesiana de todas las subastas. Las señales las mantienen al día; "
+        "hace falta tras cambiar RATING_PRIOR_MEAN o RATING_PRIOR_WEIGHT."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        updated = refresh_ratings(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"{updated} subastas recalculadas."))
@@ -0,0 +1,36 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from auctions.analytics import run_rollup
+
+
+class Command(BaseCommand):
+    help = (
+        "Calcula los resúmenes diarios de la analítica de administración desde "
+        "el último día completo resumido hasta hoy. Pensado para ejecutarse "
+        "periódicamente (cron); el día en curso se recalcula en cada ejecución."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            help="Recalcula desde este día (AAAA-MM-DD) aunque ya esté resumido.",
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            try:
+                since = date.fromisoformat(options["since"])
+            except ValueError:
+                raise CommandError("--since debe tener el formato AAAA-MM-DD.")
+        days = run_rollup(since=since)
+        if days:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{len(days)} días resumidos ({days[0]} a {days[-1]})."
+                )
+            )
+        else:
+            self.stdout.write("No hay días que resumir.")
@@ -0,0 +1,48 @@
+import multiprocessing
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from auctions import bid_shards
+from auctions.bid_engine import serve_shard, shard_address
+
+
+class Command(BaseCommand):
+    help = (
+        "Arranca el motor de pujas en memoria: un proceso por shard "
+        "(BID_ENGINE_SHARDS), cada uno con las subastas cuyo id le corresponde."
+    )
+
+    def handle(self, *args, **options):
+        if settings.BID_ENGINE_SHARDS % len(bid_shards.shards()):
+            raise CommandError(
+                "BID_ENGINE_SHARDS debe ser múltiplo del número de BID_SHARDS."
+            )
+        # Los hijos abren sus propias conexiones a la BD.
+        connections.close_all()
+        context = multiprocessing.get_context("fork")
+        processes = [
+            context.Process(target=serve_shard, args=(number,), name=f"shard-{number}")
+            for number in range(settings.BID_ENGINE_SHARDS)
+        ]
+        for number, process in enumerate(processes):
+            process.start()
+            host, port = shard_address(number)
+            self.stdout.write(f"Shard {number} (pid {process.pid}) en {host}:{port}")
+
+        def stop(*args):
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+
+        signal.signal(signal.SIGTERM, stop)
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            stop()
+            for process in processes:
+                process.join()
+        self.stdout.write("Motor de pujas detenido.")
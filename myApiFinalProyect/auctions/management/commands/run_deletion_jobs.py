@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from auctions.cascade import run_pending_jobs
+from auctions.models import DeletionJob
+
+
+class Command(BaseCommand):
+    help = (
+        "Procesa los borrados en cascada pendientes de usuarios y subastas, por "
+        "lotes y mostrando el progreso. Retoma también los trabajos en curso "
+        "cuyo proceso ha dejado de renovar la reserva (DELETION_JOB_LEASE)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Sigue esperando trabajos nuevos en lugar de terminar.",
+        )
+        parser.add_argument("--interval", type=float, default=5.0)
+        parser.add_argument(
+            "--retry-failed",
+            action="store_true",
+            help="Vuelve a encolar los trabajos fallidos antes de empezar.",
+        )
+
+    def handle(self, *args, **options):
+        if options["retry_failed"]:
+            DeletionJob.objects.filter(status=DeletionJob.FAILED).update(
+                status=DeletionJob.PENDING, error=""
+            )
+
+        while True:
+            for job in run_pending_jobs(report=self.report):
+                style = (
+                    self.style.SUCCESS
+                    if job.status == DeletionJob.DONE
+                    else self.style.ERROR
+                )
+                self.stdout.write(
+                    style(
+                        f"Trabajo {job.id} ({job.target_type} {job.target_id}): "
+                        f"{job.status}, {job.deleted_rows} filas borradas. {job.error}"
+                    )
+                )
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
+
+    def report(self, job, model, deleted):
+        self.stdout.write(
+            f"Trabajo {job.id}: {deleted} {model._meta.verbose_name_plural} borrados "
+            f"({job.deleted_rows} en total)"
+        )
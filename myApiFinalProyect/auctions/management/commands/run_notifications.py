@@ -0,0 +1,34 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from auctions.notifications import run_tick
+
+
+class Command(BaseCommand):
+    help = (
+        "Calcula los avisos de la lista de seguimiento (pujas superadas y "
+        "subastas a punto de cerrar) y los entrega agrupados por usuario."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Ejecuta un tick cada --interval segundos en lugar de terminar.",
+        )
+        parser.add_argument(
+            "--interval", type=float, default=settings.NOTIFICATION_INTERVAL
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        while True:
+            start = time.perf_counter()
+            users = run_tick(batch_size=options["batch_size"])
+            elapsed = (time.perf_counter() - start) * 1000
+            self.stdout.write(f"{users} usuarios notificados ({elapsed:.0f} ms)")
+            if not options["loop"]:
+                return
+            time.sleep(max(0, options["interval"] - elapsed / 1000))
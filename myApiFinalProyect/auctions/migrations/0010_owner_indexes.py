@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0009_comentario'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='rating',
+            options={'ordering': ('-valor_numerico',)},
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(fields=['auctioneer', 'closing_date'], name='auctions_au_auction_676eaa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(fields=['auctioneer', 'creation_date'], name='auctions_au_auction_647fb8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comentario',
+            index=models.Index(fields=['usuario', 'fecha_creacion'], name='auctions_co_usuario_5e274e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rating',
+            index=models.Index(fields=['user', 'valor_numerico'], name='auctions_ra_user_id_c3c7f9_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:05
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def copy_location_from_auctioneer(apps, schema_editor):
+    Auction = apps.get_model('auctions', 'Auction')
+    auctions = Auction.objects.select_related('auctioneer').only(
+        'id', 'auctioneer__locality', 'auctioneer__municipality'
+    )
+    batch = []
+    for auction in auctions.iterator(chunk_size=2000):
+        auction.locality = auction.auctioneer.locality
+        auction.municipality = auction.auctioneer.municipality
+        auction.location_key = f"{slugify(auction.municipality)}/{slugify(auction.locality)}"
+        batch.append(auction)
+        if len(batch) >= 2000:
+            Auction.objects.bulk_update(batch, ['locality', 'municipality', 'location_key'])
+            batch = []
+    Auction.objects.bulk_update(batch, ['locality', 'municipality', 'location_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0010_owner_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auction',
+            name='locality',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='auction',
+            name='location_key',
+            field=models.CharField(blank=True, editable=False, max_length=205),
+        ),
+        migrations.AddField(
+            model_name='auction',
+            name='municipality',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(fields=['location_key', 'closing_date'], name='auctions_au_locatio_92fdae_idx'),
+        ),
+        migrations.RunPython(copy_location_from_auctioneer, migrations.RunPython.noop),
+    ]
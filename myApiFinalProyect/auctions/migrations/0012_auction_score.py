@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0011_auction_location'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuctionScore',
+            fields=[
+                ('auction', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='score', serialize=False, to='auctions.auction')),
+                ('bids_last_hour', models.IntegerField(default=0)),
+                ('unique_bidders', models.IntegerField(default=0)),
+                ('avg_rating', models.DecimalField(decimal_places=2, default=0, max_digits=3)),
+                ('score', models.FloatField(default=0)),
+                ('closing_date', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ('-score',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(fields=['closing_date'], name='auctions_au_closing_6e74b9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auctionscore',
+            index=models.Index(fields=['-score'], name='auctions_au_score_c5f467_idx'),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_paths_and_counts(apps, schema_editor):
+    # Los comentarios existentes son todos de primer nivel.
+    Auction = apps.get_model('auctions', 'Auction')
+    Comentario = apps.get_model('auctions', 'Comentario')
+    batch = []
+    for comment in Comentario.objects.only('id').iterator(chunk_size=2000):
+        comment.path = f'{comment.pk:010d}/'
+        batch.append(comment)
+    Comentario.objects.bulk_update(batch, ['path'], batch_size=1000)
+
+    counts = (
+        Comentario.objects.filter(auction=OuterRef('pk'))
+        .order_by()
+        .values('auction')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    Auction.objects.update(comment_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0012_auction_score'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='comentario',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='auction',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comentario',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comentario',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='auctions.comentario'),
+        ),
+        migrations.AddField(
+            model_name='comentario',
+            name='path',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='comentario',
+            index=models.Index(fields=['auction', 'fecha_creacion'], name='auctions_co_auction_9e3fe8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comentario',
+            index=models.Index(fields=['auction', 'path'], name='auctions_co_auction_d1f7e3_idx'),
+        ),
+        migrations.RunPython(backfill_paths_and_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0013_threaded_comments'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedAuction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('auction_id', models.BigIntegerField(unique=True)),
+                ('auctioneer_id', models.BigIntegerField(db_index=True)),
+                ('category_id', models.BigIntegerField()),
+                ('title', models.CharField(max_length=150)),
+                ('closing_date', models.DateTimeField(db_index=True)),
+                ('final_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('bid_count', models.PositiveIntegerField(default=0)),
+                ('rating_count', models.PositiveIntegerField(default=0)),
+                ('comment_count', models.PositiveIntegerField(default=0)),
+                ('payload', models.BinaryField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ('-closing_date',),
+            },
+        ),
+        migrations.AddField(
+            model_name='auction',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0015_deletion_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auction',
+            name='thumbnail_source',
+            field=models.URLField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='auction',
+            name='thumbnail_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0016_thumbnail_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auction',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name='bid',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comentario',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
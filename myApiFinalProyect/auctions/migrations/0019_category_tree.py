@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_paths(apps, schema_editor):
+    # Las categorías existentes son todas de primer nivel.
+    Auction = apps.get_model('auctions', 'Auction')
+    Category = apps.get_model('auctions', 'Category')
+    for category in Category.objects.only('id'):
+        path = f'{category.pk:010d}/'
+        Category.objects.filter(pk=category.pk).update(path=path)
+        Auction.objects.filter(category=category.pk).update(category_path=path)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0018_watchlist_notifications'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auction',
+            name='category_path',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='children', to='auctions.category'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(fields=['category_path', 'closing_date'], name='auctions_au_categor_d863f5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['path'], name='auctions_ca_path_246413_idx'),
+        ),
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+    ]
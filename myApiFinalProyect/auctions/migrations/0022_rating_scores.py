@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:41
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_ratings(apps, schema_editor):
+    Auction = apps.get_model('auctions', 'Auction')
+    Rating = apps.get_model('auctions', 'Rating')
+    histograms = {}
+    rows = Rating.objects.order_by().values_list('auction', 'valor_numerico').annotate(count=Count('id'))
+    for auction_id, value, count in rows:
+        histograms.setdefault(auction_id, {})[value] = count
+    weight = settings.RATING_PRIOR_WEIGHT
+    prior = weight * settings.RATING_PRIOR_MEAN
+    Auction.objects.update(rating_score=settings.RATING_PRIOR_MEAN)
+    for auction_id, histogram in histograms.items():
+        count = sum(histogram.values())
+        total = sum(value * n for value, n in histogram.items())
+        Auction.objects.filter(pk=auction_id).update(
+            rating_average=total / count,
+            rating_score=(prior + total) / (weight + count),
+            **{f'ratings_{value}': n for value, n in histogram.items()},
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0021_idempotency_keys'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auction',
+            name='rating_average',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='auction',
+            name='rating_score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='auction',
+            name='ratings_1',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='auction',
+            name='ratings_2',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='auction',
+            name='ratings_3',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='auction',
+            name='ratings_4',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='auction',
+            name='ratings_5',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(fields=['-rating_score', 'id'], name='auctions_au_rating__6e4687_idx'),
+        ),
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+    ]
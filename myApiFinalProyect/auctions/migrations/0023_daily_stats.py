@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0022_rating_scores'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyCategoryStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('bids', models.PositiveIntegerField(default=0)),
+                ('gmv', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'ordering': ('day', 'category'),
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('gmv', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('sold_auctions', models.PositiveIntegerField(default=0)),
+                ('bids', models.PositiveIntegerField(default=0)),
+                ('new_users', models.PositiveIntegerField(default=0)),
+                ('new_auctions', models.PositiveIntegerField(default=0)),
+                ('active_auctions', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ('day',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='bid',
+            index=models.Index(fields=['created_date'], name='auctions_bi_created_7be452_idx'),
+        ),
+        migrations.AddField(
+            model_name='dailycategorystats',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='auctions.category'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailycategorystats',
+            constraint=models.UniqueConstraint(fields=('day', 'category'), name='unique_daily_category_stats'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:34
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0024_deletion_job_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='bid',
+            name='created_date',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,37 @@
+import unicodedata
+
+from django.db import migrations
+from django.utils.text import slugify
+
+
+def location_slug(name):
+    decomposed = unicodedata.normalize('NFKD', name)
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return slugify(stripped, allow_unicode=True)
+
+
+def rebuild_location_keys(apps, schema_editor):
+    # Las claves de ubicaciones con letras no latinas se calculaban vacías.
+    Auction = apps.get_model('auctions', 'Auction')
+    auctions = Auction.objects.only('id', 'municipality', 'locality', 'location_key')
+    batch = []
+    for auction in auctions.iterator(chunk_size=2000):
+        key = f"{location_slug(auction.municipality)}/{location_slug(auction.locality)}"
+        if key != auction.location_key:
+            auction.location_key = key
+            batch.append(auction)
+        if len(batch) >= 2000:
+            Auction.objects.bulk_update(batch, ['location_key'])
+            batch = []
+    Auction.objects.bulk_update(batch, ['location_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0025_bid_created_date_default'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_location_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,187 @@
+import hashlib
+import json
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+from . import write_queue
+from .models import IdempotencyKey, UpdateConditionFailed, VersionConflict
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = "El recurso ha cambiado; vuelve a leerlo y repite la petición."
+    default_code = "precondition_failed"
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = "La Idempotency-Key ya se ha usado con otra petición."
+    default_code = "idempotency_key_reused"
+
+
+def etag(instance):
+    return f'"{instance.version}"'
+
+
+def parse_if_match(header):
+    """Versiones aceptadas por la cabecera If-Match (None equivale a "*")."""
+    if header is None or header.strip() == "*":
+        return None
+    versions = set()
+    for tag in header.split(","):
+        tag = tag.strip().removeprefix("W/").strip('"')
+        if tag.isdigit():
+            versions.add(int(tag))
+    return versions
+
+
+class OptimisticUpdateMixin:
+    """
+    PUT/PATCH con concurrencia optimista para vistas de modelos VersionedModel.
+
+    Las respuestas llevan la versión en la cabecera ETag. Si la petición trae
+    If-Match, debe coincidir con la versión actual; en cualquier caso el UPDATE
+    solo se aplica si la fila sigue en la versión que se leyó, y si otro cliente
+    la ha cambiado entre medias se responde 412.
+    """
+
+    update_condition_error = None
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data, headers={"ETag": etag(instance)})
+
+    def update(self, request, *args, **kwargs):
+        partial = kwargs.pop("partial", False)
+        instance = self.get_object()
+        versions = parse_if_match(request.headers.get("If-Match"))
+        if versions is not None and instance.version not in versions:
+            raise PreconditionFailed()
+        instance.expected_version = instance.version
+
+        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        try:
+            self.perform_update(serializer)
+        except VersionConflict:
+            raise PreconditionFailed()
+        except UpdateConditionFailed:
+            raise ValidationError(self.update_condition_error)
+
+        if getattr(instance, "_prefetched_objects_cache", None):
+            instance._prefetched_objects_cache = {}
+        return Response(serializer.data, headers={"ETag": etag(instance)})
+
+
+def request_fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(f"{request.path}\n{body}".encode()).hexdigest()
+
+
+class IdempotentCreateMixin:
+    """
+    POST idempotente con la cabecera Idempotency-Key.
+
+    La primera petición con una clave guarda su respuesta en IdempotencyKey en
+    la misma transacción que la inserción; los reintentos con la misma clave
+    (del mismo usuario y durante IDEMPOTENCY_KEY_TTL) reciben esa respuesta sin
+    volver a validar ni crear nada. Solo se guardan las respuestas correctas:
+    si la primera falló no se creó nada y el reintento se procesa de nuevo.
+    """
+
+    def create(self, request, *args, **kwargs):
+        create = super().create
+        return self.idempotent(request, lambda: create(request, *args, **kwargs))
+
+    def idempotent(self, request, create):
+        """Ejecuta ``create()`` (que devuelve la respuesta) bajo la Idempotency-Key."""
+        key = request.headers.get("Idempotency-Key")
+        if key is None or not request.user.is_authenticated:
+            return create()
+        if not key or len(key) > IdempotencyKey._meta.get_field("key").max_length:
+            raise ValidationError({"Idempotency-Key": "Clave no válida."})
+
+        fingerprint = request_fingerprint(request)
+        try:
+            with ExitStack() as atomic:
+                # "default" se abre primero y confirma el último: si falla, la
+                # clave no queda guardada y el reintento se vuelve a procesar.
+                atomic.enter_context(transaction.atomic())
+                for using in set(self.get_write_databases()) - {DEFAULT_DB_ALIAS}:
+                    atomic.enter_context(transaction.atomic(using=using))
+                stored = self.stored_response(request.user, key)
+                if stored is not None:
+                    return self.replay(stored, fingerprint)
+                response = create()
+                if status.is_success(response.status_code):
+                    IdempotencyKey.objects.create(
+                        user=request.user,
+                        key=key,
+                        fingerprint=fingerprint,
+                        status_code=response.status_code,
+                        response=response.data,
+                    )
+                return response
+        except IntegrityError:
+            # Una petición concurrente con la misma clave se confirmó antes: la
+            # inserción de esta se ha deshecho y se responde como un reintento.
+            stored = self.stored_response(request.user, key)
+            if stored is None:
+                raise
+            return self.replay(stored, fingerprint)
+
+    def get_write_databases(self):
+        """Bases de datos, además de "default", en las que escribe la vista."""
+        return []
+
+    def stored_response(self, user, key):
+        stored = IdempotencyKey.objects.filter(user=user, key=key).first()
+        if stored is not None and stored.created_at < (
+            timezone.now() - settings.IDEMPOTENCY_KEY_TTL
+        ):
+            # Caducada: la clave se puede reutilizar.
+            stored.delete()
+            return None
+        return stored
+
+    def replay(self, stored, fingerprint):
+        if stored.fingerprint != fingerprint:
+            raise IdempotencyKeyReused()
+        return Response(
+            stored.response,
+            status=stored.status_code,
+            headers={"Idempotent-Replayed": "true"},
+        )
+
+
+class QueuedCreateMixin:
+    """
+    POST cuyo save() se escribe a través de la cola de escritura del proceso
+    (auctions/write_queue.py); la validación y la respuesta se hacen en el hilo
+    de la petición. perform_create() llama a save_queued() en lugar de a
+    serializer.save(). Con Idempotency-Key la petición ya está en la transacción
+    de IdempotentCreateMixin, que tiene que confirmar la inserción junto con la
+    respuesta guardada, y el save() se hace en el sitio.
+    """
+
+    def save_queued(self, serializer, check=None, **kwargs):
+        """
+        serializer.save(**kwargs) en el hilo escritor. ``check()``, si se da, se
+        ejecuta justo antes, ya en la cola: para validaciones que dependen de
+        otras escrituras (la puja más alta).
+        """
+
+        def save():
+            if check is not None:
+                check()
+            serializer.save(**kwargs)
+
+        write_queue.run(save, using=self.get_write_databases())
@@ -1,21 +1,223 @@
-from django.db import models
+import unicodedata
+
+from django.conf import settings
+from django.db import models, router, transaction
+from django.db.models import signals
+from django.db.models.functions import Concat, Substr
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.text import slugify
 from users.models import CustomUser
 
+from .bid_shards import db_for_auction, group_by_shard, shards
+
 # Create your models here.
 
 
 class Category(models.Model):
+    # Árbol de categorías con ruta materializada, igual que los hilos de
+    # Comentario: "Móviles" dentro de "Electrónica" tiene como ruta la de
+    # Electrónica seguida de su propio id. Las subastas copian la ruta de su
+    # categoría en Auction.category_path, así que "categoría y descendientes" es
+    # un rango sobre ese índice (ver subtree_range).
+    PATH_STEP = 10
+    MAX_DEPTH = 10
+
     name = models.CharField(max_length=50, blank=False, unique=True)
+    parent = models.ForeignKey(
+        "self",
+        related_name="children",
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+    )
+    path = models.CharField(max_length=255, blank=True, editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ("id",)
+        indexes = [models.Index(fields=["path"])]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        old_path = self.path
+        self.depth = self.parent.depth + 1 if self.parent_id else 0
+        # Una sola transacción: el árbol cacheado se invalida al confirmarla
+        # (auctions/signals.py), ya con la ruta escrita.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # La ruta incluye el propio id, que solo existe tras el INSERT.
+            prefix = self.parent.path if self.parent_id else ""
+            self.path = f"{prefix}{self.pk:0{self.PATH_STEP}d}/"
+            if self.path != old_path:
+                Category.objects.filter(pk=self.pk).update(path=self.path)
+                if old_path:
+                    self._move_subtree(old_path)
+
+    def _move_subtree(self, old_path):
+        # Al cambiar de padre se reescribe el prefijo de toda la rama, tanto en
+        # las categorías descendientes como en las subastas, con dos UPDATE.
+        start, end = old_path, old_path[:-1] + "0"
+        new_prefix = models.Value(self.path)
+        rest = Substr("path", len(old_path) + 1)
+        Category.objects.filter(path__gt=start, path__lt=end).update(
+            path=Concat(new_prefix, rest),
+            depth=models.F("depth") + (self.depth - old_path.count("/") + 1),
+        )
+        Auction.all_objects.filter(
+            category_path__gte=start, category_path__lt=end
+        ).update(
+            category_path=Concat(new_prefix, Substr("category_path", len(old_path) + 1))
+        )
+
+    def subtree_range(self):
+        return self.path, self.path[:-1] + "0"
+
+
+class VersionConflict(Exception):
+    """La fila ha cambiado desde que se leyó (la versión ya no coincide)."""
+
+
+class UpdateConditionFailed(Exception):
+    """La versión coincide, pero no se cumple la condición extra de la fila."""
+
+
+class VersionedModel(models.Model):
+    """
+    Control de concurrencia optimista. Si antes de save() se fija
+    ``expected_version``, el UPDATE se emite como
+    ``UPDATE ... WHERE id = ? AND version = ?`` (más las condiciones de
+    get_update_conditions) e incrementa la versión; si no se actualiza ninguna
+    fila se lanza VersionConflict o UpdateConditionFailed. No se bloquea ninguna
+    fila entre la lectura y la escritura.
+    """
+
+    version = models.PositiveIntegerField(default=1, editable=False)
+
+    expected_version = None
+    # Contadores que se mantienen con UPDATE ... F(): un save() sin
+    # update_fields no los escribe para no pisarlos con un valor leído antes.
+    counter_fields = ()
+
+    class Meta:
+        abstract = True
+
+    def get_update_conditions(self):
+        return ()
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            return super().save(*args, **kwargs)
+        if self.expected_version is None:
+            # Escritura sin precondición: solo se invalida la versión anterior.
+            if kwargs.get("update_fields") is None:
+                self.version += 1
+                if self.counter_fields:
+                    kwargs["update_fields"] = [
+                        field.name
+                        for field in self._meta.local_concrete_fields
+                        if not field.primary_key
+                        and field.name not in self.counter_fields
+                    ]
+            return super().save(*args, **kwargs)
+        expected, self.expected_version = self.expected_version, None
+        self._save_versioned(expected, kwargs.get("using"), kwargs.get("update_fields"))
+
+    def _save_versioned(self, expected, using, update_fields):
+        # El UPDATE condicional se emite directamente (Model.save() no admite
+        # condiciones extra en el WHERE), replicando sus señales.
+        using = using or router.db_for_write(type(self), instance=self)
+        fields = [
+            field
+            for field in self._meta.local_concrete_fields
+            if not field.primary_key
+            and field.name != "version"
+            and (
+                field.name in update_fields
+                if update_fields is not None
+                else field.name not in self.counter_fields
+            )
+        ]
+        signals.pre_save.send(
+            sender=type(self),
+            instance=self,
+            raw=False,
+            using=using,
+            update_fields=update_fields,
+        )
+        values = {field.attname: field.pre_save(self, False) for field in fields}
+        rows = (
+            type(self)._base_manager.using(using).filter(pk=self.pk, version=expected)
+        )
+        updated = rows.filter(*self.get_update_conditions()).update(
+            version=expected + 1, **values
+        )
+        if not updated:
+            # Se distingue si ha cambiado la versión o si ha fallado la
+            # condición extra.
+            if rows.exists():
+                raise UpdateConditionFailed(self)
+            raise VersionConflict(self)
+        self.version = expected + 1
+        signals.post_save.send(
+            sender=type(self),
+            instance=self,
+            created=False,
+            raw=False,
+            using=using,
+            update_fields=update_fields,
+        )
+
+
+def build_location_key(municipality, locality=""):
+    """
+    Clave de ubicación normalizada "<municipio>/<localidad>". Todas las subastas
+    de un municipio comparten el prefijo "<municipio>/", así que filtrar por
+    municipio es un rango sobre el índice de location_key.
+    """
+    return f"{location_slug(municipality)}/{location_slug(locality)}"
+
+
+def location_slug(name):
+    # Sin tildes, para que "Málaga" y "Malaga" den la misma clave, pero con las
+    # letras de otros alfabetos, que slugify() sin allow_unicode eliminaría.
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return slugify(stripped, allow_unicode=True)
+
+
+def location_key_range(municipality):
+    prefix = build_location_key(municipality)[:-1]
+    # "/" va justo antes de "0", así que [prefijo + "/", prefijo + "0") contiene
+    # exactamente las claves de ese municipio.
+    return prefix + "/", prefix + "0"
+
+
+class AuctionQuerySet(models.QuerySet):
+    def in_municipality(self, municipality):
+        start, end = location_key_range(municipality)
+        return self.filter(location_key__gte=start, location_key__lt=end)
+
+    def with_ratings(self):
+        """Precarga las valoraciones anidadas que muestra AuctionListCreateSerializer."""
+        return self.prefetch_related(
+            models.Prefetch(
+                "ratings", queryset=Rating.objects.select_related("user", "auction")
+            )
+        )
+
 
-class Auction(models.Model):
+class AuctionManager(models.Manager.from_queryset(AuctionQuerySet)):
+    """Manager por defecto: oculta las subastas borradas (soft delete)."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
+class Auction(VersionedModel):
     title = models.CharField(max_length=150)
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
@@ -30,37 +232,137 @@ class Auction(models.Model):
     category = models.ForeignKey(
         Category, related_name="auctions", on_delete=models.CASCADE
     )
+    category_path = models.CharField(max_length=255, blank=True, editable=False)
     thumbnail = models.URLField()
+    # Copia local de la miniatura (ver auctions/thumbnails.py).
+    thumbnail_source = models.URLField(blank=True, editable=False)
+    thumbnail_variants = models.JSONField(default=dict, blank=True, editable=False)
     creation_date = models.DateTimeField(auto_now_add=True)
     closing_date = models.DateTimeField()
     auctioneer = models.ForeignKey(
         CustomUser, related_name="auctions", on_delete=models.CASCADE
     )
+    locality = models.CharField(max_length=100, blank=True)
+    municipality = models.CharField(max_length=100, blank=True)
+    location_key = models.CharField(max_length=205, blank=True, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    # Histograma de valoraciones (cuántas hay de cada valor), su media y la
+    # puntuación bayesiana para ordenar; se actualizan con cada Rating
+    # (auctions/ratings.py).
+    ratings_1 = models.PositiveIntegerField(default=0, editable=False)
+    ratings_2 = models.PositiveIntegerField(default=0, editable=False)
+    ratings_3 = models.PositiveIntegerField(default=0, editable=False)
+    ratings_4 = models.PositiveIntegerField(default=0, editable=False)
+    ratings_5 = models.PositiveIntegerField(default=0, editable=False)
+    rating_average = models.FloatField(default=0, editable=False)
+    rating_score = models.FloatField(default=0, editable=False)
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = AuctionManager()
+    all_objects = AuctionQuerySet.as_manager()
+
+    counter_fields = (
+        "comment_count",
+        "ratings_1",
+        "ratings_2",
+        "ratings_3",
+        "ratings_4",
+        "ratings_5",
+        "rating_average",
+        "rating_score",
+    )
 
     class Meta:
         ordering = ("id",)
+        indexes = [
+            models.Index(fields=["auctioneer", "closing_date"]),
+            models.Index(fields=["auctioneer", "creation_date"]),
+            models.Index(fields=["location_key", "closing_date"]),
+            models.Index(fields=["closing_date"]),
+            models.Index(fields=["category_path", "closing_date"]),
+            models.Index(fields=["-rating_score", "id"]),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        self.location_key = build_location_key(self.municipality, self.locality)
+        self.category_path = self.category.path
+        if self._state.adding:
+            # Sin valoraciones la puntuación bayesiana es la media a priori.
+            self.rating_score = settings.RATING_PRIOR_MEAN
+        super().save(*args, **kwargs)
+
+    @property
+    def rating_histogram(self):
+        return {str(value): getattr(self, f"ratings_{value}") for value in range(1, 6)}
+
+    @property
+    def rating_count(self):
+        return sum(self.rating_histogram.values())
+
+
+class BidQuerySet(models.QuerySet):
+    """Consultas de pujas que saben en qué base de datos están (auctions/bid_shards.py)."""
+
+    def for_auction(self, auction_id):
+        return self.using(db_for_auction(auction_id)).filter(auction=auction_id)
+
+    def create(self, **kwargs):
+        # QuerySet.create() guarda en la base de datos del queryset, no en la
+        # que elegiría el router para la puja.
+        if self._db is None:
+            auction_id = kwargs.get("auction_id") or kwargs["auction"].pk
+            return self.using(db_for_auction(auction_id)).create(**kwargs)
+        return super().create(**kwargs)
+
+    def for_auctions(self, auction_ids):
+        """Un queryset por base de datos con las pujas de esas subastas."""
+        return [
+            self.using(alias).filter(auction__in=ids)
+            for alias, ids in group_by_shard(auction_ids).items()
+        ]
+
+    def on_shards(self):
+        """El mismo queryset en cada base de datos de pujas."""
+        return [self.using(alias) for alias in shards()]
 
-class Bid(models.Model):
-    auction = models.ForeignKey(Auction, on_delete=models.CASCADE, related_name="bids")
+
+class Bid(VersionedModel):
+    # Sin restricción en la BD: con BID_SHARDS las pujas pueden estar en otra
+    # base de datos que la subasta y el pujador.
+    auction = models.ForeignKey(
+        Auction, on_delete=models.CASCADE, related_name="bids", db_constraint=False
+    )
     price = models.DecimalField(max_digits=10, decimal_places=2)
     bidder = models.ForeignKey(
-        CustomUser, on_delete=models.CASCADE, related_name="bids"
+        CustomUser, on_delete=models.CASCADE, related_name="bids", db_constraint=False
     )
-    created_date = models.DateTimeField(auto_now_add=True)
+    # default en lugar de auto_now_add: el motor de pujas guarda la hora a la que
+    # aceptó la puja, no la de la escritura por lotes.
+    created_date = models.DateTimeField(default=timezone.now, editable=False)
+
+    objects = BidQuerySet.as_manager()
 
     class Meta:
         ordering = ("-price",)
+        # Pujas de un día o de la ventana de tendencias sin recorrer la tabla.
+        indexes = [models.Index(fields=["created_date"])]
 
     def __str__(self):
         return f"{self.bidder} - {self.price}€ on {self.auction.title}"
 
+    def get_update_conditions(self):
+        # La puja editada tiene que seguir siendo la más alta en el momento del
+        # UPDATE, no solo cuando la validó el serializer.
+        higher = Bid.objects.filter(
+            auction=models.OuterRef("auction"), price__gte=self.price
+        ).exclude(pk=models.OuterRef("pk"))
+        return (~models.Exists(higher),)
 
-class Rating(models.Model):
 
+class Rating(models.Model):
     valor_numerico = models.IntegerField(
         validators=[MinValueValidator(1), MaxValueValidator(5)],
     )
@@ -74,6 +376,14 @@ class Rating(models.Model):
     class Meta:
         ordering = ("-valor_numerico",)
         unique_together = ("user", "auction")
+        indexes = [models.Index(fields=["user", "valor_numerico"])]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Valor guardado, para mover el histograma si se edita la valoración.
+        instance.stored_value = instance.__dict__.get("valor_numerico")
+        return instance
 
 
 """class Rating(models.Model):
@@ -93,7 +403,13 @@ class Rating(models.Model):
 """
 
 
-class Comentario(models.Model):
+class Comentario(VersionedModel):
+    # Cada comentario guarda la ruta materializada de su hilo: los ids de sus
+    # ancestros y el suyo, con ancho fijo y separados por "/". Un subárbol es
+    # entonces un rango de "path" dentro de la subasta (ver subtree_range).
+    PATH_STEP = 10
+    MAX_DEPTH = 20
+
     titulo = models.CharField(max_length=50)
     campo_de_texto = models.TextField()
     fecha_creacion = models.DateTimeField(auto_now_add=True)
@@ -104,7 +420,238 @@ class Comentario(models.Model):
     auction = models.ForeignKey(
         Auction, related_name="comments", on_delete=models.CASCADE
     )
+    parent = models.ForeignKey(
+        "self",
+        related_name="replies",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+    )
+    path = models.CharField(max_length=255, blank=True, editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    class Meta:
+        ordering = ("id",)
+        indexes = [
+            models.Index(fields=["usuario", "fecha_creacion"]),
+            models.Index(fields=["auction", "fecha_creacion"]),
+            models.Index(fields=["auction", "path"]),
+        ]
+
+    def save(self, *args, **kwargs):
+        creating = self._state.adding
+        if creating and self.parent_id:
+            self.depth = self.parent.depth + 1
+        # Como en Category.save: sin la ruta el comentario no aparecería en
+        # ningún hilo, así que INSERT y ruta van en la misma transacción.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if creating:
+                # La ruta incluye el propio id, que solo existe tras el INSERT.
+                prefix = self.parent.path if self.parent_id else ""
+                self.path = f"{prefix}{self.pk:0{self.PATH_STEP}d}/"
+                Comentario.objects.filter(pk=self.pk).update(path=self.path)
+
+    def subtree_range(self):
+        # "/" va justo antes de "0": [path, path[:-1] + "0") contiene el propio
+        # comentario y todas sus respuestas, a cualquier profundidad.
+        return self.path, self.path[:-1] + "0"
+
+
+class AuctionScore(models.Model):
+    """
+    Puntuación "hot" precalculada de una subasta abierta. Se incrementa con cada
+    puja (auctions/feeds.py) y se recalcula periódicamente con el comando
+    refresh_auction_scores, que también elimina las subastas ya cerradas.
+    """
+
+    auction = models.OneToOneField(
+        Auction, primary_key=True, related_name="score", on_delete=models.CASCADE
+    )
+    bids_last_hour = models.IntegerField(default=0)
+    unique_bidders = models.IntegerField(default=0)
+    avg_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0)
+    score = models.FloatField(default=0)
+    closing_date = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ("-score",)
+        indexes = [models.Index(fields=["-score"])]
+
+
+class ArchivedAuction(models.Model):
+    """
+    Subasta cerrada hace más de AUCTION_ARCHIVE_RETENTION, sacada de las tablas
+    calientes por el comando archive_auctions. ``payload`` es el JSON comprimido
+    con zlib de la subasta y de sus pujas, valoraciones y comentarios; el resto de
+    columnas son un resumen consultable.
+    """
+
+    auction_id = models.BigIntegerField(unique=True)
+    auctioneer_id = models.BigIntegerField(db_index=True)
+    category_id = models.BigIntegerField()
+    title = models.CharField(max_length=150)
+    closing_date = models.DateTimeField(db_index=True)
+    final_price = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True
+    )
+    bid_count = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    payload = models.BinaryField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ("-closing_date",)
+
+    def __str__(self):
+        return self.title
+
+
+class DeletionJob(models.Model):
+    """
+    Borrado en cascada pendiente de un usuario o de una subasta. La entidad se
+    marca como inactiva/borrada en la petición y el comando run_deletion_jobs
+    borra sus filas dependientes por lotes, guardando aquí el progreso.
+    ``heartbeat_at`` es la reserva del proceso que lo ejecuta: se renueva con
+    cada lote y, si pasa DELETION_JOB_LEASE sin renovarse, otro proceso lo
+    retoma.
+    """
+
+    USER = "user"
+    AUCTION = "auction"
+    TARGET_CHOICES = [(USER, "User"), (AUCTION, "Auction")]
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    target_type = models.CharField(max_length=10, choices=TARGET_CHOICES)
+    target_id = models.BigIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    batch_size = models.PositiveIntegerField(default=500)
+    deleted_rows = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ("id",)
-        unique_together = ("usuario", "auction")
+        indexes = [models.Index(fields=["status", "id"])]
+
+
+class Watch(models.Model):
+    """
+    Subasta seguida por un usuario. notified_bid_id y closing_notified guardan
+    qué avisos ya se le han enviado (ver auctions/notifications.py).
+    """
+
+    user = models.ForeignKey(
+        CustomUser, related_name="watches", on_delete=models.CASCADE
+    )
+    auction = models.ForeignKey(
+        Auction, related_name="watchers", on_delete=models.CASCADE
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    notified_bid_id = models.PositiveBigIntegerField(default=0, editable=False)
+    closing_notified = models.BooleanField(default=False, editable=False)
+
+    class Meta:
+        ordering = ("id",)
+        constraints = [
+            models.UniqueConstraint(fields=["user", "auction"], name="unique_watch")
+        ]
+
+
+class Notification(models.Model):
+    """Aviso agrupado de un tick del motor de notificaciones (bandeja de entrada)."""
+
+    user = models.ForeignKey(
+        CustomUser, related_name="notifications", on_delete=models.CASCADE
+    )
+    events = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+    read_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ("-id",)
+        indexes = [models.Index(fields=["user", "id"])]
+
+
+class Watermark(models.Model):
+    """Posición hasta la que un proceso periódico ha consumido una tabla."""
+
+    name = models.CharField(max_length=50, unique=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class IdempotencyKey(models.Model):
+    """
+    Respuesta de un POST enviado con la cabecera Idempotency-Key
+    (IdempotentCreateMixin). Caduca a los IDEMPOTENCY_KEY_TTL; el comando
+    purge_idempotency_keys borra las caducadas.
+    """
+
+    user = models.ForeignKey(CustomUser, related_name="+", on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField()
+    response = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "key"], name="unique_idempotency_key"
+            )
+        ]
+
+
+class DailyStats(models.Model):
+    """
+    Resumen de un día (en TIME_ZONE) para la analítica de administración. Lo
+    escribe el comando rollup_daily_stats (auctions/analytics.py); los
+    endpoints de analítica solo leen esta tabla y DailyCategoryStats.
+    """
+
+    day = models.DateField(unique=True)
+    # Suma de la puja ganadora de las subastas que cerraron ese día.
+    gmv = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    sold_auctions = models.PositiveIntegerField(default=0)
+    bids = models.PositiveIntegerField(default=0)
+    new_users = models.PositiveIntegerField(default=0)
+    new_auctions = models.PositiveIntegerField(default=0)
+    # Subastas abiertas en algún momento del día.
+    active_auctions = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ("day",)
+
+
+class DailyCategoryStats(models.Model):
+    """Pujas y GMV de un día por categoría de la subasta (ver DailyStats)."""
+
+    day = models.DateField()
+    category = models.ForeignKey(Category, related_name="+", on_delete=models.CASCADE)
+    bids = models.PositiveIntegerField(default=0)
+    gmv = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ("day", "category")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "category"], name="unique_daily_category_stats"
+            )
+        ]
@@ -0,0 +1,164 @@
+"""
+Motor de notificaciones de la lista de seguimiento.
+
+En cada tick se calculan con consultas sobre conjuntos (nunca recorriendo los
+Watch uno a uno) los avisos pendientes:
+
+- "outbid": seguidores que han pujado en una subasta con pujas nuevas desde el
+  tick anterior y cuya puja ya no es la más alta. Solo se miran las subastas con
+  pujas de id mayor que la marca de agua "notifications.bids" (una por base de
+  datos de pujas si están repartidas, ver auctions/bid_shards.py).
+- "closing": seguidores de subastas que cierran dentro de
+  NOTIFICATION_CLOSING_SOON y a los que aún no se ha avisado.
+
+Los avisos se agrupan por usuario y se entregan al sink de NOTIFICATION_SINK
+dentro de la misma transacción que marca los Watch como notificados.
+"""
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Exists, Max, OuterRef, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Bid, Notification, Watch, Watermark
+
+BIDS_WATERMARK = "notifications.bids"
+OUTBID = "outbid"
+CLOSING = "closing"
+
+
+class InboxSink:
+    """Guarda un Notification por usuario y tick en la base de datos."""
+
+    def deliver(self, batches):
+        Notification.objects.bulk_create(
+            [
+                Notification(user_id=user_id, events=events)
+                for user_id, events in batches.items()
+            ],
+            batch_size=1000,
+        )
+
+
+def get_sink():
+    return import_string(settings.NOTIFICATION_SINK)()
+
+
+def _watermark_name(alias):
+    if alias == DEFAULT_DB_ALIAS:
+        return BIDS_WATERMARK
+    return f"{BIDS_WATERMARK}.{alias}"
+
+
+def _top_bids(bids):
+    # La puja más alta de cada subasta (con empate, la más antigua).
+    higher = Bid.objects.filter(auction=OuterRef("auction")).filter(
+        Q(price__gt=OuterRef("price"))
+        | Q(price=OuterRef("price"), id__lt=OuterRef("id"))
+    )
+    return {
+        auction_id: (bid_id, bidder_id, price)
+        for bid_id, auction_id, bidder_id, price in bids.exclude(
+            Exists(higher)
+        ).values_list("id", "auction", "bidder", "price")
+    }
+
+
+def _collect_outbid(batches, batch_size):
+    # Las pujas pueden estar repartidas en varias bases de datos (BID_SHARDS):
+    # cada una tiene su marca de agua y los Watch se cruzan con sus pujas aquí.
+    for bids in Bid.objects.on_shards():
+        watermark, _ = Watermark.objects.select_for_update().get_or_create(
+            name=_watermark_name(bids.db)
+        )
+        last_bid = bids.aggregate(last=Max("id"))["last"] or 0
+        if last_bid <= watermark.position:
+            continue
+        active = list(
+            bids.filter(id__gt=watermark.position, id__lte=last_bid)
+            .order_by()
+            .values_list("auction", flat=True)
+            .distinct()
+        )
+        for start in range(0, len(active), batch_size):
+            auctions = active[start : start + batch_size]
+            _collect_outbid_batch(
+                batches, bids.filter(auction__in=auctions), batch_size
+            )
+        watermark.position = last_bid
+        watermark.save(update_fields=["position", "updated_at"])
+
+
+def _collect_outbid_batch(batches, bids, batch_size):
+    top = _top_bids(bids)
+    bidders = set(bids.order_by().values_list("auction", "bidder").distinct())
+    watches = Watch.objects.filter(
+        auction__in=list(top), auction__deleted_at__isnull=True
+    ).values_list("id", "user_id", "auction_id", "auction__title", "notified_bid_id")
+
+    notified = defaultdict(list)
+    for watch_id, user_id, auction_id, title, notified_bid_id in watches:
+        top_bid, top_bidder, top_price = top[auction_id]
+        if (
+            (auction_id, user_id) not in bidders
+            or top_bidder == user_id
+            or notified_bid_id == top_bid
+        ):
+            continue
+        batches[user_id].append(
+            {
+                "type": OUTBID,
+                "auction": auction_id,
+                "title": title,
+                "price": str(top_price),
+            }
+        )
+        notified[top_bid].append(watch_id)
+    for top_bid, ids in notified.items():
+        for start in range(0, len(ids), batch_size):
+            Watch.objects.filter(id__in=ids[start : start + batch_size]).update(
+                notified_bid_id=top_bid
+            )
+
+
+def _collect_closing(batches, now, batch_size):
+    pending = Watch.objects.filter(
+        closing_notified=False,
+        auction__closing_date__gt=now,
+        auction__closing_date__lte=now + settings.NOTIFICATION_CLOSING_SOON,
+        auction__deleted_at__isnull=True,
+    ).values_list(
+        "id", "user_id", "auction_id", "auction__title", "auction__closing_date"
+    )
+
+    ids = []
+    for watch_id, user_id, auction_id, title, closing_date in pending:
+        batches[user_id].append(
+            {
+                "type": CLOSING,
+                "auction": auction_id,
+                "title": title,
+                "minutes": int((closing_date - now).total_seconds() // 60),
+            }
+        )
+        ids.append(watch_id)
+    for start in range(0, len(ids), batch_size):
+        Watch.objects.filter(id__in=ids[start : start + batch_size]).update(
+            closing_notified=True
+        )
+
+
+def run_tick(now=None, sink=None, batch_size=1000):
+    """Calcula y entrega los avisos pendientes; devuelve cuántos usuarios avisa."""
+    now = now or timezone.now()
+    sink = sink or get_sink()
+    batches = defaultdict(list)
+    with transaction.atomic():
+        _collect_outbid(batches, batch_size)
+        _collect_closing(batches, now, batch_size)
+        if batches:
+            sink.deliver(batches)
+    return len(batches)
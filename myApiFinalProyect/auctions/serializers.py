@@ -1,14 +1,74 @@
+from django.conf import settings
+from django.db.models import Max
 from rest_framework import serializers, generics
-from .models import Category, Auction, Bid, Rating, Comentario
+from .models import (
+    Category,
+    Auction,
+    Bid,
+    Rating,
+    Comentario,
+    Watch,
+    Notification,
+    DailyStats,
+)
 from django.utils import timezone
-from drf_spectacular.utils import extend_schema_field
 from datetime import timedelta
+from typing import Dict, Optional
+
+from .categories import get_category
+from .thumbnails import thumbnail_urls
+
+
+def check_closing_date(value, creation_date):
+    if value < timezone.now():
+        raise serializers.ValidationError("La fecha de cuirre debe ser futura ")
+
+    if value - creation_date < timedelta(days=15):
+        raise serializers.ValidationError(
+            "deben de haber 15 dias entre la fecha de creación y la de cierre"
+        )
+    return value
+
+
+# Campo ``thumbnails``: URLs de las miniaturas cacheadas, por variante (null si
+# aún no hay). El esquema sale de la anotación de get_thumbnails, así que no hace
+# falta importar drf_spectacular al cargar los serializers.
+class ThumbnailsMixin(serializers.Serializer):
+    thumbnails = serializers.SerializerMethodField()
+
+    def get_thumbnails(self, auction) -> Optional[Dict[str, str]]:
+        return thumbnail_urls(auction, self.context.get("request"))
+
+
+def check_category_parent(parent, instance=None):
+    if parent is None:
+        return parent
+    if instance is not None and parent.path.startswith(instance.path):
+        raise serializers.ValidationError(
+            "Una categoría no puede colgar de sí misma ni de sus subcategorías."
+        )
+    # Al mover una categoría se mueve toda su rama: cuenta su hoja más profunda.
+    height = 0
+    if instance is not None and instance.path:
+        start, end = instance.subtree_range()
+        deepest = Category.objects.filter(path__gte=start, path__lt=end).aggregate(
+            depth=Max("depth")
+        )["depth"]
+        height = deepest - instance.depth
+    if parent.depth + 1 + height >= Category.MAX_DEPTH:
+        raise serializers.ValidationError(
+            "Se ha alcanzado la profundidad máxima de categorías."
+        )
+    return parent
 
 
 class CategoryListCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
-        fields = ["id", "name"]
+        fields = ["id", "name", "parent", "depth"]
+
+    def validate_parent(self, value):
+        return check_category_parent(value, self.instance)
 
 
 class CategoryDetailSerializer(serializers.ModelSerializer):
@@ -16,6 +76,9 @@ class CategoryDetailSerializer(serializers.ModelSerializer):
         model = Category
         fields = "__all__"
 
+    def validate_parent(self, value):
+        return check_category_parent(value, self.instance)
+
 
 class RatingsListSerializer(serializers.ModelSerializer):
     # auction = serializers.PrimaryKeyRelatedField(queryset=Auction.objects.all())
@@ -31,7 +94,7 @@ class RatingsListSerializer(serializers.ModelSerializer):
         read_only_fields = ("auction", "user")
 
 
-class AuctionListCreateSerializer(serializers.ModelSerializer):
+class AuctionListCreateSerializer(ThumbnailsMixin, serializers.ModelSerializer):
     creation_date = serializers.DateTimeField(
         format="%Y-%m-%dT%H:%M:%SZ", read_only=True
     )
@@ -46,15 +109,7 @@ class AuctionListCreateSerializer(serializers.ModelSerializer):
             creation_date = self.instance.creation_date
         else:
             creation_date = timezone.now()
-
-        if value < timezone.now():
-            raise serializers.ValidationError("La fecha de cuirre debe ser futura ")
-
-        if value - creation_date < timedelta(days=15):
-            raise serializers.ValidationError(
-                "deben de haber 15 dias entre la fecha de creación y la de cierre"
-            )
-        return value
+        return check_closing_date(value, creation_date)
 
     # def create(self, validated_data):
     #     rating_value = validated_data.pop("rating", None)
@@ -71,14 +126,10 @@ class AuctionListCreateSerializer(serializers.ModelSerializer):
     #     return auction
 
     def get_avg_rating(self, obj):
-        ratings = obj.ratings.all()
-        if not ratings:
+        # Media guardada en la subasta (auctions/ratings.py).
+        if not obj.rating_count:
             return 1.0
-        valor = float(0)
-        for r in ratings:
-            valor_numerico = float(r.valor_numerico)
-            valor += valor_numerico
-        return valor / float(ratings.count())
+        return obj.rating_average
 
     class Meta:
         model = Auction
@@ -91,6 +142,7 @@ class AuctionListCreateSerializer(serializers.ModelSerializer):
             "brand",
             "category",
             "thumbnail",
+            "thumbnails",
             "creation_date",
             "closing_date",
             "auctioneer",
@@ -98,11 +150,12 @@ class AuctionListCreateSerializer(serializers.ModelSerializer):
             "avg_rating",
             "rating",
             "ratings",
+            "municipality",
+            "locality",
         ]
         read_only_fields = ["auctioneer"]
 
-    @extend_schema_field(serializers.BooleanField())
-    def get_is_open(self, obj):
+    def get_is_open(self, obj) -> bool:
         return obj.closing_date > timezone.now()
 
 
@@ -124,15 +177,7 @@ class AuctionDetailSerializer(serializers.ModelSerializer):
             creation_date = self.instance.creation_date
         else:
             creation_date = timezone.now()
-
-        if value < timezone.now():
-            raise serializers.ValidationError("La fecha de cuirre debe ser futura ")
-
-        if value - creation_date < timedelta(days=15):
-            raise serializers.ValidationError(
-                "deben de haber 15 dias entre la fecha de creación y la de cierre"
-            )
-        return value
+        return check_closing_date(value, creation_date)
 
     class Meta:
 
@@ -151,24 +196,23 @@ class AuctionDetailSerializer(serializers.ModelSerializer):
             "auctioneer",
             "is_open",
             "avg_rating",
+            "rating_score",
             "auctioneer_username",
+            "municipality",
+            "locality",
+            "comment_count",
+            "version",
         ]
 
         read_only_fields = ["auctioneer"]
 
-    @extend_schema_field(serializers.BooleanField())
-    def get_is_open(self, obj):
+    def get_is_open(self, obj) -> bool:
         return obj.closing_date > timezone.now()
 
     def get_avg_rating(self, obj):
-        ratings = obj.ratings.all()
-        if not ratings:
+        if not obj.rating_count:
             return 1.0
-        valor = float(0)
-        for r in ratings:
-            valor_numerico = float(r.valor_numerico)
-            valor += valor_numerico
-        return round(valor / float(ratings.count()), 2)
+        return round(obj.rating_average, 2)
 
 
 class BidsListCreateSerializer(serializers.ModelSerializer):
@@ -203,6 +247,17 @@ class BidsListCreateSerializer(serializers.ModelSerializer):
         return data
 
 
+class BidEngineSerializer(serializers.Serializer):
+    """Puja enviada al motor de pujas: el resto de comprobaciones las hace el shard."""
+
+    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+    def validate_price(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("El precio debe ser mayor que 0.")
+        return value
+
+
 class BidsDetailSerializer(serializers.ModelSerializer):
 
     creation_date = serializers.DateTimeField(
@@ -249,7 +304,7 @@ class CommentDetailSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comentario
         fields = "__all__"
-        read_only_fields = ("auction", "usuario", "fecha_ultima_modificacion")
+        read_only_fields = ("auction", "usuario", "fecha_ultima_modificacion", "parent")
 
 
 class CommentListCreateSerializer(serializers.ModelSerializer):
@@ -259,3 +314,185 @@ class CommentListCreateSerializer(serializers.ModelSerializer):
         model = Comentario
         fields = "__all__"
         read_only_fields = ("auction", "usuario", "fecha_ultima_modificacion")
+
+
+class AuctionImportSerializer(serializers.Serializer):
+    """
+    Valida una fila de la importación masiva de subastas. La categoría llega por
+    nombre y se resuelve por lotes en auctions/importer.py, así que aquí no se
+    hace ninguna consulta a la base de datos.
+    """
+
+    title = serializers.CharField(max_length=150)
+    description = serializers.CharField()
+    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    rating = serializers.DecimalField(
+        max_digits=3, decimal_places=2, min_value=1, max_value=5, required=False
+    )
+    stock = serializers.IntegerField(min_value=1)
+    brand = serializers.CharField(max_length=100)
+    category = serializers.CharField(max_length=50)
+    thumbnail = serializers.URLField()
+    closing_date = serializers.DateTimeField()
+    municipality = serializers.CharField(
+        max_length=100, required=False, allow_blank=True
+    )
+    locality = serializers.CharField(max_length=100, required=False, allow_blank=True)
+
+    def validate_closing_date(self, value):
+        return check_closing_date(value, timezone.now())
+
+
+class AuctionFilterSerializer(serializers.Serializer):
+    """
+    Parámetros de consulta del listado de subastas. Se validan todos antes de
+    construir la consulta (auctions/filters.py) y los precios se tratan como
+    Decimal, igual que Auction.price.
+    """
+
+    search = serializers.CharField(min_length=3, required=False)
+    category = serializers.IntegerField(min_value=1, required=False)
+    priceMin = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=0, required=False
+    )
+    priceMax = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=0, required=False
+    )
+    rating = serializers.DecimalField(
+        max_digits=3, decimal_places=2, min_value=0, max_value=5, required=False
+    )
+    is_open = serializers.BooleanField(required=False)
+    municipality = serializers.CharField(max_length=100, required=False)
+    locality = serializers.CharField(max_length=100, required=False)
+    near = serializers.ChoiceField(choices=["me"], required=False)
+    # "score": mejor puntuación bayesiana primero (Auction.rating_score).
+    ordering = serializers.ChoiceField(choices=["score"], required=False)
+
+    def validate_category(self, value):
+        # Se responde desde el árbol cacheado, sin consultar la BD.
+        if get_category(value) is None:
+            raise serializers.ValidationError("Category does not exist.")
+        return value
+
+    def validate(self, attrs):
+        price_min = attrs.get("priceMin")
+        price_max = attrs.get("priceMax")
+        if price_min is not None and price_max is not None and price_max < price_min:
+            raise serializers.ValidationError(
+                {"price": "Maximum price must be greater than minimum price."}
+            )
+        if "locality" in attrs and "municipality" not in attrs:
+            raise serializers.ValidationError(
+                {"locality": "Requiere indicar también el municipio."}
+            )
+        if "near" in attrs and "ordering" in attrs:
+            raise serializers.ValidationError(
+                {"ordering": "No se puede combinar con near, que ya ordena."}
+            )
+        return attrs
+
+
+class AuctionFeedSerializer(ThumbnailsMixin, serializers.ModelSerializer):
+    closing_date = serializers.DateTimeField(format="%Y-%m-%dT%H:%M:%SZ")
+    # Las subastas que cierran pronto pueden no tener aún AuctionScore: los
+    # campos de la puntuación salen a null en lugar de desaparecer.
+    bids_last_hour = serializers.IntegerField(
+        source="score.bids_last_hour", read_only=True, allow_null=True
+    )
+    unique_bidders = serializers.IntegerField(
+        source="score.unique_bidders", read_only=True, allow_null=True
+    )
+    score = serializers.FloatField(
+        source="score.score", read_only=True, allow_null=True
+    )
+
+    class Meta:
+        model = Auction
+        fields = [
+            "id",
+            "title",
+            "price",
+            "brand",
+            "category",
+            "thumbnail",
+            "thumbnails",
+            "closing_date",
+            "bids_last_hour",
+            "unique_bidders",
+            "score",
+        ]
+
+
+class WatchSerializer(serializers.ModelSerializer):
+    user = serializers.HiddenField(default=serializers.CurrentUserDefault())
+    auction_title = serializers.CharField(source="auction.title", read_only=True)
+    closing_date = serializers.DateTimeField(
+        source="auction.closing_date", format="%Y-%m-%dT%H:%M:%SZ", read_only=True
+    )
+
+    class Meta:
+        model = Watch
+        fields = [
+            "id",
+            "user",
+            "auction",
+            "auction_title",
+            "closing_date",
+            "created_at",
+        ]
+
+
+class NotificationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Notification
+        fields = ["id", "events", "created_at", "read_at"]
+
+
+class AnalyticsRangeSerializer(serializers.Serializer):
+    """
+    Rango de días de la analítica (ambos incluidos). Sin ``end`` se usa hoy y
+    sin ``start`` los ANALYTICS_DEFAULT_DAYS días anteriores a ``end``.
+    """
+
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        end = attrs.get("end") or timezone.localdate()
+        start = attrs.get("start") or end - timedelta(
+            days=settings.ANALYTICS_DEFAULT_DAYS - 1
+        )
+        if end < start:
+            raise serializers.ValidationError({"end": "No puede ser anterior a start."})
+        if (end - start).days >= settings.ANALYTICS_MAX_DAYS:
+            raise serializers.ValidationError(
+                {
+                    "start": f"El rango no puede superar {settings.ANALYTICS_MAX_DAYS} días."
+                }
+            )
+        return {"start": start, "end": end}
+
+
+class DailyStatsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DailyStats
+        fields = [
+            "day",
+            "gmv",
+            "sold_auctions",
+            "bids",
+            "new_users",
+            "new_auctions",
+            "active_auctions",
+        ]
+
+
+class CategoryStatsSerializer(serializers.Serializer):
+    category = serializers.IntegerField()
+    name = serializers.SerializerMethodField()
+    bids = serializers.IntegerField()
+    gmv = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+    def get_name(self, row) -> str:
+        category = get_category(row["category"])
+        return category["name"] if category else ""
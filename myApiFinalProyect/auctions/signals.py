@@ -0,0 +1,170 @@
+import functools
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import feeds, ratings
+from .cache import bump_version
+from .categories import invalidate_tree
+from .models import Auction, AuctionScore, Bid, Category, Rating, Comentario, Watch
+from .snapshots import invalidate_snapshot
+
+
+_row_deletes = threading.local()
+
+
+def row_delete_receiver(function):
+    """Receptor cuyo post_delete se salta dentro de row_delete_receivers_paused()."""
+
+    @functools.wraps(function)
+    def wrapper(sender, instance, **kwargs):
+        paused = getattr(_row_deletes, "paused", False)
+        if paused and kwargs.get("signal") is post_delete:
+            return None
+        return function(sender, instance, **kwargs)
+
+    return wrapper
+
+
+def invalidate_dashboard(*user_ids):
+    for user_id in {pk for pk in user_ids if pk is not None}:
+        bump_version("dashboard", user_id)
+
+
+@receiver([post_save, post_delete], sender=Category)
+def category_changed(sender, instance, **kwargs):
+    # post_save llega antes de que Category.save escriba la ruta: la versión se
+    # cambia al confirmar, para que nadie cachee el árbol con la ruta antigua.
+    transaction.on_commit(invalidate_tree)
+
+
+@receiver([post_save, post_delete], sender=Auction)
+def auction_changed(sender, instance, **kwargs):
+    invalidate_dashboard(instance.auctioneer_id)
+    invalidate_snapshot(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Auction)
+def auction_changed_notify_engine(sender, instance, created=False, **kwargs):
+    if settings.BID_ENGINE_ENABLED and not created:
+        # Import diferido: bid_engine importa este módulo.
+        from .bid_engine import notify_auction_changed
+
+        transaction.on_commit(lambda: notify_auction_changed(instance.pk))
+
+
+@receiver(post_save, sender=Auction)
+def auction_closing_date_changed(sender, instance, created, **kwargs):
+    if not created:
+        AuctionScore.objects.filter(auction=instance.pk).update(
+            closing_date=instance.closing_date
+        )
+        # Si se amplía el cierre, el aviso de "cierra pronto" se vuelve a enviar.
+        if instance.closing_date > timezone.now() + settings.NOTIFICATION_CLOSING_SOON:
+            Watch.objects.filter(auction=instance.pk, closing_notified=True).update(
+                closing_notified=False
+            )
+
+
+@receiver(post_save, sender=Bid)
+def bid_created(sender, instance, created, **kwargs):
+    if created:
+        feeds.record_bid(instance)
+
+
+@receiver([post_save, post_delete], sender=Bid)
+@row_delete_receiver
+def bid_changed(sender, instance, **kwargs):
+    # Una puja nueva puede dejar de ser ganadora la del anterior pujador más
+    # alto, así que también se invalida su panel.
+    previous_top_bidder = (
+        Bid.objects.for_auction(instance.auction_id)
+        .exclude(pk=instance.pk)
+        .order_by("-price")
+        .values_list("bidder_id", flat=True)
+        .first()
+    )
+    invalidate_dashboard(instance.bidder_id, previous_top_bidder)
+    invalidate_snapshot(instance.auction_id)
+
+
+# Van antes que rating_changed: la instantánea se invalida con el histograma
+# ya actualizado.
+@receiver(post_save, sender=Rating)
+def rating_saved(sender, instance, created, **kwargs):
+    if not created and not hasattr(instance, "stored_value"):
+        # Valoración guardada sin leerla antes de la BD: no se sabe qué valor
+        # tenía, así que se recalcula la subasta entera.
+        ratings.refresh_ratings(Auction.all_objects.filter(pk=instance.auction_id))
+    elif created or instance.stored_value != instance.valor_numerico:
+        ratings.apply_rating_change(
+            instance.auction_id,
+            added=instance.valor_numerico,
+            removed=None if created else instance.stored_value,
+        )
+    instance.stored_value = instance.valor_numerico
+
+
+@receiver(post_delete, sender=Rating)
+@row_delete_receiver
+def rating_deleted(sender, instance, **kwargs):
+    ratings.apply_rating_change(
+        instance.auction_id,
+        removed=getattr(instance, "stored_value", instance.valor_numerico),
+    )
+
+
+@receiver([post_save, post_delete], sender=Rating)
+@row_delete_receiver
+def rating_changed(sender, instance, **kwargs):
+    # Las valoraciones se muestran dentro de las subastas del subastador.
+    auctioneer_id = (
+        Auction.objects.filter(id=instance.auction_id)
+        .values_list("auctioneer_id", flat=True)
+        .first()
+    )
+    invalidate_dashboard(instance.user_id, auctioneer_id)
+    invalidate_snapshot(instance.auction_id)
+
+
+@receiver([post_save, post_delete], sender=Comentario)
+@row_delete_receiver
+def comment_changed(sender, instance, **kwargs):
+    invalidate_dashboard(instance.usuario_id)
+    invalidate_snapshot(instance.auction_id)
+
+
+@receiver(post_save, sender=Comentario)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        Auction.objects.filter(pk=instance.auction_id).update(
+            comment_count=F("comment_count") + 1
+        )
+
+
+@receiver(post_delete, sender=Comentario)
+@row_delete_receiver
+def comment_deleted(sender, instance, **kwargs):
+    Auction.objects.filter(pk=instance.auction_id, comment_count__gt=0).update(
+        comment_count=F("comment_count") - 1
+    )
+
+
+@contextmanager
+def row_delete_receivers_paused():
+    """
+    Salta los receptores de borrado fila a fila (row_delete_receiver) en este
+    hilo: los borrados por lotes (auctions/cascade.py) aplican su efecto una vez
+    por lote. Los borrados de otros hilos siguen disparándolos.
+    """
+    _row_deletes.paused = True
+    try:
+        yield
+    finally:
+        _row_deletes.paused = False
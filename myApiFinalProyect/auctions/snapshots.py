@@ -0,0 +1,87 @@
+"""
+Instantánea de la página de una subasta (/api/auctions/<id>/snapshot/).
+
+Junta en una sola respuesta el detalle, las SNAPSHOT_TOP_BIDS pujas más altas,
+el histograma de valoraciones y los SNAPSHOT_COMMENTS comentarios más recientes
+con un número fijo de consultas (subasta, pujas, pujadores y comentarios), sea
+cual sea el tamaño de la subasta: el histograma ya está en la fila de la subasta
+(auctions/ratings.py).
+
+La respuesta se guarda en caché bajo una clave versionada por subasta:
+cualquier escritura en la subasta, sus pujas, valoraciones o comentarios cambia
+la versión (auctions/signals.py), así que en los últimos minutos de una subasta
+todas las peticiones entre dos pujas se sirven de caché. La versión solo es
+compartida entre workers con DJANGO_CACHE_URL; con la LocMemCache por defecto
+los demás workers pueden servir la instantánea anterior durante
+SNAPSHOT_CACHE_TIMEOUT.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .cache import bump_version, versioned_key
+from .models import Auction, Bid, Comentario
+from .serializers import (
+    AuctionDetailSerializer,
+    BidsListCreateSerializer,
+    CommentListCreateSerializer,
+)
+
+
+def invalidate_snapshot(*auction_ids):
+    for auction_id in set(auction_ids):
+        bump_version("snapshot", auction_id)
+
+
+def rating_summary(auction):
+    count = auction.rating_count
+    return {
+        "count": count,
+        # Igual que avg_rating en el resto de la API: 1.0 si no hay valoraciones.
+        "average": round(auction.rating_average, 2) if count else 1.0,
+        "histogram": auction.rating_histogram,
+    }
+
+
+def build_snapshot(auction, request):
+    bids = (
+        Bid.objects.for_auction(auction.pk)
+        .prefetch_related("bidder")
+        .order_by("-price", "id")[: settings.SNAPSHOT_TOP_BIDS]
+    )
+    comments = (
+        Comentario.objects.filter(auction=auction)
+        .select_related("auction")
+        .order_by("-id")[: settings.SNAPSHOT_COMMENTS]
+    )
+    context = {"request": request}
+    return {
+        "auction": AuctionDetailSerializer(auction, context=context).data,
+        "top_bids": BidsListCreateSerializer(bids, many=True, context=context).data,
+        "ratings": rating_summary(auction),
+        "comments": CommentListCreateSerializer(
+            comments, many=True, context=context
+        ).data,
+    }
+
+
+def get_snapshot(auction_id, request):
+    """Instantánea de la subasta, de caché si no ha cambiado; None si no existe."""
+    key = versioned_key("snapshot", auction_id)
+    data = cache.get(key)
+    if data is None:
+        auction = (
+            Auction.objects.select_related("auctioneer").filter(pk=auction_id).first()
+        )
+        if auction is None:
+            return None
+        data = build_snapshot(auction, request)
+        # "is_open" cambia al cerrar sin que nadie escriba: la entrada no debe
+        # sobrevivir al cierre.
+        timeout = settings.SNAPSHOT_CACHE_TIMEOUT
+        remaining = (auction.closing_date - timezone.now()).total_seconds()
+        if remaining > 0:
+            timeout = min(timeout, max(int(remaining), 1))
+        cache.set(key, data, timeout)
+    return data
@@ -1,3 +1,1003 @@
-from django.test import TestCase
+import io
+import tempfile
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection
+from django.core.management import CommandError, call_command
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from myApiFinalProyect.schema import render_schema, schema_hash
+from users.models import CustomUser
+
+from . import bid_engine, feeds, thumbnails, write_queue
+from .analytics import day_bounds, run_rollup
+from .archive import archive_closed_auctions
+from .cache import get_version
+from .cascade import (
+    claim_next_job,
+    run_job,
+    run_pending_jobs,
+    schedule_auction_deletion,
+    schedule_user_deletion,
+)
+from .categories import get_category, get_tree, subtree_range
+from .importer import AuctionImporter, ImportInterrupted, iter_rows
+from .models import (
+    ArchivedAuction,
+    Auction,
+    Bid,
+    Category,
+    Comentario,
+    DeletionJob,
+    Rating,
+    UpdateConditionFailed,
+    VersionConflict,
+    Watermark,
+)
+from .ratings import bayesian_score, refresh_ratings
+from .serializers import CategoryDetailSerializer
+from .signals import row_delete_receivers_paused
 
 # Create your tests here.
+
+
+def create_user(username, **kwargs):
+    return CustomUser.objects.create_user(
+        username, password="secret", birth_date=date(1990, 1, 1), **kwargs
+    )
+
+
+def create_auction(auctioneer, category, **kwargs):
+    fields = {
+        "title": "Subasta",
+        "description": "Descripción",
+        "price": 10,
+        "stock": 1,
+        "brand": "Marca",
+        "thumbnail": "https://example.com/image.png",
+        "closing_date": timezone.now() + timedelta(days=20),
+        **kwargs,
+    }
+    return Auction.objects.create(auctioneer=auctioneer, category=category, **fields)
+
+
+class APITestCase(TestCase):
+    def setUp(self):
+        self.user = create_user("ana")
+        self.category = Category.objects.create(name="Libros")
+        self.auction = create_auction(self.user, self.category)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+
+class SchemaDriftTest(SimpleTestCase):
+    """El esquema guardado debe coincidir con el que genera el código."""
+
+    def test_stored_schema_is_up_to_date(self):
+        stored = settings.SCHEMA_PATH.read_bytes()
+        self.assertEqual(
+            schema_hash(stored),
+            schema_hash(render_schema()),
+            "El esquema OpenAPI está desactualizado; ejecuta manage.py build_schema.",
+        )
+
+
+class UserActivityParamsTest(APITestCase):
+    """Los filtros de "mis subastas/valoraciones/comentarios" responden 400, no 500."""
+
+    def test_non_integer_filters_are_rejected(self):
+        for url in [
+            f"/api/auctions/{self.auction.id}/comments?parent=abc",
+            "/api/auctions/users/?category=abc",
+            "/api/auctions/users/ratings?auction=abc",
+            "/api/auctions/users/ratings?valor_numerico=abc",
+            "/api/auctions/users/comments?auction=abc",
+        ]:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 400)
+
+    def test_integer_filters_still_apply(self):
+        response = self.client.get(
+            f"/api/auctions/users/?category={self.category.id}"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 1)
+
+
+IMPORT_HEADER = "title,description,price,stock,brand,category,thumbnail,closing_date\n"
+
+
+def import_row(title):
+    closing_date = (timezone.now() + timedelta(days=20)).isoformat()
+    return f"{title},Desc,10,1,Marca,Libros,https://example.com/a.png,{closing_date}\n"
+
+
+class AuctionFilterTest(APITestCase):
+    def setUp(self):
+        super().setUp()
+        novels = Category.objects.create(name="Novela", parent=self.category)
+        music = Category.objects.create(name="Música")
+        bob, eva = create_user("bob"), create_user("eva")
+        quijote = create_auction(self.user, self.category, title="Quijote", price=5)
+        illustrated = create_auction(
+            self.user, novels, description="Quijote ilustrado", price=50
+        )
+        closed = create_auction(bob, music, price=20)
+        Auction.objects.filter(pk=closed.pk).update(
+            closing_date=timezone.now() - timedelta(days=1)
+        )
+        for user, auction, value in [
+            (bob, quijote, 4),
+            (eva, quijote, 5),
+            (bob, illustrated, 2),
+        ]:
+            Rating.objects.create(user=user, auction=auction, valor_numerico=value)
+
+    def listed(self, params):
+        response = self.client.get("/api/auctions/", params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return {auction["id"] for auction in response.data["results"]}
+
+    def expected(self, params):
+        # El filtrado de antes, fila a fila: media de Rating, precios como
+        # números y la categoría con todas sus descendientes.
+        now = timezone.now()
+        ids = set()
+        for auction in Auction.objects.all():
+            values = list(auction.ratings.values_list("valor_numerico", flat=True))
+            category, ancestors = auction.category, set()
+            while category is not None:
+                ancestors.add(category.id)
+                category = category.parent
+            search = params.get("search", "").lower()
+            checks = [
+                search in auction.title.lower()
+                or search in auction.description.lower(),
+                "category" not in params or params["category"] in ancestors,
+                float(auction.price) >= float(params.get("priceMin", 0)),
+                float(auction.price) <= float(params.get("priceMax", "inf")),
+                "rating" not in params
+                or (values and sum(values) / len(values) >= float(params["rating"])),
+                "is_open" not in params
+                or (auction.closing_date >= now) == (params["is_open"] == "true"),
+            ]
+            if all(checks):
+                ids.add(auction.id)
+        return ids
+
+    def test_results_match_the_previous_filtering(self):
+        for params in [
+            {},
+            {"search": "quijote"},
+            {"category": self.category.id},
+            {"priceMin": "6", "priceMax": "30"},
+            {"rating": "3"},
+            {"is_open": "true"},
+            {"is_open": "false"},
+            {"category": self.category.id, "rating": "2", "is_open": "true"},
+            {"search": "quij", "priceMin": "10"},
+        ]:
+            with self.subTest(params=params):
+                self.assertEqual(self.listed(params), self.expected(params))
+
+    def test_empty_parameters_are_ignored(self):
+        self.assertEqual(self.listed({"priceMin": "", "rating": ""}), self.expected({}))
+
+    def test_rejected_parameters_are_reported_per_field(self):
+        response = self.client.get(
+            "/api/auctions/",
+            {"priceMin": "abc", "rating": "7", "category": 999, "search": "ab"},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            set(response.data), {"priceMin", "rating", "category", "search"}
+        )
+
+        response = self.client.get("/api/auctions/", {"priceMin": 10, "priceMax": 5})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("price", response.data)
+
+
+class LocationFilterTest(APITestCase):
+    def listed(self, params):
+        response = self.client.get("/api/auctions/", params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return {auction["id"] for auction in response.data["results"]}
+
+    def test_locality_requires_municipality(self):
+        response = self.client.get("/api/auctions/", {"locality": "Centro"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("locality", response.data)
+
+    def test_non_latin_locations_get_their_own_key(self):
+        plaka = create_auction(
+            self.user, self.category, municipality="Αθήνα", locality="Πλάκα"
+        )
+        kifisia = create_auction(
+            self.user, self.category, municipality="Αθήνα", locality="Κηφισιά"
+        )
+        self.assertEqual(plaka.location_key, "αθηνα/πλακα")
+        self.assertEqual(self.listed({"municipality": "Αθήνα"}), {plaka.id, kifisia.id})
+        self.assertEqual(
+            self.listed({"municipality": "Αθήνα", "locality": "Πλάκα"}), {plaka.id}
+        )
+
+    def test_accents_do_not_change_the_key(self):
+        auction = create_auction(self.user, self.category, municipality="Málaga")
+        self.assertEqual(auction.location_key, "malaga/")
+        self.assertEqual(self.listed({"municipality": "MALAGA"}), {auction.id})
+
+
+class AuctionImportTest(APITestCase):
+    def test_malformed_csv_reports_line(self):
+        self.user.is_staff = True
+        self.user.save()
+        content = IMPORT_HEADER + import_row("Uno") + "x" * 200_000 + ",\n"
+        upload = SimpleUploadedFile("auctions.csv", content.encode())
+        response = self.client.post(
+            "/api/auctions/import/", {"file": upload}, format="multipart"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("línea 3", response.data["file"][0])
+        self.assertEqual(response.data["last_row"], 0)
+
+    def test_database_error_reports_last_committed_row(self):
+        content = IMPORT_HEADER + import_row("Uno") + import_row("Dos")
+        rows = iter_rows(io.StringIO(content), "csv")
+        bulk_create = Auction.objects.bulk_create
+        calls = []
+
+        def flaky_bulk_create(objs):
+            calls.append(objs)
+            if len(calls) > 1:
+                raise OperationalError("disk I/O error")
+            return bulk_create(objs)
+
+        importer = AuctionImporter(self.user, chunk_size=1)
+        with mock.patch.object(Auction.objects, "bulk_create", flaky_bulk_create):
+            with self.assertRaises(ImportInterrupted) as raised:
+                importer.run(rows)
+        self.assertEqual(raised.exception.report["last_row"], 1)
+        self.assertTrue(Auction.objects.filter(title="Uno").exists())
+        self.assertFalse(Auction.objects.filter(title="Dos").exists())
+
+    def test_non_integer_auctioneer_is_rejected(self):
+        self.user.is_staff = True
+        self.user.save()
+        upload = SimpleUploadedFile("auctions.csv", IMPORT_HEADER.encode())
+        response = self.client.post(
+            "/api/auctions/import/",
+            {"file": upload, "auctioneer": "ana"},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("auctioneer", response.data)
+
+    def test_programming_errors_are_not_reported_as_bad_files(self):
+        rows = iter_rows(io.StringIO(IMPORT_HEADER + import_row("Uno")), "csv")
+        importer = AuctionImporter(self.user)
+        with mock.patch.object(
+            importer, "_build_auction", side_effect=ValueError("bug")
+        ):
+            with self.assertRaisesMessage(ValueError, "bug"):
+                importer.run(rows)
+
+    def test_resume_refuses_a_checkpoint_of_another_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = f"{directory}/auctions.csv"
+            with open(path, "w") as stream:
+                stream.write(IMPORT_HEADER + import_row("Uno"))
+            with open(f"{path}.checkpoint", "w") as stream:
+                stream.write('{"source": "/tmp/otro.csv", "row": 1}')
+            with self.assertRaisesMessage(CommandError, "otro.csv"):
+                call_command("import_auctions", path, auctioneer="ana", resume=True)
+        self.assertFalse(Auction.objects.filter(title="Uno").exists())
+
+
+class AuctionFeedTest(APITestCase):
+    def test_ending_soon_without_score_has_null_score_fields(self):
+        feeds._feed_cache.clear()
+        response = self.client.get("/api/auctions/feeds/ending-soon/")
+        self.assertEqual(response.status_code, 200)
+        item = response.data[0]
+        self.assertEqual(item["id"], self.auction.id)
+        for field in ("bids_last_hour", "unique_bidders", "score"):
+            self.assertIsNone(item[field])
+
+
+class DeletionJobTest(APITestCase):
+    def test_user_deletion_runs_in_batches(self):
+        bob = create_user("bob")
+        other = create_auction(bob, self.category)
+        Rating.objects.create(user=self.user, auction=other, valor_numerico=5)
+        comment = Comentario.objects.create(
+            usuario=self.user,
+            auction=other,
+            titulo="Hola",
+            campo_de_texto="Primero",
+            fecha_ultima_modificacion=timezone.now(),
+        )
+        Comentario.objects.create(
+            usuario=bob,
+            auction=other,
+            parent=comment,
+            titulo="Re",
+            campo_de_texto="Respuesta",
+            fecha_ultima_modificacion=timezone.now(),
+        )
+        Bid.objects.create(auction=other, bidder=self.user, price=20)
+        job = schedule_user_deletion(self.user)
+        job.batch_size = 1
+        job.save()
+
+        self.assertEqual(run_pending_jobs(), [job])
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, DeletionJob.DONE)
+        other.refresh_from_db()
+        self.assertEqual(other.rating_count, 0)
+        self.assertEqual(other.rating_score, settings.RATING_PRIOR_MEAN)
+        # La respuesta de bob cuelga del comentario borrado y se va con él.
+        self.assertEqual(other.comment_count, 0)
+        self.assertFalse(Comentario.objects.filter(auction=other).exists())
+        self.assertFalse(Bid.objects.filter(bidder=self.user.pk).exists())
+        self.assertFalse(Auction.all_objects.filter(pk=self.auction.pk).exists())
+        self.assertFalse(type(self.user).objects.filter(pk=self.user.pk).exists())
+
+    def test_job_is_claimed_once(self):
+        job = schedule_auction_deletion(self.auction)
+        self.assertEqual(claim_next_job(), job)
+        self.assertIsNone(claim_next_job())
+
+    def test_stale_running_job_is_resumed(self):
+        job = schedule_auction_deletion(self.auction)
+        claim_next_job()
+        self.assertIsNone(claim_next_job())
+
+        expired = timezone.now() - settings.DELETION_JOB_LEASE - timedelta(minutes=1)
+        DeletionJob.objects.filter(pk=job.pk).update(heartbeat_at=expired)
+        self.assertEqual(run_pending_jobs(), [job])
+        job.refresh_from_db()
+        self.assertEqual(job.status, DeletionJob.DONE)
+        self.assertFalse(Auction.all_objects.filter(pk=self.auction.pk).exists())
+
+    @override_settings(BID_ENGINE_ENABLED=True)
+    def test_deleted_bids_reach_the_bid_engine(self):
+        other = create_auction(create_user("bob"), self.category)
+        Bid.objects.create(auction=other, bidder=self.user, price=20)
+        job = schedule_user_deletion(self.user)
+        with mock.patch.object(bid_engine, "notify_auction_changed") as notify:
+            run_job(claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, DeletionJob.DONE)
+        notify.assert_any_call(other.id)
+
+
+class RowDeleteReceiversTest(TransactionTestCase):
+    def test_pause_only_affects_the_current_thread(self):
+        user = create_user("ana")
+        auction = create_auction(user, Category.objects.create(name="Libros"))
+        comments = [
+            Comentario.objects.create(
+                usuario=user,
+                auction=auction,
+                titulo="Hola",
+                campo_de_texto="Texto",
+                fecha_ultima_modificacion=timezone.now(),
+            )
+            for _ in range(2)
+        ]
+
+        def delete_elsewhere():
+            comments[0].delete()
+            connection.close()
+
+        with row_delete_receivers_paused():
+            other = threading.Thread(target=delete_elsewhere)
+            other.start()
+            other.join()
+            auction.refresh_from_db()
+            self.assertEqual(auction.comment_count, 1)
+            comments[1].delete()
+        auction.refresh_from_db()
+        self.assertEqual(auction.comment_count, 1)
+
+
+class CommentTest(APITestCase):
+    def comment(self, **kwargs):
+        return Comentario.objects.create(
+            usuario=self.user,
+            auction=self.auction,
+            titulo="Hola",
+            campo_de_texto="Texto",
+            fecha_ultima_modificacion=timezone.now(),
+            **kwargs,
+        )
+
+    def test_failed_path_update_rolls_back_the_insert(self):
+        with mock.patch(
+            "django.db.models.QuerySet.update", side_effect=OperationalError("fallo")
+        ):
+            with self.assertRaises(OperationalError):
+                self.comment()
+        self.assertFalse(Comentario.objects.exists())
+
+    def test_comments_are_listed_by_creation_date(self):
+        first, second = self.comment(), self.comment()
+        Comentario.objects.filter(pk=first.pk).update(
+            fecha_creacion=timezone.now() + timedelta(minutes=1)
+        )
+        response = self.client.get(f"/api/auctions/{self.auction.id}/comments")
+        self.assertEqual(
+            [comment["id"] for comment in response.data["results"]],
+            [second.id, first.id],
+        )
+
+
+class RatingAggregateTest(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.bob = create_user("bob")
+        self.eva = create_user("eva")
+        self.url = f"/api/auctions/{self.auction.id}/ratings/"
+
+    def rate(self, user, value):
+        self.client.force_authenticate(user)
+        response = self.client.post(self.url, {"valor_numerico": value}, format="json")
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data["id"]
+
+    def assertCached(self, histogram):
+        # Lo aplicado rating a rating coincide con recalcularlo desde Rating.
+        self.auction.refresh_from_db()
+        cached = (
+            self.auction.rating_histogram,
+            self.auction.rating_average,
+            self.auction.rating_score,
+        )
+        refresh_ratings(Auction.all_objects.filter(pk=self.auction.pk))
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.rating_histogram, histogram)
+        self.assertEqual(
+            cached,
+            (
+                self.auction.rating_histogram,
+                self.auction.rating_average,
+                self.auction.rating_score,
+            ),
+        )
+        total = sum(int(value) * n for value, n in histogram.items())
+        count = sum(histogram.values())
+        self.assertAlmostEqual(self.auction.rating_average, total / count)
+        self.assertAlmostEqual(self.auction.rating_score, bayesian_score(total, count))
+
+    def test_create_update_and_delete_keep_the_average_in_sync(self):
+        bob_rating = self.rate(self.bob, 5)
+        self.assertCached({"1": 0, "2": 0, "3": 0, "4": 0, "5": 1})
+        eva_rating = self.rate(self.eva, 2)
+        self.assertCached({"1": 0, "2": 1, "3": 0, "4": 0, "5": 1})
+
+        self.client.force_authenticate(self.bob)
+        response = self.client.patch(
+            f"{self.url}{bob_rating}/", {"valor_numerico": 3}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertCached({"1": 0, "2": 1, "3": 1, "4": 0, "5": 0})
+
+        self.client.force_authenticate(self.eva)
+        response = self.client.delete(f"{self.url}{eva_rating}/")
+        self.assertEqual(response.status_code, 204)
+        self.assertCached({"1": 0, "2": 0, "3": 1, "4": 0, "5": 0})
+
+    def test_save_without_reading_the_rating_recomputes_the_auction(self):
+        rating_id = self.rate(self.bob, 5)
+        Rating(
+            pk=rating_id, user=self.bob, auction=self.auction, valor_numerico=1
+        ).save()
+        self.assertCached({"1": 1, "2": 0, "3": 0, "4": 0, "5": 0})
+
+
+class ArchiveTest(APITestCase):
+    def test_archive_deletes_children_with_one_statement_per_table(self):
+        bob = create_user("bob")
+        Auction.objects.filter(pk=self.auction.pk).update(
+            closing_date=timezone.now() - timedelta(days=2)
+        )
+        for price in range(11, 41):
+            Bid.objects.create(auction=self.auction, bidder=bob, price=price)
+        Rating.objects.create(user=bob, auction=self.auction, valor_numerico=4)
+        comment = Comentario.objects.create(
+            usuario=bob,
+            auction=self.auction,
+            titulo="Hola",
+            campo_de_texto="Texto",
+            fecha_ultima_modificacion=timezone.now(),
+        )
+        Comentario.objects.create(
+            usuario=self.user,
+            auction=self.auction,
+            parent=comment,
+            titulo="Re",
+            campo_de_texto="Respuesta",
+            fecha_ultima_modificacion=timezone.now(),
+        )
+        dashboard_version = get_version("dashboard", bob.pk)
+
+        with CaptureQueriesContext(connection) as queries:
+            archived = archive_closed_auctions(retention=timedelta(days=1))
+
+        self.assertEqual(archived, 1)
+        archive = ArchivedAuction.objects.get(auction_id=self.auction.id)
+        self.assertEqual((archive.bid_count, archive.final_price), (30, 40))
+        self.assertFalse(Auction.all_objects.filter(pk=self.auction.pk).exists())
+        self.assertFalse(Bid.objects.exists())
+        self.assertFalse(Comentario.objects.exists())
+        self.assertFalse(Rating.objects.exists())
+        bid_deletes = [
+            query
+            for query in queries.captured_queries
+            if query["sql"].startswith('DELETE FROM "auctions_bid"')
+        ]
+        self.assertEqual(len(bid_deletes), 1)
+        self.assertNotEqual(get_version("dashboard", bob.pk), dashboard_version)
+
+
+class AnalyticsTest(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user.is_staff = True
+        self.user.save()
+        self.bob = create_user("bob")
+        self.day = timezone.localdate() - timedelta(days=3)
+        self.noon = day_bounds(self.day)[0] + timedelta(hours=12)
+
+    def daily(self, day):
+        response = self.client.get(
+            "/api/auctions/analytics/daily/", {"start": day, "end": day}
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_rollup_counts_live_bids_and_archived_sales(self):
+        archived = create_auction(self.user, self.category, title="Archivada")
+        Auction.objects.filter(pk=archived.pk).update(closing_date=self.noon)
+        Bid.objects.create(
+            auction=archived,
+            bidder=self.bob,
+            price=40,
+            created_date=self.noon - timedelta(days=1),
+        )
+        self.assertEqual(archive_closed_auctions(retention=timedelta(days=1)), 1)
+
+        live = create_auction(self.user, self.category, title="Viva")
+        Auction.objects.filter(pk=live.pk).update(
+            creation_date=self.noon - timedelta(days=5),
+            closing_date=self.noon + timedelta(hours=2),
+        )
+        for price, hour in [(15, 0), (30, 1)]:
+            Bid.objects.create(
+                auction=live,
+                bidder=self.bob,
+                price=price,
+                created_date=self.noon + timedelta(hours=hour),
+            )
+
+        days = run_rollup()
+        self.assertEqual(days[-1], timezone.localdate())
+
+        [stats] = self.daily(self.day)
+        self.assertEqual(Decimal(stats["gmv"]), 70)
+        self.assertEqual(stats["sold_auctions"], 2)
+        self.assertEqual(stats["bids"], 2)
+        self.assertEqual(stats["active_auctions"], 2)
+        response = self.client.get(
+            "/api/auctions/analytics/categories/",
+            {"start": self.day, "end": self.day},
+        )
+        [category] = response.data
+        self.assertEqual(category["category"], self.category.id)
+        self.assertEqual((category["bids"], Decimal(category["gmv"])), (2, 70))
+
+    def test_rollup_resumes_from_the_watermark_and_recomputes_today(self):
+        run_rollup()
+        Bid.objects.create(auction=self.auction, bidder=self.bob, price=20)
+        self.assertEqual(run_rollup(), [timezone.localdate()])
+        [stats] = self.daily(timezone.localdate())
+        self.assertEqual(stats["bids"], 1)
+
+
+fetched_urls = []
+
+
+def fake_fetch(url):
+    fetched_urls.append(url)
+    from PIL import Image
+
+    out = io.BytesIO()
+    Image.new("RGB", (800, 600)).save(out, "PNG")
+    return out.getvalue()
+
+
+class ThumbnailFetchTest(SimpleTestCase):
+    def test_only_public_http_urls_are_fetched(self):
+        for url in [
+            "file:///etc/passwd",
+            "ftp://example.com/a.png",
+            "http://127.0.0.1/a.png",
+            "http://10.0.0.1/a.png",
+            "http://169.254.169.254/latest/meta-data/",
+            "http://[::1]/a.png",
+        ]:
+            with self.subTest(url=url):
+                with self.assertRaises(thumbnails.ThumbnailError):
+                    thumbnails.check_public_url(url)
+        thumbnails.check_public_url("http://8.8.8.8/a.png")
+
+    def test_redirects_are_checked(self):
+        handler = thumbnails.PublicRedirectHandler()
+        with self.assertRaises(thumbnails.ThumbnailError):
+            handler.redirect_request(
+                None, None, 302, "Found", {}, "http://127.0.0.1/admin"
+            )
+
+
+@override_settings(
+    THUMBNAIL_FETCHER="auctions.tests.fake_fetch",
+    THUMBNAIL_ROOT=tempfile.mkdtemp(),
+)
+class ThumbnailCacheTest(APITestCase):
+    def test_thumbnails_are_cached_by_the_command_not_on_save(self):
+        fetched_urls.clear()
+        self.auction.thumbnail = "https://example.com/other.png"
+        self.auction.save()
+        self.assertEqual(fetched_urls, [])
+
+        call_command("cache_thumbnails", stdout=io.StringIO())
+        self.assertEqual(fetched_urls, ["https://example.com/other.png"])
+        self.auction.refresh_from_db()
+        self.assertEqual(set(self.auction.thumbnail_variants), {"small", "medium"})
+
+    def test_removed_thumbnail_forgets_the_variants(self):
+        call_command("cache_thumbnails", stdout=io.StringIO())
+        self.auction.refresh_from_db()
+        self.assertTrue(self.auction.thumbnail_variants)
+        Auction.objects.filter(pk=self.auction.pk).update(thumbnail="")
+        out = io.StringIO()
+        call_command("cache_thumbnails", stdout=out)
+        self.assertIn("0 miniaturas cacheadas, 0 fallidas", out.getvalue())
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.thumbnail_source, "")
+        self.assertEqual(self.auction.thumbnail_variants, {})
+
+
+class OptimisticConcurrencyTest(APITestCase):
+    def url(self):
+        return f"/api/auctions/{self.auction.id}/"
+
+    def test_etag_and_if_match(self):
+        response = self.client.get(self.url())
+        self.assertEqual(response["ETag"], '"1"')
+
+        response = self.client.patch(
+            self.url(), {"title": "Nuevo"}, format="json", HTTP_IF_MATCH='"1"'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["ETag"], '"2"')
+
+        # Un cliente que sigue con la versión 1 no pisa el cambio.
+        response = self.client.patch(
+            self.url(), {"title": "Viejo"}, format="json", HTTP_IF_MATCH='"1"'
+        )
+        self.assertEqual(response.status_code, 412)
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.title, "Nuevo")
+
+    def test_concurrent_update_conflicts(self):
+        first = Auction.objects.get(pk=self.auction.pk)
+        second = Auction.objects.get(pk=self.auction.pk)
+        first.expected_version = first.version
+        first.title = "Primero"
+        first.save()
+        second.expected_version = second.version
+        second.title = "Segundo"
+        with self.assertRaises(VersionConflict):
+            second.save()
+        self.auction.refresh_from_db()
+        self.assertEqual((self.auction.title, self.auction.version), ("Primero", 2))
+
+    def test_bid_update_must_stay_highest(self):
+        bob = create_user("bob")
+        bid = Bid.objects.create(auction=self.auction, bidder=self.user, price=20)
+        Bid.objects.create(auction=self.auction, bidder=bob, price=30)
+        bid.expected_version = bid.version
+        bid.price = 25
+        # El serializer ya lo rechazaría; aquí se comprueba la condición del UPDATE.
+        with self.assertRaises(UpdateConditionFailed):
+            bid.save()
+
+
+class BidEngineTest(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.bidder = create_user("bob")
+        journal_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(journal_dir.cleanup)
+        settings_override = override_settings(BID_ENGINE_JOURNAL_DIR=journal_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def start_shard(self):
+        shard = bid_engine.Shard(0)
+        shard.recover()
+        self.addCleanup(shard.journal.close)
+        return shard
+
+    def test_recovers_unwritten_bids_from_journal(self):
+        shard = self.start_shard()
+        first = shard.submit(self.auction.id, self.bidder.id, "15")
+        second = shard.submit(self.auction.id, self.bidder.id, "20")
+        self.assertTrue(first["accepted"] and second["accepted"])
+        # Solo el primero llega a la BD antes de que el proceso muera.
+        shard._insert(shard.pending[:1], first["seq"])
+
+        self.start_shard()
+        bids = Bid.objects.filter(auction=self.auction).order_by("price")
+        self.assertEqual([bid.price for bid in bids], [15, 20])
+        self.assertEqual(
+            [bid.created_date.isoformat() for bid in bids],
+            [first["created"], second["created"]],
+        )
+        self.assertEqual(Watermark.objects.get(name="bid_engine.0").position, 2)
+
+    def test_auction_changes_reach_the_shard(self):
+        shard = self.start_shard()
+        self.assertTrue(shard.submit(self.auction.id, self.bidder.id, "15")["accepted"])
+
+        Auction.objects.filter(pk=self.auction.pk).update(
+            closing_date=timezone.now() - timedelta(minutes=1)
+        )
+        shard.auction_changed(self.auction.id)
+        decision = shard.submit(self.auction.id, self.bidder.id, "20")
+        self.assertEqual(decision["reason"], "La subasta está cerrada.")
+
+        schedule_auction_deletion(self.auction)
+        shard.auction_changed(self.auction.id)
+        decision = shard.submit(self.auction.id, self.bidder.id, "20")
+        self.assertEqual(decision["reason"], "not_found")
+
+    def test_transient_write_errors_are_retried(self):
+        shard = self.start_shard()
+        self.assertTrue(shard.submit(self.auction.id, self.bidder.id, "15")["accepted"])
+        insert, calls = shard._insert, []
+
+        def flaky_insert(entries, position):
+            calls.append(entries)
+            if len(calls) == 1:
+                raise OperationalError("database is locked")
+            return insert(entries, position)
+
+        with mock.patch.object(shard, "_insert", flaky_insert):
+            with self.assertRaises(OperationalError):
+                shard.flush()
+            # La puja sigue pendiente y en el diario.
+            self.assertEqual(len(shard.pending), 1)
+            self.assertEqual(len(shard._read_journal()), 1)
+            self.assertEqual(shard.flush(), 1)
+        self.assertEqual(
+            list(
+                Bid.objects.filter(auction=self.auction).values_list("price", flat=True)
+            ),
+            [15],
+        )
+        self.assertEqual(shard._read_journal(), [])
+
+    def test_deleted_bids_lower_the_top_price(self):
+        Bid.objects.create(auction=self.auction, bidder=self.user, price=50)
+        shard = self.start_shard()
+        decision = shard.submit(self.auction.id, self.bidder.id, "20")
+        self.assertEqual(decision["reason"], bid_engine.HIGHER_BID_REQUIRED)
+
+        Bid.objects.filter(auction=self.auction).delete()
+        shard.auction_changed(self.auction.id)
+        self.assertTrue(shard.submit(self.auction.id, self.bidder.id, "20")["accepted"])
+
+    def test_bid_is_not_resent_after_it_was_sent(self):
+        conn = mock.Mock()
+        conn.recv.side_effect = EOFError
+        bid_engine._local.__dict__.pop("connections", None)
+        with mock.patch.object(bid_engine, "Client", return_value=conn):
+            with self.assertRaises(bid_engine.BidEngineUnavailable):
+                bid_engine.submit(self.auction.id, self.bidder.id, 15)
+        conn.send.assert_called_once()
+
+    @override_settings(BID_ENGINE_ENABLED=True)
+    def test_bids_cannot_be_modified_while_the_engine_runs(self):
+        bid = Bid.objects.create(auction=self.auction, bidder=self.user, price=20)
+        url = f"/api/auctions/{self.auction.id}/bid/{bid.id}/"
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.client.delete(url).status_code, 409)
+        self.assertTrue(Bid.objects.filter(pk=bid.pk).exists())
+
+
+class CategoryTreeTest(TestCase):
+    def save(self, category):
+        with self.captureOnCommitCallbacks(execute=True):
+            category.save()
+        return category
+
+    def test_tree_follows_create_and_move(self):
+        books = self.save(Category(name="Libros"))
+        comics = self.save(Category(name="Cómics"))
+        novels = self.save(Category(name="Novela", parent=books))
+        self.assertEqual(
+            get_category(novels.id)["path"],
+            f"{books.path}{novels.id:0{Category.PATH_STEP}d}/",
+        )
+
+        novels.parent = comics
+        self.save(novels)
+        self.assertEqual(get_category(novels.id)["path"], novels.path)
+        start, end = subtree_range(comics.id)
+        self.assertTrue(start <= novels.path < end)
+
+    def test_changes_from_other_workers_are_picked_up(self):
+        books = self.save(Category(name="Libros"))
+        get_tree()
+        # Escrituras que no bumpean la versión, como las de otro worker sin caché
+        # compartida.
+        [poetry] = Category.objects.bulk_create([Category(name="Poesía")])
+        self.assertIsNotNone(get_category(poetry.id))
+        Category.objects.filter(pk=books.pk).update(name="Libros usados")
+        with override_settings(CATEGORY_TREE_TIMEOUT=0):
+            self.assertEqual(get_category(books.id)["name"], "Libros usados")
+
+    def test_move_counts_the_depth_of_the_whole_branch(self):
+        def chain(name, length, parent=None):
+            for level in range(length):
+                parent = Category.objects.create(name=f"{name}{level}", parent=parent)
+            return parent
+
+        branch = chain("A", 1)
+        chain("C", 2, parent=branch)  # rama de altura 2
+        deep = chain("B", Category.MAX_DEPTH - 2)  # profundidad MAX_DEPTH - 3
+
+        serializer = CategoryDetailSerializer(
+            branch, data={"parent": deep.id}, partial=True
+        )
+        self.assertFalse(serializer.is_valid())
+        self.assertIn("parent", serializer.errors)
+        serializer = CategoryDetailSerializer(
+            branch, data={"parent": deep.parent.id}, partial=True
+        )
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+
+class IdempotentCreateTest(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(create_user("bob"))
+
+    def post_bid(self, price, key="clave-1"):
+        return self.client.post(
+            f"/api/auctions/{self.auction.id}/bid/",
+            {"auction": self.auction.id, "price": price},
+            format="json",
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_retry_replays_the_stored_response(self):
+        first = self.post_bid("15.00")
+        retry = self.post_bid("15.00")
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual((retry.status_code, retry.data), (201, first.data))
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(Bid.objects.filter(auction=self.auction).count(), 1)
+        self.assertEqual(self.post_bid("16.00").status_code, 422)
+
+    @override_settings(BID_ENGINE_ENABLED=True)
+    def test_retry_is_not_resent_to_the_bid_engine(self):
+        decision = {
+            "accepted": True,
+            "auction": self.auction.id,
+            "bidder": 2,
+            "price": "15.00",
+            "created": timezone.now().isoformat(),
+        }
+        with mock.patch.object(bid_engine, "submit", return_value=decision) as submit:
+            first = self.post_bid("15.00")
+            retry = self.post_bid("15.00")
+        submit.assert_called_once()
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual((retry.status_code, retry.data), (202, first.data))
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+
+
+@override_settings(COMPRESSION_MIN_SIZE=0)
+class CompressedETagTest(APITestCase):
+    def test_compressed_etag_is_weak_and_still_matches(self):
+        url = f"/api/auctions/{self.auction.id}/"
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["ETag"], 'W/"1"')
+        response = self.client.patch(
+            url, {"title": "Nuevo"}, format="json", HTTP_IF_MATCH=response["ETag"]
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_schema_revalidates_with_weak_etag(self):
+        response = self.client.get("/api/schema/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertTrue(response["ETag"].startswith('W/"'))
+        response = self.client.get(
+            "/api/schema/",
+            HTTP_ACCEPT_ENCODING="gzip",
+            HTTP_IF_NONE_MATCH=response["ETag"],
+        )
+        self.assertEqual(response.status_code, 304)
+
+
+class WriteQueueTest(TransactionTestCase):
+    def write(self, function):
+        return write_queue._Write(function, using=())
+
+    def test_batch_is_committed_once(self):
+        batch = [
+            self.write(lambda name=name: Category.objects.create(name=name))
+            for name in ("Libros", "Cómics", "Discos")
+        ]
+        with mock.patch.object(connection, "commit", wraps=connection.commit) as commit:
+            write_queue._write(batch)
+        commit.assert_called_once()
+        self.assertEqual(
+            [write.future.result().name for write in batch],
+            ["Libros", "Cómics", "Discos"],
+        )
+
+    def test_failing_write_only_rolls_back_itself(self):
+        def failing():
+            Category.objects.create(name="Rota")
+            raise ValueError("fallo")
+
+        batch = [
+            self.write(lambda: Category.objects.create(name="Libros")),
+            self.write(failing),
+            self.write(lambda: Category.objects.create(name="Discos")),
+        ]
+        write_queue._write(batch)
+        with self.assertRaises(ValueError):
+            batch[1].future.result()
+        self.assertEqual(
+            sorted(Category.objects.values_list("name", flat=True)),
+            ["Discos", "Libros"],
+        )
+
+    @override_settings(WRITE_QUEUE_ENABLED=True, WRITE_QUEUE_TIMEOUT=0.1)
+    def test_timed_out_write_is_cancelled(self):
+        started, release = threading.Event(), threading.Event()
+
+        def blocking():
+            started.set()
+            release.wait()
+
+        blocked = threading.Thread(target=write_queue.run, args=(blocking,))
+        blocked.start()
+        started.wait()
+        with self.assertRaises(write_queue.WriteQueueTimeout):
+            write_queue.run(lambda: Category.objects.create(name="Tarde"))
+        release.set()
+        blocked.join()
+        # Cuando el escritor procesa esta, ya ha descartado la cancelada.
+        write_queue.run(lambda: None)
+        self.assertFalse(Category.objects.filter(name="Tarde").exists())
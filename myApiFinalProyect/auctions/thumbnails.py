@@ -0,0 +1,187 @@
+"""
+Caché local de las miniaturas de las subastas.
+
+Cuando cambia Auction.thumbnail, el comando cache_thumbnails (fuera de las
+peticiones) descarga la imagen una sola vez con el fetcher configurado en
+THUMBNAIL_FETCHER (una función ``url -> bytes``, que en los tests puede
+sustituirse por una que no use la red), se generan las variantes
+de THUMBNAIL_SIZES y se guardan en THUMBNAIL_ROOT con un nombre derivado del
+sha256 de la imagen original. Como el nombre depende solo del contenido, los
+ficheros no cambian nunca y se pueden servir con caché de larga duración.
+
+La URL la pone el usuario, así que http_fetch solo descarga por http(s) de
+direcciones públicas y vuelve a comprobarlo en cada redirección.
+
+Pillow es opcional: sin él no se redimensiona y todas las variantes apuntan a la
+imagen original.
+"""
+
+import hashlib
+import io
+import ipaddress
+import logging
+import os
+import re
+import socket
+import urllib.request
+from importlib.util import find_spec
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+from .models import Auction
+
+logger = logging.getLogger(__name__)
+
+ORIGINAL = "original"
+
+# Pillow se importa solo al redimensionar, para no cargarlo al arrancar cada
+# worker (este módulo se importa desde los serializers).
+HAS_PILLOW = find_spec("PIL") is not None
+
+# Firmas de los formatos aceptados; cualquier otra cosa se descarta.
+SIGNATURES = {
+    b"\x89PNG\r\n\x1a\n": ("png", "image/png"),
+    b"\xff\xd8\xff": ("jpg", "image/jpeg"),
+    b"GIF87a": ("gif", "image/gif"),
+    b"GIF89a": ("gif", "image/gif"),
+}
+CONTENT_TYPES = {ext: content_type for ext, content_type in SIGNATURES.values()}
+CONTENT_TYPES["webp"] = "image/webp"
+
+FILE_NAME = re.compile(r"^[0-9a-f]{64}-[a-z]+\.(?P<ext>[a-z]+)$")
+
+
+class ThumbnailError(Exception):
+    pass
+
+
+def check_public_url(url):
+    """Lanza ThumbnailError si ``url`` no es http(s) o su host no es público."""
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ThumbnailError(f"URL no permitida: {url}")
+    try:
+        addresses = socket.getaddrinfo(parts.hostname, parts.port or 0)
+    except (socket.gaierror, ValueError):
+        raise ThumbnailError(f"No se puede resolver {parts.hostname}.")
+    for *_, sockaddr in addresses:
+        # Se descartan loopback, redes privadas, link-local (metadatos de la
+        # nube), reservadas...
+        if not ipaddress.ip_address(sockaddr[0].split("%")[0]).is_global:
+            raise ThumbnailError(f"{parts.hostname} no es una dirección pública.")
+
+
+class PublicRedirectHandler(urllib.request.HTTPRedirectHandler):
+    max_redirections = 3
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        check_public_url(newurl)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+def http_fetch(url):
+    """Fetcher por defecto: descarga la imagen con un límite de tiempo y tamaño."""
+    check_public_url(url)
+    opener = urllib.request.build_opener(PublicRedirectHandler)
+    request = urllib.request.Request(url, headers={"User-Agent": "auctions-thumbnails"})
+    with opener.open(request, timeout=settings.THUMBNAIL_FETCH_TIMEOUT) as response:
+        data = response.read(settings.THUMBNAIL_MAX_BYTES + 1)
+    if len(data) > settings.THUMBNAIL_MAX_BYTES:
+        raise ThumbnailError("La imagen supera THUMBNAIL_MAX_BYTES.")
+    return data
+
+
+def get_fetcher():
+    return import_string(settings.THUMBNAIL_FETCHER)
+
+
+def image_format(data):
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    for signature, (ext, _) in SIGNATURES.items():
+        if data.startswith(signature):
+            return ext
+    raise ThumbnailError("El fichero descargado no es una imagen soportada.")
+
+
+def variant_path(name):
+    return os.path.join(settings.THUMBNAIL_ROOT, name[:2], name)
+
+
+def _write(name, data):
+    path = variant_path(name)
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Escritura atómica para que nunca se sirva un fichero a medias.
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+
+
+def _resize(data, size):
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert("RGB")
+        image.thumbnail((size, size))
+        out = io.BytesIO()
+        image.save(out, "JPEG", quality=settings.THUMBNAIL_QUALITY, optimize=True)
+        return out.getvalue()
+
+
+def store_image(data):
+    """Guarda las variantes de ``data`` y devuelve el fichero de cada una."""
+    ext = image_format(data)
+    digest = hashlib.sha256(data).hexdigest()
+    if not HAS_PILLOW:
+        name = f"{digest}-{ORIGINAL}.{ext}"
+        _write(name, data)
+        return {variant: name for variant in settings.THUMBNAIL_SIZES}
+
+    variants = {}
+    for variant, size in settings.THUMBNAIL_SIZES.items():
+        name = f"{digest}-{variant}.jpg"
+        if not os.path.exists(variant_path(name)):
+            _write(name, _resize(data, size))
+        variants[variant] = name
+    return variants
+
+
+def cache_thumbnail(auction, fetcher=None):
+    """
+    Descarga y procesa la miniatura de ``auction`` si ha cambiado desde la
+    última vez. Los errores se registran y dejan la subasta sin variantes, de
+    modo que los clientes siguen usando la URL original.
+    """
+    url = auction.thumbnail
+    if not url or url == auction.thumbnail_source:
+        return False
+    fetcher = fetcher or get_fetcher()
+    variants = {}
+    try:
+        variants = store_image(fetcher(url))
+    except Exception:
+        logger.warning("No se pudo cachear la miniatura %s", url, exc_info=True)
+    # update() en lugar de save() para no volver a disparar las señales.
+    Auction.all_objects.filter(pk=auction.pk, thumbnail=url).update(
+        thumbnail_source=url, thumbnail_variants=variants
+    )
+    auction.thumbnail_source = url
+    auction.thumbnail_variants = variants
+    return bool(variants)
+
+
+def thumbnail_urls(auction, request=None):
+    """URLs de las variantes de la miniatura, o None si aún no hay caché."""
+    if not auction.thumbnail_variants:
+        return None
+    urls = {}
+    for variant, name in auction.thumbnail_variants.items():
+        url = reverse("auctions:thumbnail", kwargs={"name": name})
+        urls[variant] = request.build_absolute_uri(url) if request else url
+    return urls
@@ -4,6 +4,7 @@ from .views import (
     CategoryRetrieveUpdateDestroy,
     AuctionListCreate,
     AuctionRetrieveUpdateDestroy,
+    AuctionSnapshotView,
     BidsListCreate,
     BidsRetrieveUpdateDestroy,
     UserAuctionListView,
@@ -11,11 +12,21 @@ from .views import (
     RatingsRetrieveUpdateDestroy,
     ComentListCreate,
     ComentRetrieveUpdateDestroy,
+    ComentThreadView,
     UserRatingsView,
     UserComentsView,
+    AuctionImportView,
+    HotAuctionsView,
+    EndingSoonAuctionsView,
+    ThumbnailView,
+    WatchListCreate,
+    WatchDestroy,
+    NotificationListView,
+    NotificationMarkReadView,
+    DailyStatsView,
+    CategoryStatsView,
 )
 
-
 app_name = "auctions"
 urlpatterns = [
     path("categories/", CategoryListCreate.as_view(), name="category-list-create"),
@@ -25,7 +36,16 @@ urlpatterns = [
         name="category-detail",
     ),
     path("", AuctionListCreate.as_view(), name="auction-list-create"),
+    path("import/", AuctionImportView.as_view(), name="auction-import"),
+    path("feeds/hot/", HotAuctionsView.as_view(), name="feed-hot"),
+    path(
+        "feeds/ending-soon/",
+        EndingSoonAuctionsView.as_view(),
+        name="feed-ending-soon",
+    ),
+    path("thumbnails/<str:name>", ThumbnailView.as_view(), name="thumbnail"),
     path("<int:pk>/", AuctionRetrieveUpdateDestroy.as_view(), name="auction-detail"),
+    path("<int:pk>/snapshot/", AuctionSnapshotView.as_view(), name="auction-snapshot"),
     path("<int:auction_id>/bid/", BidsListCreate.as_view(), name="bids-list-create"),
     path(
         "<int:auction_id>/bid/<int:pk>/",
@@ -53,6 +73,27 @@ urlpatterns = [
         ComentRetrieveUpdateDestroy.as_view(),
         name="detail_comments",
     ),
+    path(
+        "<int:auction_id>/comments/<int:pk>/thread",
+        ComentThreadView.as_view(),
+        name="thread_comments",
+    ),
+    path("watchlist/", WatchListCreate.as_view(), name="watchlist"),
+    path(
+        "watchlist/<int:auction_id>/", WatchDestroy.as_view(), name="watchlist-detail"
+    ),
+    path("notifications/", NotificationListView.as_view(), name="notifications"),
+    path(
+        "notifications/read/",
+        NotificationMarkReadView.as_view(),
+        name="notifications-read",
+    ),
+    path("analytics/daily/", DailyStatsView.as_view(), name="analytics-daily"),
+    path(
+        "analytics/categories/",
+        CategoryStatsView.as_view(),
+        name="analytics-categories",
+    ),
     path("users/ratings", UserRatingsView.as_view(), name="rating-from-users"),
     path("users/comments", UserComentsView.as_view(), name="coments-from-users"),
 ]
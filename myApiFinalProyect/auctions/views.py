@@ -1,5 +1,4 @@
-from django.db.models import Avg
-
+import io
 
 from django.shortcuts import render
 from rest_framework.exceptions import ValidationError
@@ -8,6 +7,7 @@ from rest_framework.permissions import (
     AllowAny,
     IsAdminUser,
     IsAuthenticatedOrReadOnly,
+    SAFE_METHODS,
 )
 
 from .permissions import (
@@ -20,9 +20,17 @@ from .permissions import (
 from django.utils import timezone
 
 # Create your views here.
-from django.db.models import Q
 from rest_framework import generics, status
-from .models import Category, Auction, Bid, Rating, Comentario
+from .models import (
+    Category,
+    Auction,
+    Bid,
+    Rating,
+    Comentario,
+    Notification,
+    Watch,
+    DailyStats,
+)
 from .serializers import (
     CategoryListCreateSerializer,
     CategoryDetailSerializer,
@@ -34,11 +42,52 @@ from .serializers import (
     RatingsDetailSerializer,
     CommentDetailSerializer,
     CommentListCreateSerializer,
+    AuctionFeedSerializer,
+    BidEngineSerializer,
+    NotificationSerializer,
+    WatchSerializer,
+    AnalyticsRangeSerializer,
+    DailyStatsSerializer,
+    CategoryStatsSerializer,
 )
 
-from rest_framework.views import APIView
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import CursorPagination
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+from django.shortcuts import get_object_or_404
+from users.models import CustomUser
+
+from django.conf import settings
+from django.http import FileResponse, Http404
+
+from . import analytics, bid_engine, feeds, snapshots, thumbnails
+from .cascade import schedule_auction_deletion
+from .bid_shards import db_for_auction
+from .filters import apply_filters, parse_params
+from .mixins import IdempotentCreateMixin, OptimisticUpdateMixin, QueuedCreateMixin
+from .importer import (
+    FORMATS,
+    AuctionImporter,
+    ImportInterrupted,
+    MalformedFile,
+    guess_format,
+    iter_rows,
+)
+
+
+def int_param(params, name):
+    """Entero del parámetro de consulta ``name`` (None si no viene)."""
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({name: "Debe ser un número entero."})
 
 
 class CategoryListCreate(generics.ListCreateAPIView):
@@ -52,116 +101,161 @@ class CategoryRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
     queryset = Category.objects.all()
     serializer_class = CategoryDetailSerializer
 
+    def perform_destroy(self, instance):
+        if instance.children.exists():
+            raise ValidationError(
+                {"category": "No se puede borrar una categoría con subcategorías."}
+            )
+        instance.delete()
+
 
 class AuctionListCreate(generics.ListCreateAPIView):
     permission_classes = [IsAuthenticatedOrReadOnly]
     serializer_class = AuctionListCreateSerializer
 
     def get_queryset(self):
-        query_set = Auction.objects.all()
-        params = self.request.query_params
-        search = params.get("search", None)
-        if search and len(search) < 3:
-            raise ValidationError(
-                {"debe tener mas de longitud 3"}, code=status.HTTP_400_BAD_REQUEST
-            )
-        if search:
-            query_set = query_set.filter(
-                Q(title__icontains=search) | Q(description__icontains=search)
-            )
-
-        category = params.get("category", None)
-
-        price_min = params.get("priceMin", None)
-        price_max = params.get("priceMax", None)
-
-        rating = params.get("rating", None)
-
-        is_open = params.get("is_open", None)
-
-        if is_open is not None:
-            is_open = is_open.lower() == "true"  # convierte el string a booleano
-
-            if is_open:
-                query_set = query_set.filter(closing_date__gte=timezone.now())
-            else:
-                query_set = query_set.filter(closing_date__lte=timezone.now())
-        if rating:
-            query_set = query_set.annotate(avg_rating=Avg("ratings__valor_numerico"))
-            rating = float(rating)
-            if rating < 0:
-                raise ValidationError({"rating": "Debe de ser un valor positivo"})
-            query_set = query_set.filter(avg_rating__gte=rating)
-
-        if price_min:
-
-            price_min = float(price_min)
-            if price_min < 0:
-                raise ValidationError({"priceMin": "Price must be a positive number."})
-            query_set = query_set.filter(price__gte=price_min)
-
-        if price_max:
+        # Validación y orden de los filtros en auctions/filters.py.
+        params = parse_params(self.request.query_params, self.request.user)
+        return apply_filters(Auction.objects.with_ratings(), params)
 
-            price_max = float(price_max)
-            if price_max < 0:
-                raise ValidationError({"priceMax": "Price must be a positive number."})
-            query_set = query_set.filter(price__lte=price_max)
-
-        if price_min and price_max and price_max < price_min:
-            raise ValidationError(
-                {"price": "Maximum price must be greater than minimum price."}
-            )
+    def perform_create(self, serializer):
+        user = self.request.user
+        location = {}
+        data = serializer.validated_data
+        if not data.get("municipality") and not data.get("locality"):
+            # Por defecto la subasta se ubica donde vive el subastador.
+            location = {"municipality": user.municipality, "locality": user.locality}
+        serializer.save(auctioneer=user, **location)
+
+
+class AuctionRetrieveUpdateDestroy(
+    OptimisticUpdateMixin, generics.RetrieveUpdateDestroyAPIView
+):
+    permission_classes = [IsOwnerOrAdmin]
+    queryset = Auction.objects.all()
+    serializer_class = AuctionDetailSerializer
 
-        if category:
-            if not Category.objects.filter(id=category).exists():
-                raise ValidationError({"category": "Category does not exist."})
-            query_set = query_set.filter(category=category)
+    def destroy(self, request, *args, **kwargs):
+        # Soft delete: la subasta desaparece de todos los listados al momento y
+        # sus pujas, valoraciones y comentarios se borran después por lotes
+        # (comando run_deletion_jobs).
+        job = schedule_auction_deletion(self.get_object())
+        return Response({"deletion_job": job.id}, status=status.HTTP_202_ACCEPTED)
 
-        return query_set
 
-    def perform_create(self, serializer):
-        serializer.save(auctioneer=self.request.user)
+class AuctionSnapshotView(APIView):
+    """
+    Detalle, pujas más altas, valoraciones y últimos comentarios de una subasta
+    en una sola petición (auctions/snapshots.py). Es pública, así que no se
+    autentica al usuario.
+    """
 
+    permission_classes = [AllowAny]
+    authentication_classes = []
 
-class AuctionRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
-    permission_classes = [IsOwnerOrAdmin]
-    queryset = Auction.objects.all()
-    serializer_class = AuctionDetailSerializer
+    def get(self, request, pk):
+        data = snapshots.get_snapshot(pk, request)
+        if data is None:
+            raise Http404
+        return Response(data)
 
 
-class BidsListCreate(generics.ListCreateAPIView):
+class BidsListCreate(
+    QueuedCreateMixin, IdempotentCreateMixin, generics.ListCreateAPIView
+):
     permission_classes = [IsAuthenticatedOrReadOnly]
     serializer_class = BidsListCreateSerializer
 
     def get_queryset(self):
         auction_id = self.kwargs["auction_id"]
-        return Bid.objects.filter(auction=auction_id)
+        return Bid.objects.for_auction(auction_id)
+
+    def get_write_databases(self):
+        # Con BID_SHARDS la puja se guarda en la base de datos de su subasta.
+        return [db_for_auction(self.kwargs["auction_id"])]
 
     def perform_create(self, serializer):
-        auction = Auction.objects.get(id=self.kwargs["auction_id"])
-        serializer.save(bidder=self.request.user, auction=auction)
+        auction = get_object_or_404(Auction, id=self.kwargs["auction_id"])
+        price = serializer.validated_data["price"]
+
+        def check():
+            # El serializer la ha validado en paralelo con otras pujas: en la
+            # cola se comprueba que sigue superando a la más alta.
+            if auction.bids.filter(price__gte=price).exists():
+                errors = [bid_engine.HIGHER_BID_REQUIRED]
+                raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: errors})
+
+        self.save_queued(
+            serializer, check=check, bidder=self.request.user, auction=auction
+        )
+
+    def create(self, request, *args, **kwargs):
+        if not settings.BID_ENGINE_ENABLED:
+            return super().create(request, *args, **kwargs)
+        # Sin cola de escritura (el shard escribe por lotes), pero sí con
+        # Idempotency-Key: un reintento no vuelve a enviar la puja al motor.
+        return self.idempotent(request, lambda: self.submit_to_engine(request))
+
+    def submit_to_engine(self, request):
+        # Con el motor de pujas activo la decisión se toma en memoria en el shard
+        # de la subasta y la puja se guarda después por lotes, así que se
+        # responde 202 con la puja aceptada (todavía sin id).
+        serializer = BidEngineSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        decision = bid_engine.submit(
+            self.kwargs["auction_id"],
+            request.user.pk,
+            serializer.validated_data["price"],
+        )
+        if not decision["accepted"]:
+            if decision["reason"] == "not_found":
+                raise Http404
+            if decision["reason"] == "unavailable":
+                raise bid_engine.BidEngineUnavailable()
+            raise ValidationError(decision["reason"])
+        return Response(
+            {
+                "auction": decision["auction"],
+                "bidder": decision["bidder"],
+                "price": decision["price"],
+                "created": decision["created"],
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
 
 
-class BidsRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
+class BidsRetrieveUpdateDestroy(
+    OptimisticUpdateMixin, generics.RetrieveUpdateDestroyAPIView
+):
     permission_classes = [IsBidOwnerOrAdmin]
     serializer_class = BidsDetailSerializer
+    update_condition_error = "La puja debe ser mayor que la actual más alta."
 
     def get_queryset(self):
-        return Bid.objects.filter(auction=self.kwargs["auction_id"])
+        return Bid.objects.for_auction(self.kwargs["auction_id"])
 
+    def check_object_permissions(self, request, obj):
+        super().check_object_permissions(request, obj)
+        # El shard guarda en memoria la puja más alta de cada subasta: editar o
+        # borrar pujas por debajo de él la dejaría desfasada.
+        if settings.BID_ENGINE_ENABLED and request.method not in SAFE_METHODS:
+            raise bid_engine.BidsLocked()
 
-class RatingsListCReate(generics.ListCreateAPIView):
+
+class RatingsListCReate(
+    QueuedCreateMixin, IdempotentCreateMixin, generics.ListCreateAPIView
+):
     permission_classes = [IsAuthenticatedOrReadOnly]
 
     serializer_class = RatingsListSerializer
 
     def get_queryset(self):
-        auction = Auction.objects.get(id=self.kwargs["auction_id"])
+        auction = get_object_or_404(Auction, id=self.kwargs["auction_id"])
         return auction.ratings.all()
 
     def perform_create(self, serializer):
-        auction = Auction.objects.get(id=self.kwargs["auction_id"])
-        serializer.save(user=self.request.user, auction=auction)
+        auction = get_object_or_404(Auction, id=self.kwargs["auction_id"])
+        self.save_queued(serializer, user=self.request.user, auction=auction)
 
 
 class RatingsRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
@@ -170,28 +264,60 @@ class RatingsRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = RatingsDetailSerializer
 
     def get_queryset(self):
-        auction = Auction.objects.get(id=self.kwargs["auction_id"])
+        auction = get_object_or_404(Auction, id=self.kwargs["auction_id"])
         return auction.ratings.all()
 
 
-class ComentListCreate(generics.ListCreateAPIView):
+class ComentListCreate(
+    QueuedCreateMixin, IdempotentCreateMixin, generics.ListCreateAPIView
+):
     serializer_class = CommentListCreateSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
 
     def get_queryset(self):
-        return Comentario.objects.filter(auction=self.kwargs["auction_id"])
+        # Por fecha, que sirve el índice (auction, fecha_creacion).
+        query_set = (
+            Comentario.objects.filter(auction=self.kwargs["auction_id"])
+            .select_related("auction")
+            .order_by("fecha_creacion", "id")
+        )
+
+        # ?parent=<id> lista las respuestas directas; ?parent=null, los
+        # comentarios de primer nivel.
+        params = self.request.query_params
+        if params.get("parent") == "null":
+            query_set = query_set.filter(parent__isnull=True)
+        else:
+            parent = int_param(params, "parent")
+            if parent is not None:
+                query_set = query_set.filter(parent=parent)
+
+        return query_set
 
     def perform_create(self, serializer):
-        auction = Auction.objects.get(id=self.kwargs["auction_id"])
+        auction = get_object_or_404(Auction, id=self.kwargs["auction_id"])
+        parent = serializer.validated_data.get("parent")
+        if parent is not None:
+            if parent.auction_id != auction.id:
+                raise ValidationError(
+                    {"parent": "El comentario padre es de otra subasta."}
+                )
+            if parent.depth + 1 > Comentario.MAX_DEPTH:
+                raise ValidationError(
+                    {"parent": "Se ha alcanzado la profundidad máxima del hilo."}
+                )
         fecha_ultima_modificacion = timezone.now()
-        serializer.save(
+        self.save_queued(
+            serializer,
             usuario=self.request.user,
             auction=auction,
             fecha_ultima_modificacion=fecha_ultima_modificacion,
         )
 
 
-class ComentRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
+class ComentRetrieveUpdateDestroy(
+    OptimisticUpdateMixin, generics.RetrieveUpdateDestroyAPIView
+):
     permission_classes = [isCommentaryownerorReadonly]
     serializer_class = CommentDetailSerializer
 
@@ -199,29 +325,324 @@ class ComentRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
         return Comentario.objects.filter(auction=self.kwargs["auction_id"])
 
 
-class UserAuctionListView(APIView):
+class CommentThreadPagination(CursorPagination):
+    ordering = "path"
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class ComentThreadView(generics.ListAPIView):
+    """
+    Hilo completo de un comentario (él mismo y todas sus respuestas) en orden de
+    lectura. Cada página es un único rango sobre el índice (auction, path), así
+    que cuesta lo mismo con 10 respuestas que con 10.000.
+    """
+
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    serializer_class = CommentListCreateSerializer
+    pagination_class = CommentThreadPagination
+
+    def get_queryset(self):
+        root = get_object_or_404(
+            Comentario.objects.only("path"),
+            auction=self.kwargs["auction_id"],
+            pk=self.kwargs["pk"],
+        )
+        start, end = root.subtree_range()
+        return Comentario.objects.filter(
+            auction=self.kwargs["auction_id"], path__gte=start, path__lt=end
+        ).select_related("auction")
+
+
+class UserActivityPagination(CursorPagination):
+    """
+    Paginación por cursor para los listados "mis subastas/valoraciones/comentarios":
+    cada página es un rango sobre un índice que empieza por el propietario, así
+    que el coste no depende de cuánto historial tenga el usuario.
+    """
+
+    ordering = "-id"
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class UserAuctionListView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
+    serializer_class = AuctionListCreateSerializer
+    pagination_class = UserActivityPagination
+    filter_backends = [OrderingFilter]
+    ordering_fields = ["id", "closing_date", "creation_date"]
 
-    def get(self, request, *args, **kwargs):
+    def get_queryset(self):
         # Obtener las subastas del usuario autenticado
-        user_auctions = Auction.objects.filter(auctioneer=request.user)
-        serializer = AuctionListCreateSerializer(user_auctions, many=True)
-        return Response(serializer.data)
+        query_set = Auction.objects.filter(auctioneer=self.request.user).with_ratings()
+        params = self.request.query_params
+
+        is_open = params.get("is_open", None)
+        if is_open is not None:
+            if is_open.lower() == "true":
+                query_set = query_set.filter(closing_date__gt=timezone.now())
+            else:
+                query_set = query_set.filter(closing_date__lte=timezone.now())
 
+        category = int_param(params, "category")
+        if category is not None:
+            query_set = query_set.filter(category=category)
+
+        return query_set
 
-class UserRatingsView(APIView):
+
+class UserRatingsView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
+    serializer_class = RatingsListSerializer
+    pagination_class = UserActivityPagination
+    filter_backends = [OrderingFilter]
+    ordering_fields = ["id", "valor_numerico"]
 
-    def get(self, request):
-        user_ratings = Rating.objects.filter(user=self.request.user)
-        serializer = RatingsListSerializer(user_ratings, many=True)
-        return Response(serializer.data)
+    def get_queryset(self):
+        query_set = Rating.objects.filter(
+            user=self.request.user, auction__deleted_at__isnull=True
+        ).select_related("user", "auction")
+        params = self.request.query_params
+
+        auction = int_param(params, "auction")
+        if auction is not None:
+            query_set = query_set.filter(auction=auction)
 
+        valor_numerico = int_param(params, "valor_numerico")
+        if valor_numerico is not None:
+            query_set = query_set.filter(valor_numerico=valor_numerico)
+
+        return query_set
 
-class UserComentsView(APIView):
+
+class UserComentsView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
+    serializer_class = CommentListCreateSerializer
+    pagination_class = UserActivityPagination
+    filter_backends = [OrderingFilter]
+    ordering_fields = ["id", "fecha_creacion"]
+
+    def get_queryset(self):
+        query_set = Comentario.objects.filter(
+            usuario=self.request.user, auction__deleted_at__isnull=True
+        ).select_related("auction")
+
+        auction = int_param(self.request.query_params, "auction")
+        if auction is not None:
+            query_set = query_set.filter(auction=auction)
+
+        return query_set
+
+
+class AuctionImportView(APIView):
+    """
+    Importación masiva de subastas para administradores. Recibe un fichero
+    (campo ``file``) en CSV, array JSON o JSON lines; ``auctioneer`` indica el id
+    del subastador (por defecto el propio administrador) y ``start`` permite
+    reanudar una importación a partir de la última fila confirmada. Si la
+    importación se corta, la respuesta de error incluye esa fila (``last_row``).
+    """
+
+    permission_classes = [IsAdminUser]
+    parser_classes = [MultiPartParser]
+    max_reported_errors = 1000
+
+    def post(self, request):
+        upload = request.FILES.get("file")
+        if upload is None:
+            raise ValidationError({"file": "Debe adjuntarse un fichero."})
+
+        fmt = request.data.get("format") or guess_format(upload.name)
+        if fmt not in FORMATS:
+            raise ValidationError({"format": f"Debe ser uno de {', '.join(FORMATS)}."})
+
+        auctioneer = request.user
+        if request.data.get("auctioneer"):
+            try:
+                auctioneer_id = int(request.data["auctioneer"])
+            except ValueError:
+                raise ValidationError({"auctioneer": "Debe ser un número entero."})
+            auctioneer = get_object_or_404(CustomUser, pk=auctioneer_id)
+
+        try:
+            start = int(request.data.get("start", 0))
+        except ValueError:
+            raise ValidationError({"start": "Debe ser un número entero."})
+
+        importer = AuctionImporter(auctioneer)
+        stream = io.TextIOWrapper(upload.file, encoding="utf-8", newline="")
+        try:
+            report = importer.run(iter_rows(stream, fmt), start=start)
+        except ImportInterrupted as exc:
+            progress = {
+                "imported": exc.report["imported"],
+                "last_row": exc.report["last_row"],
+            }
+            if isinstance(exc.error, MalformedFile):
+                return Response(
+                    {"file": [str(exc)], **progress},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            return Response(
+                {
+                    "detail": "Error de la base de datos durante la importación.",
+                    **progress,
+                },
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+        report["error_count"] = len(report["errors"])
+        report["errors"] = report["errors"][: self.max_reported_errors]
+        return Response(report, status=status.HTTP_201_CREATED)
+
+
+class AuctionFeedView(APIView):
+    """Feed ordenado de subastas abiertas; ``?limit=`` indica cuántas devolver."""
+
+    permission_classes = [AllowAny]
+    feed = None
 
     def get(self, request):
-        user_comments = Comentario.objects.filter(usuario=self.request.user)
-        serializer = CommentListCreateSerializer(user_comments, many=True)
+        try:
+            limit = int(request.query_params.get("limit", 20))
+        except ValueError:
+            raise ValidationError({"limit": "Debe ser un número entero."})
+        if not 1 <= limit <= settings.FEED_CACHE_SIZE:
+            raise ValidationError(
+                {"limit": f"Debe estar entre 1 y {settings.FEED_CACHE_SIZE}."}
+            )
+        auctions = self.feed(limit)
+        serializer = AuctionFeedSerializer(
+            auctions, many=True, context={"request": request}
+        )
         return Response(serializer.data)
+
+
+class HotAuctionsView(AuctionFeedView):
+    feed = staticmethod(feeds.hot_auctions)
+
+
+class EndingSoonAuctionsView(AuctionFeedView):
+    feed = staticmethod(feeds.ending_soon_auctions)
+
+
+class ThumbnailView(APIView):
+    """
+    Sirve una variante cacheada de una miniatura. El nombre del fichero incluye
+    el hash de su contenido, así que la respuesta no cambia nunca y se marca como
+    inmutable.
+    """
+
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def get(self, request, name):
+        match = thumbnails.FILE_NAME.match(name)
+        if match is None or match["ext"] not in thumbnails.CONTENT_TYPES:
+            raise Http404
+        etag = f'"{name}"'
+        headers = {
+            "Cache-Control": "public, max-age=%d, immutable"
+            % settings.THUMBNAIL_CACHE_MAX_AGE,
+            "ETag": etag,
+        }
+        if request.headers.get("If-None-Match") == etag:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        try:
+            image = open(thumbnails.variant_path(name), "rb")
+        except FileNotFoundError:
+            raise Http404
+        return FileResponse(
+            image,
+            content_type=thumbnails.CONTENT_TYPES[match["ext"]],
+            headers=headers,
+        )
+
+
+class WatchListCreate(generics.ListCreateAPIView):
+    """Subastas que sigue el usuario; seguir una es un POST con ``auction``."""
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = WatchSerializer
+    pagination_class = UserActivityPagination
+
+    def get_queryset(self):
+        return Watch.objects.filter(user=self.request.user).select_related("auction")
+
+
+class WatchDestroy(generics.DestroyAPIView):
+    """Deja de seguir la subasta ``auction_id``."""
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = WatchSerializer
+
+    def get_object(self):
+        return get_object_or_404(
+            Watch, user=self.request.user, auction=self.kwargs["auction_id"]
+        )
+
+
+class NotificationListView(generics.ListAPIView):
+    """Bandeja de avisos del usuario; ``?unread=1`` muestra solo los no leídos."""
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = NotificationSerializer
+    pagination_class = UserActivityPagination
+
+    def get_queryset(self):
+        query_set = Notification.objects.filter(user=self.request.user)
+        if self.request.query_params.get("unread") == "1":
+            query_set = query_set.filter(read_at__isnull=True)
+        return query_set
+
+
+class NotificationMarkReadView(APIView):
+    """Marca como leídos los avisos de ``ids`` (o todos si no se indica)."""
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        query_set = Notification.objects.filter(user=request.user, read_at__isnull=True)
+        ids = request.data.get("ids")
+        if ids is not None:
+            if not isinstance(ids, list) or not all(isinstance(pk, int) for pk in ids):
+                raise ValidationError({"ids": "Debe ser una lista de ids."})
+            query_set = query_set.filter(id__in=ids)
+        updated = query_set.update(read_at=timezone.now())
+        return Response({"updated": updated})
+
+
+class AnalyticsView(generics.ListAPIView):
+    """
+    Base de los endpoints de analítica para administradores: ``?start=`` y
+    ``?end=`` (AAAA-MM-DD) acotan los días. Solo leen los resúmenes diarios
+    que escribe el comando rollup_daily_stats.
+    """
+
+    permission_classes = [IsAdminUser]
+    pagination_class = None
+
+    def get_range(self):
+        serializer = AnalyticsRangeSerializer(data=self.request.query_params.dict())
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data["start"], serializer.validated_data["end"]
+
+
+class DailyStatsView(AnalyticsView):
+    """GMV, pujas, usuarios nuevos y subastas nuevas y activas por día."""
+
+    serializer_class = DailyStatsSerializer
+
+    def get_queryset(self):
+        start, end = self.get_range()
+        return DailyStats.objects.filter(day__gte=start, day__lte=end)
+
+
+class CategoryStatsView(AnalyticsView):
+    """Pujas y GMV por categoría en el rango, de más a menos pujas."""
+
+    serializer_class = CategoryStatsSerializer
+
+    def get_queryset(self):
+        return analytics.category_stats(*self.get_range())
@@ -0,0 +1,146 @@
+"""
+Cola de escritura con un único escritor por proceso (WRITE_QUEUE_ENABLED).
+
+SQLite solo admite una transacción de escritura a la vez: con varias peticiones
+creando pujas, valoraciones o comentarios a la vez, cada una espera el bloqueo y
+paga su propio COMMIT (un fsync). Con la cola, esas vistas (QueuedCreateMixin)
+validan y serializan en su hilo, pero entregan el save() a un hilo escritor,
+con su propia conexión, y esperan el resultado. El escritor toma todas las
+pendientes (hasta WRITE_QUEUE_MAX_BATCH) y las ejecuta en una sola
+transacción, cada una en su savepoint: si una falla (validación, integridad...)
+solo se deshace esa y su petición recibe la excepción; el resto se confirma con
+un único COMMIT y cada petición recibe su propia respuesta después de él. Las
+lecturas no pasan por la cola y, con WAL (SQLITE_OPTIONS), no esperan a la
+escritura en curso.
+
+Si pasado WRITE_QUEUE_TIMEOUT la escritura sigue en la cola, se cancela y la
+petición recibe un 503 sin que se llegue a escribir nada; si el escritor ya la
+había empezado, se espera a que termine.
+
+Si la llamada ya está dentro de una transacción (tests, ATOMIC_REQUESTS) se
+ejecuta en el sitio: el escritor no vería sus datos sin confirmar.
+"""
+
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class WriteQueueTimeout(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "La escritura está tardando demasiado, inténtalo de nuevo."
+    default_code = "write_queue_timeout"
+
+
+class _Write:
+    __slots__ = ("function", "using", "future")
+
+    def __init__(self, function, using):
+        self.function = function
+        # "default" siempre y el primero: es el que confirma el último.
+        self.using = [DEFAULT_DB_ALIAS, *(set(using) - {DEFAULT_DB_ALIAS})]
+        self.future = Future()
+
+
+_queue = queue.Queue()
+_lock = threading.Lock()
+_writer = None
+
+
+def _reset_after_fork():
+    # El hilo escritor no sobrevive a un fork (gunicorn con preload_app).
+    global _queue, _lock, _writer
+    _queue, _lock, _writer = queue.Queue(), threading.Lock(), None
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+@contextmanager
+def _atomic(aliases):
+    with ExitStack() as stack:
+        for alias in aliases:
+            stack.enter_context(transaction.atomic(using=alias))
+        yield
+
+
+def _write(batch):
+    # Las escrituras canceladas por run() al agotar su tiempo no se ejecutan.
+    batch = [write for write in batch if write.future.set_running_or_notify_cancel()]
+    if not batch:
+        return
+    aliases = list(dict.fromkeys(alias for write in batch for alias in write.using))
+    results = []
+    try:
+        with _atomic(aliases):
+            for write in batch:
+                try:
+                    with _atomic(write.using):
+                        results.append((write, write.function(), None))
+                except Exception as error:
+                    results.append((write, None, error))
+    except Exception as error:
+        # Ha fallado el COMMIT: no se ha guardado nada del lote.
+        for alias in aliases:
+            connections[alias].close()
+        results = [(write, None, error) for write in batch]
+    for write, result, error in results:
+        if error is None:
+            write.future.set_result(result)
+        else:
+            write.future.set_exception(error)
+
+
+def _run(pending):
+    while True:
+        batch = [pending.get()]
+        while len(batch) < settings.WRITE_QUEUE_MAX_BATCH:
+            try:
+                batch.append(pending.get_nowait())
+            except queue.Empty:
+                break
+        _write(batch)
+
+
+def _start():
+    global _writer
+    with _lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(
+                target=_run, args=(_queue,), name="write-queue", daemon=True
+            )
+            _writer.start()
+
+
+def run(function, using=()):
+    """
+    Ejecuta ``function()`` en el hilo escritor y devuelve su resultado (o lanza
+    su excepción) cuando se ha confirmado. ``using`` son las bases de datos,
+    además de "default", en las que escribe.
+    """
+    if (
+        not settings.WRITE_QUEUE_ENABLED
+        or threading.current_thread() is _writer
+        or any(
+            transaction.get_connection(alias).in_atomic_block
+            for alias in {DEFAULT_DB_ALIAS, *using}
+        )
+    ):
+        return function()
+    write = _Write(function, using)
+    _start()
+    _queue.put(write)
+    try:
+        return write.future.result(timeout=settings.WRITE_QUEUE_TIMEOUT)
+    except TimeoutError:
+        if write.future.cancel():
+            raise WriteQueueTimeout()
+    # El escritor ya la había empezado: su resultado es el de la petición.
+    return write.future.result()
@@ -0,0 +1,25 @@
+# Configuración de gunicorn: gunicorn myApiFinalProyect.wsgi
+#
+# preload_app importa la aplicación una sola vez en el proceso maestro y
+# on_starting la calienta ahí, antes de crear ningún worker: los workers (también
+# los que se levantan al escalar) heredan URLs y serializers ya cargados por
+# copy-on-write y solo abren sus conexiones a la BD en post_fork.
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("GUNICORN_WORKERS", os.cpu_count() or 1))
+preload_app = True
+
+
+def on_starting(server):
+    from myApiFinalProyect.warmup import freeze, warm_up
+
+    # Sin conexiones: un socket abierto en el maestro se compartiría entre workers.
+    warm_up(connect=False)
+    freeze()
+
+
+def post_fork(server, worker):
+    from myApiFinalProyect.warmup import connect_databases
+
+    connect_databases()
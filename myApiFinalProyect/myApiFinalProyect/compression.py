@@ -0,0 +1,107 @@
+"""
+Compresión negociada de las respuestas (Accept-Encoding).
+
+CompressionMiddleware comprime las respuestas de al menos COMPRESSION_MIN_SIZE
+bytes con la primera codificación de COMPRESSION_ENCODINGS que acepte el cliente
+(si la acepta con más peso, q=, se prefiere esa). zstd y brotli son opcionales:
+solo se ofrecen si están instalados los paquetes zstandard y brotli; gzip está
+siempre. Los clientes que no envían Accept-Encoding reciben lo mismo que antes.
+
+Como GZipMiddleware de Django, no se comprimen las respuestas en streaming (las
+miniaturas ya van comprimidas) ni las que ya traen Content-Encoding, y el ETag
+de una respuesta comprimida se debilita (W/"..."): los bytes ya no son los del
+ETag fuerte. Quien compara ETag acepta las dos formas (parse_if_match en
+auctions/mixins.py, SchemaView).
+"""
+
+from importlib import import_module
+from importlib.util import find_spec
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+
+def _gzip(content):
+    # Con relleno aleatorio, igual que GZipMiddleware (mitiga BREACH).
+    return compress_string(content, max_random_bytes=100)
+
+
+def _brotli(content):
+    quality = settings.COMPRESSION_LEVELS["br"]
+    return import_module("brotli").compress(content, quality=quality)
+
+
+def _zstd(content):
+    level = settings.COMPRESSION_LEVELS["zstd"]
+    return import_module("zstandard").ZstdCompressor(level=level).compress(content)
+
+
+ENCODERS = {"gzip": _gzip}
+if find_spec("brotli") is not None:
+    ENCODERS["br"] = _brotli
+if find_spec("zstandard") is not None:
+    ENCODERS["zstd"] = _zstd
+
+
+def parse_accept_encoding(header):
+    """Peso (q) de cada codificación de una cabecera Accept-Encoding."""
+    accepted = {}
+    for item in header.split(","):
+        name, _, params = item.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        accepted[name] = weight
+    return accepted
+
+
+def choose_encoding(header):
+    """Codificación para la respuesta o None si no se debe comprimir."""
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    chosen, chosen_weight = None, 0.0
+    for encoding in settings.COMPRESSION_ENCODINGS:
+        if encoding not in ENCODERS:
+            continue
+        weight = accepted.get(encoding, wildcard)
+        if weight > chosen_weight:
+            chosen, chosen_weight = encoding, weight
+    return chosen
+
+
+def compress(encoding, content):
+    return ENCODERS[encoding](content)
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    def process_response(self, request, response):
+        if (
+            response.streaming
+            or response.has_header("Content-Encoding")
+            or len(response.content) < settings.COMPRESSION_MIN_SIZE
+        ):
+            return response
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = choose_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return response
+        compressed = compress(encoding, response.content)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers["Content-Length"] = str(len(compressed))
+        response.headers["Content-Encoding"] = encoding
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        return response
@@ -0,0 +1,44 @@
+"""
+Formatos binarios opcionales de la API: MessagePack y CBOR.
+
+Se piden con Accept: application/msgpack / application/cbor o con
+?format=msgpack / ?format=cbor y contienen los mismos datos que la respuesta
+JSON: lo que JSON no tiene (fechas, Decimal...) se convierte igual que en
+JSONRenderer. Solo se registran si están instalados msgpack y cbor2
+(API_RENDERER_CLASSES en settings).
+"""
+
+from importlib import import_module
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_to_json = JSONEncoder().default
+
+
+def _cbor_default(encoder, value):
+    encoder.encode(_to_json(value))
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return import_module("msgpack").packb(data, default=_to_json)
+
+
+class CBORRenderer(BaseRenderer):
+    media_type = "application/cbor"
+    format = "cbor"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return import_module("cbor2").dumps(data, default=_cbor_default)
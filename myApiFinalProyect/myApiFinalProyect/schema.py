@@ -0,0 +1,78 @@
+"""
+Esquema OpenAPI precalculado.
+
+Generar el esquema con drf_spectacular recorre todas las vistas y serializers,
+así que no se hace en los workers: el comando build_schema lo escribe en
+SCHEMA_PATH (junto con su sha256 en SCHEMA_PATH + ".sha256") y SchemaView sirve
+ese fichero desde memoria con el hash como ETag. El test de auctions/tests.py
+falla si el fichero guardado no coincide con el que genera el código actual.
+"""
+
+import hashlib
+from pathlib import Path
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from rest_framework.permissions import AllowAny
+from rest_framework.views import APIView
+
+_loaded = None
+
+
+def render_schema():
+    """Genera el esquema a partir del código; requiere drf_spectacular."""
+    from drf_spectacular.generators import SchemaGenerator
+    from drf_spectacular.renderers import OpenApiJsonRenderer
+
+    schema = SchemaGenerator().get_schema(request=None, public=True)
+    return OpenApiJsonRenderer().render(schema, renderer_context={})
+
+
+def schema_hash(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+def hash_path(path):
+    return Path(f"{path}.sha256")
+
+
+def write_schema(content, path=None):
+    path = Path(path or settings.SCHEMA_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    hash_path(path).write_text(f"{schema_hash(content)}  {path.name}\n")
+
+
+def load_schema():
+    """Contenido y hash del esquema guardado, leídos una vez por proceso."""
+    global _loaded
+    if _loaded is None:
+        path = Path(settings.SCHEMA_PATH)
+        try:
+            content = path.read_bytes()
+        except FileNotFoundError:
+            return None, None
+        _loaded = content, schema_hash(content)
+    return _loaded
+
+
+class SchemaView(APIView):
+    """Sirve el esquema OpenAPI generado con build_schema."""
+
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    schema = None
+
+    def get(self, request):
+        content, digest = load_schema()
+        if content is None:
+            raise Http404("El esquema no se ha generado (manage.py build_schema).")
+        etag = f'"{digest}"'
+        # Comprimido, el ETag llega debilitado (myApiFinalProyect/compression.py).
+        if request.headers.get("If-None-Match", "").removeprefix("W/") == etag:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type="application/json")
+        response["ETag"] = etag
+        response["Cache-Control"] = "public, no-cache"
+        return response
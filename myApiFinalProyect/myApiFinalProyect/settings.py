@@ -1,4 +1,6 @@
+import os
 from datetime import timedelta
+from importlib.util import find_spec
 
 """
 Django settings for myApiFinalProyect project.
@@ -48,8 +50,18 @@ INSTALLED_APPS = [
     "corsheaders",
 ]
 
+# El admin y el esquema OpenAPI no hacen falta para servir la API; en producción
+# se pueden desactivar para que los workers arranquen antes.
+ENABLE_ADMIN = os.environ.get("DJANGO_ENABLE_ADMIN", "1") == "1"
+ENABLE_SCHEMA = os.environ.get("DJANGO_ENABLE_SCHEMA", "1") == "1"
+if not ENABLE_ADMIN:
+    INSTALLED_APPS.remove("django.contrib.admin")
+if not ENABLE_SCHEMA:
+    INSTALLED_APPS.remove("drf_spectacular")
+
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
+    "myApiFinalProyect.compression.CompressionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -83,13 +95,41 @@ WSGI_APPLICATION = "myApiFinalProyect.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite en modo WAL (las lecturas no esperan a la escritura en curso), con
+# BEGIN IMMEDIATE para que dos transacciones nunca se bloqueen al pasar de leer a
+# escribir ("database is locked") y hasta "timeout" segundos de espera al bloqueo.
+SQLITE_OPTIONS = {
+    "init_command": "PRAGMA journal_mode=WAL",
+    "transaction_mode": "IMMEDIATE",
+    "timeout": 20,
+}
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "OPTIONS": SQLITE_OPTIONS,
     }
 }
 
+# Reparto de la tabla de pujas por subasta (auctions/bid_shards.py). Vacío: todas
+# las pujas en "default". Cada alias de DJANGO_BID_SHARDS que no esté definido
+# arriba es un SQLite en bid_shard_<alias>.sqlite3; "default" puede ser uno más.
+BID_SHARDS = [
+    alias for alias in os.environ.get("DJANGO_BID_SHARDS", "").split(",") if alias
+]
+BID_SHARD_ID_SPAN = 10**12  # ids de Bid reservados para cada alias
+for alias in BID_SHARDS:
+    DATABASES.setdefault(
+        alias,
+        {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / f"bid_shard_{alias}.sqlite3",
+            "OPTIONS": SQLITE_OPTIONS,
+        },
+    )
+DATABASE_ROUTERS = ["auctions.bid_shards.BidShardRouter"]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -110,6 +150,53 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing
+# El perfil se elige con DJANGO_PASSWORD_HASHER (scrypt, argon2 o pbkdf2). Los
+# demás hashers se mantienen para verificar hashes antiguos, que se regeneran con
+# el perfil activo en el siguiente login.
+
+PASSWORD_HASHER_PROFILE = os.environ.get("DJANGO_PASSWORD_HASHER", "scrypt")
+if PASSWORD_HASHER_PROFILE == "argon2" and find_spec("argon2") is None:
+    PASSWORD_HASHER_PROFILE = "scrypt"  # argon2-cffi no está instalado
+
+PASSWORD_HASHER_PARAMS = {
+    "scrypt": {"work_factor": 2**14, "block_size": 8, "parallelism": 1},
+    "argon2": {"time_cost": 2, "memory_cost": 19456, "parallelism": 1},
+    "pbkdf2": {"iterations": 600_000},
+}
+
+_TUNED_HASHERS = {
+    "scrypt": "users.hashers.TunedScryptPasswordHasher",
+    "argon2": "users.hashers.TunedArgon2PasswordHasher",
+    "pbkdf2": "users.hashers.TunedPBKDF2PasswordHasher",
+}
+_LEGACY_HASHERS = {
+    "pbkdf2": "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "pbkdf2_sha1": "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "argon2": "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "bcrypt": "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "scrypt": "django.contrib.auth.hashers.ScryptPasswordHasher",
+}
+PASSWORD_HASHERS = [_TUNED_HASHERS[PASSWORD_HASHER_PROFILE]] + [
+    hasher
+    for name, hasher in _LEGACY_HASHERS.items()
+    if name != PASSWORD_HASHER_PROFILE
+]
+
+AUTHENTICATION_BACKENDS = ["users.backends.PooledModelBackend"]
+
+# Presupuesto de memoria: cada hash scrypt con los parámetros de arriba usa
+# 128 * block_size * work_factor = 16 MiB (argon2: memory_cost KiB, unos 19 MiB),
+# así que el pool puede llegar a PASSWORD_HASHING_WORKERS * 16 MiB a la vez; los
+# trabajos en cola no reservan memoria hasta que empiezan. En máquinas con muchos
+# núcleos y poca memoria se limita con DJANGO_PASSWORD_HASHING_WORKERS.
+PASSWORD_HASHING_WORKERS = int(
+    os.environ.get("DJANGO_PASSWORD_HASHING_WORKERS", os.cpu_count() or 1)
+)
+PASSWORD_HASHING_QUEUE_SIZE = 32
+PASSWORD_HASHING_QUEUE_TIMEOUT = 2
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -132,20 +219,42 @@ STATIC_URL = "static/"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# MessagePack y CBOR (Accept: application/msgpack / application/cbor) solo si
+# están instalados msgpack y cbor2 (myApiFinalProyect/renderers.py)
+API_RENDERER_CLASSES = [
+    "rest_framework.renderers.JSONRenderer",
+    "rest_framework.renderers.BrowsableAPIRenderer",
+]
+if find_spec("msgpack") is not None:
+    API_RENDERER_CLASSES.append("myApiFinalProyect.renderers.MessagePackRenderer")
+if find_spec("cbor2") is not None:
+    API_RENDERER_CLASSES.append("myApiFinalProyect.renderers.CBORRenderer")
+
 REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 20,
-    "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_SCHEMA_CLASS": (
+        "drf_spectacular.openapi.AutoSchema"
+        if ENABLE_SCHEMA
+        else "rest_framework.schemas.openapi.AutoSchema"
+    ),
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ),
+    "DEFAULT_RENDERER_CLASSES": API_RENDERER_CLASSES,
 }
 
+# Esquema OpenAPI precalculado (comando build_schema, /api/schema/)
+SCHEMA_PATH = BASE_DIR / "schema" / "openapi.json"
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "API Auctions",
     "DESCRIPTION": "Auctios web",
     "VERSION": "1.0.0",
     "SERVE_INCLUDE_SCHEMA": False,
+    # El esquema documenta solo JSON: así no cambia según los formatos
+    # opcionales instalados.
+    "RENDERER_WHITELIST": ["rest_framework.renderers.JSONRenderer"],
 }
 
 
@@ -159,5 +268,109 @@ SIMPLE_JWT = {
 
 AUTH_USER_MODEL = "users.CustomUser"
 
+# Caché compartida entre workers con DJANGO_CACHE_URL (redis://... con el paquete
+# redis, memcached://host:puerto con pymemcache). Sin ella cada worker tiene su
+# propia LocMemCache: las invalidaciones por versión (auctions/cache.py) solo
+# llegan al worker que hizo la escritura y los demás sirven su copia hasta que
+# caduca (DASHBOARD_CACHE_TIMEOUT, SNAPSHOT_CACHE_TIMEOUT...).
+CACHE_URL = os.environ.get("DJANGO_CACHE_URL", "")
+if CACHE_URL.startswith(("redis://", "rediss://")):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+        }
+    }
+elif CACHE_URL.startswith("memcached://"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.memcached.PyMemcacheCache",
+            "LOCATION": CACHE_URL.removeprefix("memcached://"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Árbol de categorías en memoria de cada proceso (auctions/categories.py)
+CATEGORY_TREE_TIMEOUT = 60
+
+# Panel de usuario (/api/users/profile/dashboard)
+DASHBOARD_CACHE_TIMEOUT = 60
+DASHBOARD_ENDING_SOON = timedelta(hours=24)
+
+# Feeds de portada (/api/auctions/feeds/...)
+FEED_CACHE_SIZE = 100
+FEED_CACHE_TIMEOUT = 30
+TRENDING_WINDOW = timedelta(hours=1)
+TRENDING_WEIGHTS = {"bids": 1.0, "bidders": 2.0, "rating": 0.5}
+
+# Puntuación bayesiana de las valoraciones (auctions/ratings.py): la media tras
+# añadir RATING_PRIOR_WEIGHT valoraciones de valor RATING_PRIOR_MEAN
+RATING_PRIOR_MEAN = 3.0
+RATING_PRIOR_WEIGHT = 10
+
+# Instantánea de una subasta (/api/auctions/<id>/snapshot/)
+SNAPSHOT_TOP_BIDS = 10
+SNAPSHOT_COMMENTS = 10
+SNAPSHOT_CACHE_TIMEOUT = 30
+
+# Analítica de administración (/api/auctions/analytics/, comando rollup_daily_stats)
+ANALYTICS_DEFAULT_DAYS = 30
+ANALYTICS_MAX_DAYS = 366
+
+# Compresión de respuestas (myApiFinalProyect/compression.py), por orden de
+# preferencia; zstd y br solo si están instalados zstandard y brotli
+COMPRESSION_ENCODINGS = ["zstd", "br", "gzip"]
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_LEVELS = {"br": 4, "zstd": 3}
+
+# Subastas cerradas hace más de este tiempo se archivan (comando archive_auctions)
+AUCTION_ARCHIVE_RETENTION = timedelta(days=90)
+
+# Filas borradas por transacción en los borrados en cascada (run_deletion_jobs) y
+# tiempo sin renovar la reserva tras el que otro proceso retoma el trabajo
+DELETION_BATCH_SIZE = 500
+DELETION_JOB_LEASE = timedelta(minutes=10)
+
+# Cola de escritura de pujas, valoraciones y comentarios (auctions/write_queue.py):
+# un único hilo escritor por proceso que confirma hasta WRITE_QUEUE_MAX_BATCH
+# escrituras por transacción. Pensada para SQLite.
+WRITE_QUEUE_ENABLED = DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3"
+WRITE_QUEUE_MAX_BATCH = 64
+WRITE_QUEUE_TIMEOUT = 30
+
+# Respuestas guardadas de los POST con Idempotency-Key (IdempotentCreateMixin)
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+
+# Avisos de la lista de seguimiento (comando run_notifications)
+NOTIFICATION_SINK = "auctions.notifications.InboxSink"
+NOTIFICATION_CLOSING_SOON = timedelta(minutes=30)
+NOTIFICATION_INTERVAL = 60
+
+# Motor de pujas en memoria (comando run_bid_engine); desactivado por defecto
+BID_ENGINE_ENABLED = os.environ.get("DJANGO_BID_ENGINE", "0") == "1"
+BID_ENGINE_SHARDS = int(os.environ.get("DJANGO_BID_ENGINE_SHARDS", 4))
+BID_ENGINE_ADDRESS = ("127.0.0.1", 7600)  # el shard n escucha en el puerto 7600 + n
+BID_ENGINE_AUTHKEY = os.environ.get("DJANGO_BID_ENGINE_AUTHKEY", SECRET_KEY).encode()
+BID_ENGINE_JOURNAL_DIR = BASE_DIR / "bid_engine"
+BID_ENGINE_JOURNAL_FSYNC = True  # False: más rápido, pero no resiste caídas del host
+BID_ENGINE_BATCH_SIZE = 500
+BID_ENGINE_FLUSH_INTERVAL = 0.05
+BID_ENGINE_RETRY_MAX_DELAY = 5  # espera máxima entre reintentos de escritura
+BID_ENGINE_IDLE_TIMEOUT = 600
+
+# Miniaturas cacheadas de las subastas (/api/auctions/thumbnails/...)
+THUMBNAIL_ROOT = BASE_DIR / "media" / "thumbnails"
+THUMBNAIL_FETCHER = "auctions.thumbnails.http_fetch"
+THUMBNAIL_FETCH_TIMEOUT = 5
+THUMBNAIL_MAX_BYTES = 5 * 1024 * 1024
+THUMBNAIL_SIZES = {"small": 160, "medium": 480}
+THUMBNAIL_QUALITY = 85
+THUMBNAIL_CACHE_MAX_AGE = 365 * 24 * 60 * 60
+
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
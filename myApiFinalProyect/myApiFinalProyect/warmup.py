@@ -0,0 +1,62 @@
+"""
+Calentamiento de la aplicación antes de servir peticiones.
+
+Django carga las URL conf (y con ellas todas las vistas y serializers) en la
+primera petición, y cada serializer construye sus campos la primera vez que se
+usa. warm_up() hace ese trabajo por adelantado para que la primera petición real
+no lo pague. Con gunicorn (gunicorn.conf.py) se llama una sola vez en el proceso
+maestro, antes de crear los workers, que heredan ese estado por copy-on-write;
+cada worker solo abre sus conexiones a la BD (connect_databases).
+"""
+
+import gc
+import logging
+import time
+
+from django.db import connections
+from django.urls import URLPattern, URLResolver, get_resolver
+
+logger = logging.getLogger(__name__)
+
+
+def _iter_views(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _iter_views(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern):
+            yield getattr(pattern.callback, "view_class", None)
+
+
+def warm_up(connect=True):
+    """Carga URLs y serializers y, opcionalmente, abre la conexión a la BD."""
+    start = time.perf_counter()
+    resolver = get_resolver()
+    # reverse_dict fuerza la importación de todas las URL conf y sus vistas.
+    resolver.reverse_dict
+    serializers = 0
+    for view in _iter_views(resolver.url_patterns):
+        serializer_class = getattr(view, "serializer_class", None)
+        if serializer_class is not None:
+            # Construir los campos rellena las cachés de _meta de los modelos.
+            serializer_class().fields
+            serializers += 1
+    if connect:
+        connect_databases()
+    elapsed = (time.perf_counter() - start) * 1000
+    logger.info("Worker calentado en %.1f ms (%d serializers)", elapsed, serializers)
+    return elapsed
+
+
+def connect_databases():
+    for alias in connections:
+        connections[alias].ensure_connection()
+
+
+def freeze():
+    """
+    Saca del recolector de ciclos los objetos creados hasta ahora, para que las
+    pasadas del GC en los workers no escriban en ellos y sus páginas sigan
+    compartidas con el maestro.
+    """
+    gc.collect()
+    gc.freeze()
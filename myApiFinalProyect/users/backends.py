@@ -0,0 +1,40 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import check_password, make_password
+
+from .hashing import run_hashing
+
+
+class PooledModelBackend(ModelBackend):
+    """
+    ModelBackend que verifica la contraseña en el pool de hashing. La consulta
+    del usuario y la actualización del hash (si el hasher o sus parámetros han
+    cambiado) se hacen en el hilo de la petición.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Se calcula un hash igualmente para no revelar qué usuarios existen
+            # por diferencia de tiempos.
+            run_hashing(make_password, password)
+            return None
+
+        needs_upgrade = []
+        is_correct = run_hashing(
+            check_password, password, user.password, needs_upgrade.append
+        )
+        if not is_correct or not self.user_can_authenticate(user):
+            return None
+
+        if needs_upgrade:
+            user.password = run_hashing(make_password, password)
+            user.save(update_fields=["password"])
+        return user
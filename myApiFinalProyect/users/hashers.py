@@ -0,0 +1,47 @@
+"""
+Hashers con parámetros ajustables desde settings.PASSWORD_HASHER_PARAMS.
+
+Conservan el nombre de algoritmo de Django, así que los hashes existentes se
+siguen verificando y, al cambiar los parámetros, must_update() hace que se
+regeneren de forma transparente en el siguiente login. Los parámetros se leen de
+settings en cada uso, no al importar el módulo, así que override_settings y los
+cambios de configuración no dependen del orden de importación.
+"""
+
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    PBKDF2PasswordHasher,
+    ScryptPasswordHasher,
+)
+
+
+class _Param:
+    """Atributo del hasher tomado de PASSWORD_HASHER_PARAMS[profile]."""
+
+    def __init__(self, profile, default):
+        self.profile = profile
+        self.default = default
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        params = settings.PASSWORD_HASHER_PARAMS.get(self.profile, {})
+        return params.get(self.name, self.default)
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    work_factor = _Param("scrypt", 2**14)
+    block_size = _Param("scrypt", 8)
+    parallelism = _Param("scrypt", 1)
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    time_cost = _Param("argon2", 2)
+    memory_cost = _Param("argon2", 19456)
+    parallelism = _Param("argon2", 1)
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    iterations = _Param("pbkdf2", 600_000)
@@ -0,0 +1,63 @@
+"""
+Pool acotado para calcular y verificar hashes de contraseñas.
+
+Los hashers de Django (scrypt, PBKDF2, argon2) liberan el GIL mientras calculan,
+así que un pool de hilos permite aprovechar varios núcleos. El número de
+trabajos en vuelo está limitado a PASSWORD_HASHING_WORKERS +
+PASSWORD_HASHING_QUEUE_SIZE: cuando se llena, la petición se rechaza con un 503
+(con Retry-After) en lugar de dejar todos los workers del servidor bloqueados calculando hashes.
+El hilo de la petición sigue esperando el resultado (run_hashing es síncrona):
+el pool limita cuántos hashes se calculan a la vez, no libera ese hilo.
+Las funciones que se ejecutan en el pool no deben tocar la base de datos.
+"""
+
+import math
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore, Lock
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+_executor = None
+_slots = None
+_pool_lock = Lock()
+
+
+class HashingOverloaded(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Demasiadas peticiones de autenticación, inténtalo de nuevo."
+    default_code = "hashing_overloaded"
+
+    def __init__(self, detail=None, code=None):
+        super().__init__(detail, code)
+        # El exception_handler de DRF lo envía como cabecera Retry-After.
+        self.wait = max(1, math.ceil(settings.PASSWORD_HASHING_QUEUE_TIMEOUT))
+
+
+def _get_pool():
+    global _executor, _slots
+    if _executor is None:
+        with _pool_lock:
+            if _executor is None:
+                workers = settings.PASSWORD_HASHING_WORKERS
+                _slots = BoundedSemaphore(
+                    workers + settings.PASSWORD_HASHING_QUEUE_SIZE
+                )
+                _executor = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix="password-hashing"
+                )
+    return _executor, _slots
+
+
+def run_hashing(func, *args, **kwargs):
+    executor, slots = _get_pool()
+    if not slots.acquire(timeout=settings.PASSWORD_HASHING_QUEUE_TIMEOUT):
+        raise HashingOverloaded()
+    try:
+        future = executor.submit(func, *args, **kwargs)
+    except BaseException:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    return future.result()
@@ -0,0 +1,59 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hasher, make_password
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide cuántos logins (verificaciones de contraseña) por segundo y por "
+        "núcleo soporta el hasher configurado, en un hilo y en el pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seconds", type=float, default=3.0)
+        parser.add_argument(
+            "--threads", type=int, default=settings.PASSWORD_HASHING_WORKERS
+        )
+
+    def handle(self, *args, **options):
+        seconds = options["seconds"]
+        threads = options["threads"]
+        hasher = get_hasher()
+        encoded = make_password("benchmark-password")
+        self.stdout.write(
+            f"Perfil: {settings.PASSWORD_HASHER_PROFILE} ({hasher.algorithm})"
+        )
+
+        hashes = self.measure(lambda: make_password("benchmark-password"), seconds)
+        logins = self.measure(
+            lambda: check_password("benchmark-password", encoded), seconds
+        )
+        self.stdout.write(f"hashes/s (1 núcleo): {hashes:.1f}")
+        self.stdout.write(f"logins/s (1 núcleo): {logins:.1f}")
+
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            done = 0
+            deadline = time.perf_counter() + seconds
+            start = time.perf_counter()
+            while time.perf_counter() < deadline:
+                futures = [
+                    pool.submit(check_password, "benchmark-password", encoded)
+                    for _ in range(threads)
+                ]
+                done += sum(1 for future in futures if future.result())
+            elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"logins/s ({threads} hilos): {done / elapsed:.1f} "
+            f"({done / elapsed / threads:.1f} por núcleo)"
+        )
+
+    def measure(self, func, seconds):
+        done = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            func()
+            done += 1
+        return done / (time.perf_counter() - start)
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:08
+
+from django.db import migrations, models
+from django.db.models import Count, F
+from django.db.models.functions import Lower, Trim
+
+
+def normalize_emails(apps, schema_editor):
+    # Se normalizan los emails a minúsculas. Si varios usuarios comparten el
+    # mismo email la migración falla y los lista para resolverlos a mano:
+    # quitarle el email a alguno perdería datos sin vuelta atrás.
+    CustomUser = apps.get_model('users', 'CustomUser')
+    users = CustomUser.objects.exclude(email='').annotate(normalized=Lower(Trim('email')))
+    duplicated = (
+        users.values('normalized').annotate(count=Count('id')).filter(count__gt=1).values('normalized')
+    )
+    conflicts = {}
+    for pk, email in users.filter(normalized__in=duplicated).order_by('normalized', 'id').values_list('id', 'normalized'):
+        conflicts.setdefault(email, []).append(pk)
+    if conflicts:
+        listed = '\n'.join(f'  {email}: usuarios {ids}' for email, ids in conflicts.items())
+        raise RuntimeError(
+            'Hay usuarios con el mismo email (sin distinguir mayúsculas); '
+            f'cámbialos antes de volver a migrar:\n{listed}'
+        )
+    users.exclude(email=F('normalized')).update(email=F('normalized'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_emails, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='customuser',
+            constraint=models.UniqueConstraint(condition=models.Q(('email', ''), _negated=True), fields=('email',), name='users_customuser_email_unique'),
+        ),
+    ]
@@ -7,3 +7,18 @@ class CustomUser(AbstractUser):
     birth_date = models.DateField()
     locality = models.CharField(max_length=100, blank=True)
     municipality = models.CharField(max_length=100, blank=True)
+
+    class Meta(AbstractUser.Meta):
+        constraints = [
+            # El email se guarda normalizado en minúsculas; el índice único
+            # parcial permite varios usuarios sin email (p. ej. superusuarios).
+            models.UniqueConstraint(
+                fields=["email"],
+                condition=~models.Q(email=""),
+                name="users_customuser_email_unique",
+            )
+        ]
+
+    def save(self, *args, **kwargs):
+        self.email = self.email.strip().lower()
+        super().save(*args, **kwargs)
@@ -1,7 +1,30 @@
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
+from .hashing import run_hashing
 from .models import CustomUser
 
 
+@contextmanager
+def unique_email(email, user_pk=None):
+    """Traduce la violación del índice único de email en un error de validación."""
+    try:
+        with transaction.atomic():
+            yield
+    except IntegrityError:
+        # El mensaje del error depende del motor (SQLite no nombra la
+        # restricción), así que solo en este caso se consulta si es el email.
+        taken = (
+            email
+            and CustomUser.objects.filter(email=email).exclude(pk=user_pk).exists()
+        )
+        if not taken:
+            raise
+        raise serializers.ValidationError({"email": ["Email already in used."]})
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = CustomUser
@@ -16,20 +39,27 @@ class UserSerializer(serializers.ModelSerializer):
         )
         extra_kwargs = {
             "password": {"write_only": True},
+            "email": {"validators": []},
         }
 
     def validate_email(self, value):
-        user = self.instance  # Solo tiene valor cuando se está actualizando
-        if (
-            CustomUser.objects.filter(email=value)
-            .exclude(pk=user.pk if user else None)
-            .exists()
-        ):
-            raise serializers.ValidationError("Email already in used.")
-        return value
+        # La unicidad la garantiza el índice único de la base de datos: no se
+        # consulta antes de insertar (ver unique_email).
+        return value.strip().lower()
 
     def create(self, validated_data):
-        return CustomUser.objects.create_user(**validated_data)
+        # Equivalente a create_user, pero el hash se calcula en el pool de hashing.
+        password = validated_data.pop("password", None)
+        user = CustomUser(**validated_data)
+        user.username = CustomUser.normalize_username(user.username)
+        user.password = run_hashing(make_password, password)
+        with unique_email(user.email):
+            user.save()
+        return user
+
+    def update(self, instance, validated_data):
+        with unique_email(validated_data.get("email"), instance.pk):
+            return super().update(instance, validated_data)
 
 
 class ChangePasswordSerializer(serializers.Serializer):
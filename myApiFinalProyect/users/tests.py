@@ -1,3 +1,152 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from threading import BoundedSemaphore
+from unittest import mock
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from auctions.cascade import schedule_auction_deletion
+from auctions.models import Auction, Bid, Category
+from . import hashing
+from .models import CustomUser
+from .views import ShardedBids
 
 # Create your tests here.
+
+
+class UniqueEmailTest(TestCase):
+    def setUp(self):
+        CustomUser.objects.create_user(
+            "ana",
+            email="ana@example.com",
+            password="secret",
+            birth_date=date(1990, 1, 1),
+        )
+        self.client = APIClient()
+
+    def register(self, username, email):
+        return self.client.post(
+            "/api/users/register/",
+            {
+                "username": username,
+                "email": email,
+                "password": "una-clave-larga",
+                "birth_date": "1990-01-01",
+            },
+            format="json",
+        )
+
+    def test_duplicate_email_is_a_validation_error(self):
+        response = self.register("ana2", " ANA@example.com")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("email", response.data)
+
+    def test_duplicate_username_is_not_reported_as_email(self):
+        response = self.register("ana", "otra@example.com")
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn("email", response.data)
+
+
+class ShardedDashboardTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            "ana", password="secret", birth_date=date(1990, 1, 1)
+        )
+        rival = CustomUser.objects.create_user(
+            "bob", password="secret", birth_date=date(1990, 1, 1)
+        )
+        category = Category.objects.create(name="Libros")
+        now = timezone.now()
+        auctions = [
+            Auction.objects.create(
+                title=f"Subasta {days}",
+                description="Descripción",
+                price=10,
+                stock=1,
+                brand="Marca",
+                thumbnail="https://example.com/image.png",
+                closing_date=now + timedelta(days=days),
+                auctioneer=rival,
+                category=category,
+            )
+            for days in (-1, 1, 2, 3)
+        ]
+        for price, auction in enumerate(auctions * 2, start=11):
+            Bid.objects.create(auction=auction, bidder=self.user, price=price)
+        Bid.objects.create(auction=auctions[1], bidder=rival, price=100)
+        schedule_auction_deletion(auctions[3])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def dashboard(self):
+        cache.clear()
+        response = self.client.get(
+            "/api/users/profile/dashboard", {"bids_page": 2, "bids_page_size": 2}
+        )
+        return response.data["bids"], response.data["counts"]
+
+    def test_sharded_dashboard_matches_single_database(self):
+        expected = self.dashboard()
+        with override_settings(BID_SHARDS=["default"]):
+            self.assertEqual(self.dashboard(), expected)
+        bids, counts = expected
+        self.assertEqual(bids["count"], 6)
+        self.assertEqual([bid["price"] for bid in bids["results"]], ["15.00", "13.00"])
+        self.assertEqual((counts["active_bids"], counts["winning_bids"]), (4, 1))
+
+    def test_pages_are_merged_across_shards(self):
+        bids = Bid.objects.filter(bidder=self.user)
+        sharded = ShardedBids(
+            [bids.filter(auction_id__lte=2), bids.filter(auction_id__gt=2)], 8
+        )
+        expected = list(bids.order_by("-price", "id")[2:5])
+        self.assertEqual(sharded[2:5], expected)
+
+
+@override_settings(
+    PASSWORD_HASHERS=[
+        "users.hashers.TunedScryptPasswordHasher",
+        "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    ],
+    PASSWORD_HASHER_PARAMS={"scrypt": {"work_factor": 2**10}},
+)
+class PasswordHashingTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            "ana", password="secret", birth_date=date(1990, 1, 1)
+        )
+        self.client = APIClient()
+
+    def login(self):
+        return self.client.post(
+            "/api/token/", {"username": "ana", "password": "secret"}, format="json"
+        )
+
+    def test_legacy_hash_is_upgraded_on_login(self):
+        self.user.password = make_password("secret", hasher="pbkdf2_sha1")
+        self.user.save()
+        self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("scrypt$1024$"))
+
+    def test_changed_parameters_are_applied_on_login(self):
+        params = {"scrypt": {"work_factor": 2**11}}
+        with override_settings(PASSWORD_HASHER_PARAMS=params):
+            self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("scrypt$2048$"))
+
+    @override_settings(PASSWORD_HASHING_QUEUE_TIMEOUT=0.01)
+    def test_saturated_pool_answers_503_with_retry_after(self):
+        hashing._get_pool()
+        full = BoundedSemaphore(1)
+        full.acquire()
+        with mock.patch.object(hashing, "_slots", full):
+            response = self.login()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "1")
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("scrypt$1024$"))
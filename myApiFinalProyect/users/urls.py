@@ -6,6 +6,7 @@ from .views import (
     LogoutView,
     UserProfileView,
     ChangePasswordView,
+    UserDashboardView,
 )
 
 app_name = "users"
@@ -15,5 +16,6 @@ urlpatterns = [
     path("<int:pk>/", UserRetrieveUpdateDestroyView.as_view(), name="user-detail"),
     path("log-out/", LogoutView.as_view(), name="log-out"),
     path("profile/", UserProfileView.as_view(), name="user-profile"),
+    path("profile/dashboard", UserDashboardView.as_view(), name="user-dashboard"),
     path("change-password/", ChangePasswordView.as_view(), name="change-password"),
 ]
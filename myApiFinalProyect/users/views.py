@@ -1,3 +1,6 @@
+import heapq
+import itertools
+
 from django.shortcuts import render
 
 # Create your views here.
@@ -12,8 +15,27 @@ from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from .serializers import UserSerializer, ChangePasswordSerializer
+from .hashing import run_hashing
 from rest_framework.exceptions import ValidationError
+from django.contrib.auth.hashers import check_password
 from django.contrib.auth.password_validation import validate_password
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Exists, OuterRef, Q, prefetch_related_objects
+from django.utils import timezone
+from rest_framework.pagination import PageNumberPagination
+from urllib.parse import urlencode
+
+from auctions.bid_shards import is_sharded
+from auctions.cache import versioned_key
+from auctions.cascade import schedule_user_deletion
+from auctions.models import Auction, Bid, Rating, Comentario
+from auctions.serializers import (
+    AuctionListCreateSerializer,
+    BidsListCreateSerializer,
+    RatingsListSerializer,
+    CommentListCreateSerializer,
+)
 
 
 class UserRegisterView(generics.CreateAPIView):
@@ -52,9 +74,10 @@ class UserProfileView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def delete(self, request):
-        user = request.user
-        user.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        # La cuenta se desactiva al momento; sus datos se borran por lotes en
+        # segundo plano (comando run_deletion_jobs).
+        job = schedule_user_deletion(request.user)
+        return Response({"deletion_job": job.id}, status=status.HTTP_202_ACCEPTED)
 
 
 class LogoutView(APIView):
@@ -92,7 +115,11 @@ class ChangePasswordView(APIView):
         user = request.user
 
         if serializer.is_valid():
-            if not user.check_password(serializer.validated_data["old_password"]):
+            if not run_hashing(
+                check_password,
+                serializer.validated_data["old_password"],
+                user.password,
+            ):
                 return Response(
                     {"old_password": "Incorrect current password."},
                     status=status.HTTP_400_BAD_REQUEST,
@@ -105,7 +132,7 @@ class ChangePasswordView(APIView):
                     {"new_password": e.messages}, status=status.HTTP_400_BAD_REQUEST
                 )
 
-            user.set_password(serializer.validated_data["new_password"])
+            run_hashing(user.set_password, serializer.validated_data["new_password"])
             user.save()
             return Response({"detail": "Password updated successfully."})
 
@@ -122,3 +149,155 @@ class UserRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAdminUser]
     serializer_class = UserSerializer
     queryset = CustomUser.objects.all()
+
+    def destroy(self, request, *args, **kwargs):
+        job = schedule_user_deletion(self.get_object())
+        return Response({"deletion_job": job.id}, status=status.HTTP_202_ACCEPTED)
+
+
+class DashboardSectionPagination(PageNumberPagination):
+    page_size = 10
+    max_page_size = 100
+
+    def __init__(self, section):
+        self.page_query_param = f"{section}_page"
+        self.page_size_query_param = f"{section}_page_size"
+
+
+class ShardedBids:
+    """
+    Pujas de un usuario repartidas entre los alias de BID_SHARDS, de mayor a
+    menor precio, como secuencia para el paginador: cada página pide a cada
+    alias solo sus primeras pujas ya ordenadas y las mezcla aquí.
+    """
+
+    def __init__(self, querysets, total):
+        self.querysets = [queryset.order_by("-price", "id") for queryset in querysets]
+        self.total = total
+
+    def __len__(self):
+        return self.total
+
+    def __getitem__(self, index):
+        # El paginador solo pide rebanadas [inicio:fin].
+        merged = heapq.merge(
+            *(queryset[: index.stop] for queryset in self.querysets),
+            key=lambda bid: (-bid.price, bid.id),
+        )
+        bids = list(itertools.islice(merged, index.start, index.stop))
+        prefetch_related_objects(bids, "bidder")
+        return bids
+
+
+def is_top_bid():
+    return ~Exists(
+        Bid.objects.filter(auction=OuterRef("auction"), price__gt=OuterRef("price"))
+    )
+
+
+class UserDashboardView(APIView):
+    """
+    Panel del usuario autenticado: sus subastas, pujas, valoraciones y
+    comentarios paginados por separado, más contadores agregados, en un número
+    fijo de consultas. La respuesta se cachea por usuario y se invalida cuando
+    ese usuario escribe (ver auctions/signals.py). Sin DJANGO_CACHE_URL la caché
+    es de cada worker: los demás pueden servir el panel anterior durante
+    DASHBOARD_CACHE_TIMEOUT.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        user = request.user
+        query = urlencode(sorted(request.query_params.items()))
+        cache_key = versioned_key("dashboard", user.pk, query)
+        data = cache.get(cache_key)
+        if data is None:
+            data = self.build_dashboard(request, user)
+            cache.set(cache_key, data, settings.DASHBOARD_CACHE_TIMEOUT)
+        return Response(data)
+
+    def build_dashboard(self, request, user):
+        now = timezone.now()
+        if is_sharded():
+            bids, bid_counts = self.sharded_bids(user, now)
+        else:
+            bids, bid_counts = self.bids(user, now)
+        sections = {
+            "auctions": (
+                Auction.objects.filter(auctioneer=user).with_ratings(),
+                AuctionListCreateSerializer,
+            ),
+            "bids": (bids, BidsListCreateSerializer),
+            "ratings": (
+                Rating.objects.filter(
+                    user=user, auction__deleted_at__isnull=True
+                ).select_related("user", "auction"),
+                RatingsListSerializer,
+            ),
+            "comments": (
+                Comentario.objects.filter(
+                    usuario=user, auction__deleted_at__isnull=True
+                ).select_related("auction"),
+                CommentListCreateSerializer,
+            ),
+        }
+
+        data = {}
+        for section, (queryset, serializer_class) in sections.items():
+            paginator = DashboardSectionPagination(section)
+            page = paginator.paginate_queryset(queryset, request, view=self)
+            serializer = serializer_class(page, many=True, context={"request": request})
+            data[section] = paginator.get_paginated_response(serializer.data).data
+
+        ending_soon = Auction.objects.filter(
+            auctioneer=user,
+            closing_date__gt=now,
+            closing_date__lte=now + settings.DASHBOARD_ENDING_SOON,
+        ).count()
+
+        data["counts"] = {
+            "auctions": data["auctions"]["count"],
+            "bids": data["bids"]["count"],
+            "ratings": data["ratings"]["count"],
+            "comments": data["comments"]["count"],
+            "active_bids": bid_counts["active_bids"],
+            "winning_bids": bid_counts["winning_bids"],
+            "auctions_ending_soon": ending_soon,
+        }
+        return data
+
+    def bids(self, user, now):
+        bids = Bid.objects.filter(bidder=user, auction__deleted_at__isnull=True)
+        bid_counts = bids.aggregate(
+            active_bids=Count("id", filter=Q(auction__closing_date__gt=now)),
+            winning_bids=Count(
+                "id", filter=Q(auction__closing_date__gt=now) & Q(is_top_bid())
+            ),
+        )
+        return bids.select_related("bidder"), bid_counts
+
+    def sharded_bids(self, user, now):
+        # Con BID_SHARDS las pujas no se pueden cruzar con sus subastas en SQL:
+        # cada alias agrupa las pujas del usuario por subasta y los contadores
+        # se calculan aquí con las fechas de cierre de esas subastas.
+        per_auction = {}
+        for shard_bids in Bid.objects.filter(bidder=user).on_shards():
+            for row in shard_bids.values("auction_id").annotate(
+                bids=Count("id"), top=Count("id", filter=Q(is_top_bid()))
+            ):
+                per_auction[row["auction_id"]] = row
+        closing_dates = dict(
+            Auction.objects.filter(id__in=per_auction).values_list("id", "closing_date")
+        )
+        deleted = [pk for pk in per_auction if pk not in closing_dates]
+        active = [per_auction[pk] for pk, date in closing_dates.items() if date > now]
+        bid_counts = {
+            "active_bids": sum(row["bids"] for row in active),
+            "winning_bids": sum(row["top"] for row in active),
+        }
+        bids = ShardedBids(
+            Bid.objects.filter(bidder=user).exclude(auction_id__in=deleted).on_shards(),
+            sum(per_auction[pk]["bids"] for pk in closing_dates),
+        )
+        return bids, bid_counts